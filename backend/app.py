@@ -1,24 +1,39 @@
+import os
 from flask import Flask
 from flask_cors import CORS
-from extensions import db  # Import from extensions
+from extensions import db, cache, hasher, gateway, suggestions, events  # Import from extensions
+from instrumentation import init_instrumentation
+from database import init_database
+from json_provider import init_json
+from config import Config
 
-def create_app():
+def create_app(config_overrides=None):
     app = Flask(__name__)
     
     # Configuration
-    app.config['SECRET_KEY'] = 'your-secret-key-here'
-    app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///marketplace.db'
-    app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+    app.config.from_object(Config)
+    app.config.update(config_overrides or {})
     
     # Initialize extensions with app
-    db.init_app(app)
-    CORS(app)
+    init_database(app, db)
+    cache.init_app(app)
+    hasher.init_app(app)
+    gateway.init_app(app)
+    suggestions.init_app(app)
+    events.init_app(app)
+    # With credentials, so browsers send back the read-your-writes cookie (database.py)
+    CORS(app, origins=app.config['CORS_ORIGINS'], supports_credentials=True)
+    init_json(app)
+    init_instrumentation(app)
     
     # Import and register routes
     with app.app_context():
         from routes import register_routes
         register_routes(app)
     
+    from commands import register_commands
+    register_commands(app)
+    
     return app
 
 # Create app instance
@@ -26,5 +41,15 @@ app = create_app()
 
 if __name__ == '__main__':
     with app.app_context():
-        db.create_all()
+        import migrations
+        migrations.upgrade(db.engine)
+    if os.environ.get('WERKZEUG_RUN_MAIN') == 'true':
+        # Development only: run payment jobs in the reloaded server process;
+        # deployments run `flask jobs-work` processes instead
+        from jobs import Worker
+        from payments import JOB_HANDLERS
+        Worker(app, JOB_HANDLERS).start()
+    # One threaded process serves requests and runs the jobs, so the memory
+    # event bus sees every event
+    events.streams = True
     app.run(debug=True, port=5000)
\ No newline at end of file
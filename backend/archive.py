@@ -0,0 +1,88 @@
+"""Hot/cold split of booking history.
+
+Completed and cancelled bookings dated more than ARCHIVE_AFTER_DAYS ago move,
+with their payments, to bookings_archive and payments_archive (`flask
+archive-bookings`). The hot tables keep what can still change plus recent
+history, so the per-user listings and their indexes stay small however long
+the marketplace runs. Listings read the hot tables; ?include_archived=1 adds
+the archive with UNION ALL.
+
+A completed booking that is not paid yet stays hot: it is still owed. A
+reviewed booking stays hot too: reviews are shown for good and service pages
+find them through their booking, so neither moves.
+
+Each chunk is copied and deleted in one transaction, so an interrupted run
+leaves every booking in exactly one place and running the command again
+carries on with what is left.
+
+Configuration:
+  ARCHIVE_AFTER_DAYS  default 365
+  ARCHIVE_CHUNK_SIZE  bookings moved per transaction, default 500
+"""
+from datetime import datetime
+from flask import request
+from sqlalchemy import DateTime, and_, delete, exists, insert, literal, or_, select, union_all
+from models import ArchivedBooking, ArchivedPayment, Booking, Payment, Review
+
+ARCHIVES = {Booking: ArchivedBooking, Payment: ArchivedPayment}
+
+def include_archived():
+    return request.args.get('include_archived', '').lower() in ('1', 'true', 'yes')
+
+def sources(model):
+    """`model`, then its archive table when the request includes the archive"""
+    return [model, ARCHIVES[model]] if include_archived() else [model]
+
+def union(queries):
+    """One query over the same-shaped `queries`; filter and order it as the first"""
+    first, *rest = queries
+    return first.union_all(*rest) if rest else first
+
+def history(model, *names):
+    """Hot and archived rows of `model` as one selectable, with just the
+    columns `names`"""
+    table, archive = model.__table__, ARCHIVES[model].__table__
+    return union_all(
+        select(*(table.c[name] for name in names)),
+        select(*(archive.c[name] for name in names))
+    ).subquery(table.name)
+
+# ===== ARCHIVAL =====
+def archivable(cutoff):
+    """Ids of unreviewed bookings that are done with and dated before `cutoff`"""
+    return select(Booking.id).where(
+        Booking.booking_date < cutoff,
+        or_(Booking.status == 'cancelled', and_(Booking.status == 'completed', Booking.payment_status == 'paid')),
+        Booking.payment_status != 'pending',
+        ~exists().where(Payment.booking_id == Booking.id, Payment.status == 'pending'),
+        ~exists().where(Review.booking_id == Booking.id)
+    )
+
+def archive_chunk(connection, cutoff, after_id=0, chunk_size=500):
+    """Move the next `chunk_size` archivable bookings with ids above
+    `after_id`, and their payments. Returns (last id looked at, bookings
+    moved, payments moved), or None when nothing is left; the caller commits.
+    """
+    ids = connection.execute(
+        archivable(cutoff).where(Booking.id > after_id).order_by(Booking.id).limit(chunk_size)
+    ).scalars().all()
+    if not ids:
+        return None
+    bookings, payments = Booking.__table__, Payment.__table__
+    archived_bookings, archived_payments = ArchivedBooking.__table__, ArchivedPayment.__table__
+
+    # The conditions are checked again as the rows are copied, in case a
+    # request changed one of them since the ids were read
+    copy = archivable(cutoff).where(Booking.id.in_(ids)).scalar_subquery()
+    connection.execute(insert(archived_bookings).from_select(
+        [column.name for column in bookings.c] + ['archived_at'],
+        select(*bookings.c, literal(datetime.utcnow(), DateTime)).where(bookings.c.id.in_(copy))
+    ))
+    moved = select(archived_bookings.c.id).where(archived_bookings.c.id.in_(ids)).scalar_subquery()
+    payment_count = connection.execute(insert(archived_payments).from_select(
+        [column.name for column in payments.c],
+        select(*payments.c).where(payments.c.booking_id.in_(moved))
+    )).rowcount
+    connection.execute(delete(payments).where(payments.c.booking_id.in_(moved)))
+    booking_count = connection.execute(delete(bookings).where(bookings.c.id.in_(moved))).rowcount
+    return ids[-1], booking_count, payment_count
@@ -0,0 +1,169 @@
+"""Service availability windows and per-provider booking schedules.
+
+Availability is stored as free-form strings ('mon,tue,wed', 'Mon-Fri',
+'08:00', '5pm'); `parse_availability` turns them into weekday sets and minute
+offsets. A `Schedule` holds a provider's busy intervals as sorted, merged
+(start, end) lists so a conflict check is a bisect rather than a scan.
+"""
+import re
+import threading
+from bisect import bisect_left, bisect_right
+from collections import namedtuple
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+from functools import lru_cache
+from models import Booking
+
+# Bookings are loaded by start time, so their length has to be bounded for a
+# window query to find every booking that overlaps it.
+MAX_BOOKING_HOURS = 24
+MAX_SLOT_RANGE_DAYS = 31
+
+WEEKDAYS = ['mon', 'tue', 'wed', 'thu', 'fri', 'sat', 'sun']
+DAY_ALIASES = {
+    'daily': set(range(7)), 'everyday': set(range(7)), 'all': set(range(7)),
+    'weekdays': set(range(5)), 'weekends': {5, 6}, 'weekend': {5, 6},
+}
+
+Availability = namedtuple('Availability', 'days start end')
+
+class AvailabilityError(ValueError):
+    pass
+
+# ===== PARSING =====
+def _weekday(token):
+    token = token.strip().lower()[:3]
+    if token not in WEEKDAYS:
+        raise AvailabilityError(f'Unknown day {token!r}')
+    return WEEKDAYS.index(token)
+
+def parse_days(text):
+    """Weekday numbers (Monday is 0) from 'mon,wed,fri', 'Mon-Fri', 'weekdays'...
+    An empty value means every day."""
+    text = (text or '').strip().lower()
+    if not text:
+        return frozenset(range(7))
+    days = set()
+    for part in re.split(r'[,;/\s]+(?:and\s+)?', text):
+        if not part or part == 'and':
+            continue
+        if part in DAY_ALIASES:
+            days |= DAY_ALIASES[part]
+        elif '-' in part:
+            first, last = (_weekday(day) for day in part.split('-', 1))
+            days.update((first + i) % 7 for i in range((last - first) % 7 + 1))
+        else:
+            days.add(_weekday(part))
+    return frozenset(days)
+
+def parse_time(text, default):
+    """Minutes after midnight from '08:00', '8', '8am', '5:30 pm'"""
+    text = (text or '').strip().lower()
+    if not text:
+        return default
+    match = re.fullmatch(r'(\d{1,2})(?:[:.h](\d{2}))?\s*(am|pm)?', text)
+    if not match:
+        raise AvailabilityError(f'Unknown time {text!r}')
+    hour, minute, meridiem = int(match.group(1)), int(match.group(2) or 0), match.group(3)
+    if meridiem == 'pm' and hour < 12:
+        hour += 12
+    elif meridiem == 'am' and hour == 12:
+        hour = 0
+    if hour > 24 or minute > 59 or (hour == 24 and minute):
+        raise AvailabilityError(f'Unknown time {text!r}')
+    return hour * 60 + minute
+
+@lru_cache(maxsize=4096)
+def parse_availability(days, start, end):
+    """Parsed availability of a service; an end at or before the start means
+    the window runs past midnight"""
+    return Availability(parse_days(days), parse_time(start, 0), parse_time(end, 24 * 60))
+
+def service_availability(service):
+    return parse_availability(service.availability_days, service.availability_start, service.availability_end)
+
+# ===== WINDOWS =====
+def windows(availability, start, end):
+    """Open windows of `availability` that intersect [start, end), clipped to it"""
+    length = (availability.end - availability.start) % (24 * 60) or 24 * 60
+    # A window that started the day before may still be open at `start`
+    day = datetime.combine(start.date() - timedelta(days=1), datetime.min.time())
+    while day < end:
+        if day.weekday() in availability.days:
+            opens = day + timedelta(minutes=availability.start)
+            closes = opens + timedelta(minutes=length)
+            if closes > start and opens < end:
+                yield max(opens, start), min(closes, end)
+        day += timedelta(days=1)
+
+def within_availability(availability, start, end):
+    return any(opens <= start and end <= closes for opens, closes in windows(availability, start, end))
+
+# ===== SCHEDULE =====
+class Schedule:
+    """Busy intervals of one provider, sorted and merged"""
+
+    def __init__(self, intervals=()):
+        self.starts = []
+        self.ends = []
+        for start, end in sorted(intervals):
+            self.add(start, end)
+
+    @classmethod
+    def load(cls, session, provider_id, start, end):
+        """Busy intervals overlapping [start, end), read with a range scan on
+        (provider_id, booking_date) instead of the provider's whole history"""
+        rows = session.query(Booking.booking_date, Booking.duration).filter(
+            Booking.provider_id == provider_id,
+            Booking.booking_date >= start - timedelta(hours=MAX_BOOKING_HOURS),
+            Booking.booking_date < end,
+            Booking.status != 'cancelled'
+        )
+        return cls((begins, begins + timedelta(hours=duration or 1)) for begins, duration in rows)
+
+    def add(self, start, end):
+        # Merge with every interval it touches so the lists stay disjoint
+        i = bisect_left(self.ends, start)
+        j = bisect_right(self.starts, end)
+        if i < j:
+            start = min(start, self.starts[i])
+            end = max(end, self.ends[j - 1])
+        self.starts[i:j] = [start]
+        self.ends[i:j] = [end]
+
+    def conflicts(self, start, end):
+        """Whether [start, end) overlaps a busy interval, in O(log n)"""
+        i = bisect_right(self.ends, start)
+        return i < len(self.starts) and self.starts[i] < end
+
+    def free(self, start, end):
+        """Free sub-intervals of [start, end)"""
+        i = bisect_right(self.ends, start)
+        cursor = start
+        while i < len(self.starts) and self.starts[i] < end:
+            if self.starts[i] > cursor:
+                yield cursor, self.starts[i]
+            cursor = max(cursor, self.ends[i])
+            i += 1
+        if cursor < end:
+            yield cursor, end
+
+def free_slots(availability, schedule, start, end, min_length):
+    for opens, closes in windows(availability, start, end):
+        for free_start, free_end in schedule.free(opens, closes):
+            if free_end - free_start >= min_length:
+                yield free_start, free_end
+
+# ===== LOCKING =====
+# A fixed pool of locks shared out by provider id: memory stays constant
+# however many providers a process sees, and two providers only wait on
+# each other when their ids land on the same stripe
+PROVIDER_LOCK_STRIPES = 64
+_provider_locks = [threading.Lock() for _ in range(PROVIDER_LOCK_STRIPES)]
+
+@contextmanager
+def provider_lock(provider_id):
+    """Serialize booking writes for one provider within this process; the
+    database row lock taken inside covers other processes"""
+    with _provider_locks[hash(provider_id) % PROVIDER_LOCK_STRIPES]:
+        yield
@@ -0,0 +1,128 @@
+"""Working set and listing latency before and after archiving old bookings.
+
+    python benchmarks/bench_archive.py --tier 100k --days 365 --users 50
+
+On a copy of the dataset, measures the booking and payment tables and their
+indexes (SQLite's dbstat, so pages actually allocated) and the latency of the
+per-user listings, then runs `flask archive-bookings --days N` and measures:
+
+  before             everything in the hot tables
+  archived           hot tables only (the default for every listing)
+  archived + union   ?include_archived=1: hot and archive with UNION ALL
+  after vacuum       archived, once VACUUM has compacted the hot b-trees
+"""
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from dataset import create_bench_app, ensure_dataset, working_copy
+
+HOT_TABLES = ('bookings', 'payments')
+
+def percentile(samples, pct):
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))] if ordered else 0.0
+
+ENDPOINTS = {
+    'user bookings page': lambda buyer, provider: f'/api/bookings/user/{buyer}?limit=20',
+    'user bookings all': lambda buyer, provider: f'/api/bookings/user/{buyer}',
+    'provider bookings page': lambda buyer, provider: f'/api/provider/{provider}/bookings?limit=20',
+    'provider earnings': lambda buyer, provider: f'/api/providers/{provider}/earnings',
+}
+
+def working_set(db):
+    """{'rows': hot booking rows, 'kib': KiB of the hot tables and their indexes}"""
+    from sqlalchemy import bindparam, text
+    names = db.session.execute(
+        text("SELECT name FROM sqlite_master WHERE tbl_name IN :tables").bindparams(bindparam('tables', expanding=True)),
+        {'tables': list(HOT_TABLES)}
+    ).scalars().all()
+    size = db.session.execute(
+        text('SELECT COALESCE(SUM(pgsize), 0) FROM dbstat WHERE name IN :names').bindparams(bindparam('names', expanding=True)),
+        {'names': names}
+    ).scalar()
+    rows = db.session.execute(text('SELECT COUNT(*) FROM bookings')).scalar()
+    return {'rows': rows, 'kib': size / 1024}
+
+def with_query(path, query):
+    return path + ('&' if '?' in path else '?') + query if query else path
+
+def measure(app, users, args, query=''):
+    client = app.test_client()
+    results = {}
+    for name, url in ENDPOINTS.items():
+        for buyer, provider in users[:5]:
+            client.get(with_query(url(buyer, provider), query))  # warm the page and statement caches
+        samples = []
+        for _ in range(args.repeat):
+            for buyer, provider in users:
+                path = with_query(url(buyer, provider), query)
+                started = time.perf_counter()
+                response = client.get(path)
+                response.get_data()
+                samples.append((time.perf_counter() - started) * 1000)
+                assert response.status_code == 200, (path, response.status_code)
+        results[name] = (percentile(samples, 50), percentile(samples, 95))
+    return results
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--tier', default='100k')
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--days', type=int, default=365)
+    parser.add_argument('--users', type=int, default=50)
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+
+    from sqlalchemy import text
+    from extensions import db
+
+    source = ensure_dataset(args.tier, args.seed)
+    with tempfile.TemporaryDirectory() as tmp:
+        app = create_bench_app(working_copy(source, tmp))
+        app.logger.disabled = True
+        with app.app_context():
+            # The busiest buyers and providers carry the most history
+            buyers = db.session.execute(text(
+                'SELECT buyer_id FROM bookings GROUP BY buyer_id ORDER BY COUNT(*) DESC LIMIT :n'), {'n': args.users}).scalars().all()
+            providers = db.session.execute(text(
+                'SELECT provider_id FROM bookings GROUP BY provider_id ORDER BY COUNT(*) DESC LIMIT :n'), {'n': args.users}).scalars().all()
+        users = list(zip(buyers, providers))
+        random.Random(args.seed).shuffle(users)
+
+        phases = []
+
+        def phase(name, query=''):
+            with app.app_context():
+                size = working_set(db)
+                db.session.remove()
+            phases.append((name, size, measure(app, users, args, query)))
+
+        phase('before')
+        started = time.perf_counter()
+        output = app.test_cli_runner().invoke(args=['archive-bookings', '--days', str(args.days)]).output.strip()
+        print(f'{output} in {time.perf_counter() - started:.1f}s\n')
+        phase('archived')
+        phase('archived + union', 'include_archived=1')
+        with app.app_context():
+            db.session.remove()
+            with db.engine.connect() as connection:
+                connection.exec_driver_sql('VACUUM')
+                connection.exec_driver_sql('ANALYZE')
+        phase('after vacuum')
+        with app.app_context():
+            db.engine.dispose()
+
+    print(f'{"phase":17} {"hot rows":>9} {"hot KiB":>9}   ' + '   '.join(f'{name:>22}' for name in ENDPOINTS))
+    print(f'{"":17} {"":>9} {"":>9}   ' + '   '.join(f'{"p50 / p95 ms":>22}' for _ in ENDPOINTS))
+    for name, size, results in phases:
+        timings = '   '.join(f'{p50:10.2f} / {p95:9.2f}' for p50, p95 in results.values())
+        print(f'{name:17} {size["rows"]:9} {size["kib"]:9.0f}   {timings}')
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,93 @@
+"""Compare N single write requests against one batch request of N items.
+
+    python benchmarks/bench_batch.py --tier 1k --count 1000
+
+Covers service creation, booking status changes and reviews. Each mode runs
+on a fresh copy of the dataset so both sides do the same work.
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from dataset import create_bench_app, ensure_dataset, working_copy
+
+def service_items(context, count):
+    return [{
+        'title': f'Bulk Listing {i}', 'description': 'Listing created by the batch benchmark',
+        'category': 'cleaning', 'provider_id': context['provider_id'], 'price': 1500, 'city': 'Nairobi'
+    } for i in range(count)]
+
+def status_items(context, count):
+    statuses = ['confirmed', 'completed', 'cancelled', 'pending']
+    return [{'booking_id': booking_id, 'status': statuses[i % 4]} for i, booking_id in enumerate(context['bookings'][:count])]
+
+def review_items(context, count):
+    return [{
+        'booking_id': booking_id, 'reviewer_id': buyer_id, 'reviewee_id': provider_id,
+        'rating': i % 5 + 1, 'comment': 'Batch benchmark review'
+    } for i, (booking_id, buyer_id, provider_id) in enumerate(context['reviewable'][:count])]
+
+WORKLOADS = {
+    'services': (service_items, lambda item: ('POST', '/api/services', item), ('POST', '/api/services/batch', 'services')),
+    'booking status': (
+        status_items,
+        lambda item: ('PUT', f'/api/bookings/{item["booking_id"]}/status', {'status': item['status']}),
+        ('PUT', '/api/bookings/status/batch', 'updates')
+    ),
+    'reviews': (review_items, lambda item: ('POST', '/api/reviews', item), ('POST', '/api/reviews/batch', 'reviews')),
+}
+
+def load_context(app):
+    from extensions import db
+    with app.app_context():
+        session = db.session
+        return {
+            'provider_id': session.execute(db.text('SELECT MIN(provider_id) FROM services')).scalar(),
+            'bookings': session.execute(db.text('SELECT id FROM bookings ORDER BY id')).scalars().all(),
+            'reviewable': session.execute(db.text(
+                'SELECT id, buyer_id, provider_id FROM bookings ORDER BY id'
+            )).all(),
+        }
+
+def run(source, tmp, name, batched, count):
+    make_items, single, (method, url, key) = WORKLOADS[name]
+    app = create_bench_app(working_copy(source, tmp))
+    items = make_items(load_context(app), count)
+    client = app.test_client()
+    started = time.perf_counter()
+    if batched:
+        response = client.open(url, method=method, json={key: items})
+        assert response.status_code in (200, 201), response.get_json()
+    else:
+        for item in items:
+            item_method, item_url, body = single(item)
+            response = client.open(item_url, method=item_method, json=body)
+            assert response.status_code in (200, 201), response.get_json()
+    elapsed = time.perf_counter() - started
+    from extensions import db
+    with app.app_context():
+        db.engine.dispose()
+    return len(items), elapsed
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--tier', default='1k')
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--count', type=int, default=1000)
+    args = parser.parse_args()
+
+    source = ensure_dataset(args.tier, args.seed)
+    print(f'{"workload":16} {"items":>6} {"single":>10} {"batch":>10} {"speedup":>8}')
+    for name in WORKLOADS:
+        with tempfile.TemporaryDirectory() as tmp:
+            count, single_s = run(source, tmp, name, False, args.count)
+        with tempfile.TemporaryDirectory() as tmp:
+            _, batch_s = run(source, tmp, name, True, args.count)
+        print(f'{name:16} {count:6} {single_s:9.2f}s {batch_s:9.3f}s {single_s / batch_s:7.1f}x')
+
+if __name__ == '__main__':
+    main()
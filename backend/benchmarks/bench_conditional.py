@@ -0,0 +1,81 @@
+"""Full GET versus revalidation with If-None-Match on the listing routes.
+
+    python benchmarks/bench_conditional.py --tier 100k --iterations 50
+
+The first request of each route fetches the body and its ETag; the timed
+requests then send the ETag back. An unchanged resource is answered with a
+304 from the entity_versions counters, without running the listing query.
+The response cache is disabled so the full side does its real work.
+"""
+import argparse
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from dataset import create_bench_app, ensure_dataset, working_copy
+
+from sqlalchemy import event
+
+def routes(session):
+    from extensions import db
+    provider_id, service_id = session.execute(db.text(
+        'SELECT provider_id, id FROM services ORDER BY review_count DESC LIMIT 1'
+    )).one()
+    buyer_id = session.execute(db.text(
+        'SELECT buyer_id FROM bookings GROUP BY buyer_id ORDER BY COUNT(*) DESC LIMIT 1'
+    )).scalar()
+    return [
+        '/api/services',
+        f'/api/services/{service_id}',
+        '/api/bootstrap',
+        f'/api/bookings/user/{buyer_id}',
+        f'/api/provider/{provider_id}/bookings',
+        f'/api/provider/{provider_id}/dashboard',
+        f'/api/reviews/service/{service_id}',
+        f'/api/reviews/provider/{provider_id}',
+    ]
+
+def measure(client, url, iterations, headers, queries):
+    timings = []
+    for _ in range(iterations):
+        queries[0] = 0
+        started = time.perf_counter()
+        response = client.get(url, headers=headers)
+        timings.append((time.perf_counter() - started) * 1000)
+    return statistics.median(timings), queries[0], response
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--tier', default='1k')
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--iterations', type=int, default=50)
+    args = parser.parse_args()
+
+    from extensions import db
+    source = ensure_dataset(args.tier, args.seed)
+    with tempfile.TemporaryDirectory() as tmp:
+        app = create_bench_app(working_copy(source, tmp))
+        queries = [0]
+        with app.app_context():
+            urls = routes(db.session)
+            event.listen(db.engine, 'before_cursor_execute', lambda *a: queries.__setitem__(0, queries[0] + 1))
+        client = app.test_client()
+        print(f'{"route":44} {"full":>9} {"q":>3} {"KiB":>8} {"304":>9} {"q":>3} {"speedup":>8}')
+        for url in urls:
+            full_ms, full_q, response = measure(client, url, args.iterations, {}, queries)
+            etag = response.headers['ETag']
+            cond_ms, cond_q, revalidated = measure(client, url, args.iterations, {'If-None-Match': etag}, queries)
+            assert revalidated.status_code == 304, (url, revalidated.status_code)
+            print(
+                f'{url:44} {full_ms:7.2f}ms {full_q:3} {len(response.data) / 1024:8.1f}'
+                f' {cond_ms:7.2f}ms {cond_q:3} {full_ms / cond_ms:7.1f}x'
+            )
+        with app.app_context():
+            db.engine.dispose()
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,124 @@
+"""Concurrent mixed read/write throughput per database engine setup.
+
+    python benchmarks/bench_engine.py --tier 100k --duration 10 --readers 8 --writers 2
+
+Reader threads browse (service listings, a service, a buyer's bookings) while
+writer threads change booking statuses and post reviews, all through the
+Flask test client against one copy of the dataset. Modes:
+
+  rollback journal   SQLite defaults: DELETE journal, synchronous=FULL
+  wal                the configured SQLITE_PRAGMAS (WAL, synchronous=NORMAL, mmap)
+  wal + read engine  WAL plus DATABASE_READ_URL on the same file opened read-only
+"""
+import argparse
+import os
+import random
+import sys
+import tempfile
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from dataset import create_bench_app, ensure_dataset, working_copy
+
+def percentile(samples, pct):
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))] if ordered else 0.0
+
+MODES = {
+    'rollback journal': lambda path: {'SQLITE_PRAGMAS': {'journal_mode': 'delete', 'synchronous': 'full'}},
+    'wal': lambda path: {},
+    'wal + read engine': lambda path: {'DATABASE_READ_URL': f'sqlite:///file:{path}?mode=ro&uri=true'},
+}
+
+def run_mode(path, config, args):
+    from extensions import db
+    app = create_bench_app(path, **config)
+    app.logger.disabled = True
+    with app.app_context():
+        service_ids = db.session.execute(db.text('SELECT id FROM services ORDER BY id LIMIT 500')).scalars().all()
+        buyers = db.session.execute(db.text('SELECT DISTINCT buyer_id FROM bookings LIMIT 500')).scalars().all()
+        bookings = db.session.execute(db.text(
+            'SELECT id, buyer_id, provider_id FROM bookings ORDER BY id LIMIT 2000'
+        )).all()
+
+    stop = threading.Event()
+    results = {'read': [], 'write': [], 'errors': 0}
+    lock = threading.Lock()
+
+    def record(kind, started, response):
+        elapsed = (time.perf_counter() - started) * 1000
+        with lock:
+            if response.status_code >= 500:
+                results['errors'] += 1
+            else:
+                results[kind].append(elapsed)
+
+    def reader(worker):
+        rng = random.Random(args.seed + worker)
+        client = app.test_client()
+        while not stop.is_set():
+            pick = rng.random()
+            if pick < 0.4:
+                url = '/api/services?limit=20'
+            elif pick < 0.7:
+                url = f'/api/services/{rng.choice(service_ids)}'
+            else:
+                url = f'/api/bookings/user/{rng.choice(buyers)}?limit=20'
+            started = time.perf_counter()
+            record('read', started, client.get(url))
+
+    def writer(worker):
+        rng = random.Random(args.seed + 1000 + worker)
+        # Writers never set the read-your-writes cookie on the readers' clients
+        client = app.test_client()
+        while not stop.is_set():
+            booking_id, buyer_id, provider_id = rng.choice(bookings)
+            started = time.perf_counter()
+            if rng.random() < 0.5:
+                response = client.put(f'/api/bookings/{booking_id}/status', json={'status': rng.choice(['pending', 'confirmed'])})
+            else:
+                response = client.post('/api/reviews', json={
+                    'booking_id': booking_id, 'reviewer_id': buyer_id, 'reviewee_id': provider_id, 'rating': rng.randint(1, 5)
+                })
+            record('write', started, response)
+
+    threads = [threading.Thread(target=reader, args=(i,)) for i in range(args.readers)]
+    threads += [threading.Thread(target=writer, args=(i,)) for i in range(args.writers)]
+    for thread in threads:
+        thread.start()
+    time.sleep(args.duration)
+    stop.set()
+    for thread in threads:
+        thread.join()
+    with app.app_context():
+        db.engine.dispose()
+    if 'read_engine' in app.extensions:
+        app.extensions['read_engine'].dispose()
+    return results
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--tier', default='1k')
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--duration', type=float, default=10)
+    parser.add_argument('--readers', type=int, default=8)
+    parser.add_argument('--writers', type=int, default=2)
+    args = parser.parse_args()
+
+    source = ensure_dataset(args.tier, args.seed)
+    print(f'{args.readers} readers, {args.writers} writers, {args.duration:.0f}s per mode\n')
+    print(f'{"mode":18} {"reads/s":>8} {"read p50":>9} {"read p95":>9} {"writes/s":>9} {"write p50":>10} {"write p95":>10} {"5xx":>5}')
+    for name, mode_config in MODES.items():
+        with tempfile.TemporaryDirectory() as tmp:
+            path = working_copy(source, tmp)
+            r = run_mode(path, mode_config(path), args)
+        print(
+            f'{name:18} {len(r["read"]) / args.duration:8.1f} {percentile(r["read"], 50):7.2f}ms {percentile(r["read"], 95):7.2f}ms'
+            f' {len(r["write"]) / args.duration:9.1f} {percentile(r["write"], 50):8.2f}ms {percentile(r["write"], 95):8.2f}ms'
+            f' {r["errors"]:5}'
+        )
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,89 @@
+"""Event bus fan-out with thousands of idle streams.
+
+    python benchmarks/bench_events.py --streams 2000 --keepalive 15 --publishes 2000
+
+Opens --streams subscriptions, one per user, each drained by its own thread
+the way a threaded server runs an SSE response, then measures:
+
+  idle       CPU used by the process while every stream waits (keep-alives
+             included), as a share of one core
+  publish    time for one publish to one user's channel, and how long until
+             that user's stream thread has the frame
+  broadcast  one channel watched by every stream: time until all have it
+"""
+import argparse
+import os
+import statistics
+import sys
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from pubsub import EventBus, encode
+
+def percentile(samples, pct):
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))] if ordered else 0.0
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--streams', type=int, default=2000)
+    parser.add_argument('--keepalive', type=float, default=15)
+    parser.add_argument('--idle', type=float, default=5, help='seconds to measure idle CPU')
+    parser.add_argument('--publishes', type=int, default=2000)
+    args = parser.parse_args()
+
+    threading.stack_size(256 * 1024)
+    bus = EventBus()
+    bus.keepalive_seconds = args.keepalive
+    stop = threading.Event()
+    received = {}
+
+    def stream(user_id, subscription):
+        while not stop.is_set():
+            for frame in subscription.get(bus.keepalive_seconds):
+                received[user_id] = time.perf_counter()
+
+    subscriptions = [bus.subscribe([f'user:{u}', 'all']) for u in range(args.streams)]
+    threads = [threading.Thread(target=stream, args=(u, s), daemon=True) for u, s in enumerate(subscriptions)]
+    for thread in threads:
+        thread.start()
+    print(f'{args.streams} streams open, {threading.active_count() - 1} stream threads')
+
+    started, cpu = time.perf_counter(), time.process_time()
+    time.sleep(args.idle)
+    idle_cpu = (time.process_time() - cpu) / (time.perf_counter() - started)
+    print(f'idle       {idle_cpu * 100:6.2f}% of a core over {args.idle:.0f}s')
+
+    publish_us, delivery_us = [], []
+    frame = encode({'type': 'booking', 'booking_id': 1, 'status': 'confirmed'})
+    for i in range(args.publishes):
+        user_id = i * 7919 % args.streams
+        received.pop(user_id, None)
+        sent = time.perf_counter()
+        bus.publish_frame([f'user:{user_id}'], frame)
+        publish_us.append((time.perf_counter() - sent) * 1e6)
+        while user_id not in received:
+            time.sleep(0)
+        delivery_us.append((received[user_id] - sent) * 1e6)
+    print(f'publish    p50 {percentile(publish_us, 50):7.1f}us  p99 {percentile(publish_us, 99):7.1f}us   '
+          f'delivered p50 {percentile(delivery_us, 50):7.1f}us  p99 {percentile(delivery_us, 99):7.1f}us')
+
+    broadcast_ms = []
+    for _ in range(5):
+        received.clear()
+        sent = time.perf_counter()
+        bus.publish_frame(['all'], frame)
+        while len(received) < args.streams:
+            time.sleep(0.001)
+        broadcast_ms.append((max(received.values()) - sent) * 1000)
+    print(f'broadcast  {statistics.median(broadcast_ms):7.1f}ms until all {args.streams} streams have the frame')
+
+    stop.set()
+    for subscription in subscriptions:
+        bus.unsubscribe(subscription)
+    print(bus.stats())
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,77 @@
+"""Time the filtered endpoints with and without the v0002 indexes.
+
+    python benchmarks/bench_indexes.py --tier 100k
+"""
+import argparse
+import importlib
+import statistics
+import tempfile
+import time
+
+from dataset import TIERS, create_bench_app, ensure_dataset, working_copy
+
+from extensions import db
+from models import Booking, ProviderStats, Service
+
+ENDPOINTS = [
+    '/api/services?category=plumbing&min_rating=4.5',
+    '/api/services/search?category=cleaning&max_price=500&min_rating=4',
+    '/api/services/provider/{provider}',
+    '/api/categories',
+    '/api/bookings/user/{buyer}',
+    '/api/provider/{provider}/bookings',
+    '/api/provider/{provider}/dashboard',
+    '/api/reviews/provider/{provider}',
+    '/api/reviews/service/{service}',
+    '/api/providers/{provider}/earnings',
+]
+
+def sample_ids():
+    provider = db.session.scalar(
+        db.select(ProviderStats.provider_id).order_by(ProviderStats.total_bookings.desc()).limit(1)
+    )
+    buyer = db.session.scalar(db.select(Booking.buyer_id).order_by(Booking.id).limit(1))
+    service = db.session.scalar(db.select(Service.id).where(Service.provider_id == provider).limit(1))
+    return {'provider': provider, 'buyer': buyer, 'service': service}
+
+def measure(client, ids, repeat):
+    results = {}
+    for endpoint in ENDPOINTS:
+        url = endpoint.format(**ids)
+        samples = []
+        for _ in range(repeat):
+            start = time.perf_counter()
+            assert client.get(url).status_code == 200
+            samples.append((time.perf_counter() - start) * 1000)
+        results[endpoint] = statistics.median(samples)
+    return results
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--tier', default='100k', choices=sorted(TIERS))
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--seed', type=int, default=42)
+    args = parser.parse_args()
+
+    source = ensure_dataset(args.tier, args.seed)
+    with tempfile.TemporaryDirectory() as tmp:
+        app = create_bench_app(working_copy(source, tmp))
+        with app.app_context():
+            ids = sample_ids()
+            client = app.test_client()
+            indexes = importlib.import_module('migrations.v0002_filter_indexes')
+            with db.engine.begin() as connection:
+                indexes.downgrade(connection)
+            before = measure(client, ids, args.repeat)
+            with db.engine.begin() as connection:
+                indexes.upgrade(connection)
+                connection.exec_driver_sql('ANALYZE')
+            after = measure(client, ids, args.repeat)
+            db.engine.dispose()
+
+    print(f'{"endpoint":70} {"before":>10} {"after":>10}')
+    for endpoint in ENDPOINTS:
+        print(f'{endpoint:70} {before[endpoint]:8.2f}ms {after[endpoint]:8.2f}ms')
+
+if __name__ == '__main__':
+    main()
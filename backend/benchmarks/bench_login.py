@@ -0,0 +1,107 @@
+"""Login throughput under mixed load, hashing inline versus in the worker pool.
+
+    python benchmarks/bench_login.py --duration 10 --login-threads 8 --browse-threads 4
+
+Login threads post /api/auth/login as random dataset users while browse
+threads read /api/services/<id>. Inline hashing holds the GIL for the whole
+hash, so browse latency climbs with the login rate; the pool keeps browsing
+responsive and rejects the excess logins with a fast 503.
+"""
+import argparse
+import os
+import random
+import statistics
+import sys
+import tempfile
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from dataset import create_bench_app, ensure_dataset, working_copy
+from datagen import DEFAULT_PASSWORD
+
+def percentile(samples, pct):
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))]
+
+def run_mode(path, duration, login_threads, browse_threads, seed, **config):
+    from extensions import db, hasher
+    app = create_bench_app(path, **config)
+    with app.app_context():
+        emails = [row[0] for row in db.session.execute(db.text('SELECT email FROM users'))]
+        service_count = db.session.execute(db.text('SELECT MAX(id) FROM services')).scalar()
+
+    stop = threading.Event()
+    results = {'login': [], 'rejected': 0, 'failed': 0, 'browse': []}
+    lock = threading.Lock()
+
+    def login_worker(worker):
+        rng = random.Random(seed + worker)
+        client = app.test_client()
+        while not stop.is_set():
+            started = time.perf_counter()
+            response = client.post('/api/auth/login', json={'email': rng.choice(emails), 'password': DEFAULT_PASSWORD})
+            elapsed = (time.perf_counter() - started) * 1000
+            with lock:
+                if response.status_code == 200:
+                    results['login'].append(elapsed)
+                elif response.status_code == 503:
+                    results['rejected'] += 1
+                else:
+                    results['failed'] += 1
+
+    def browse_worker(worker):
+        rng = random.Random(seed + 1000 + worker)
+        client = app.test_client()
+        while not stop.is_set():
+            started = time.perf_counter()
+            client.get(f'/api/services/{rng.randint(1, service_count)}')
+            with lock:
+                results['browse'].append((time.perf_counter() - started) * 1000)
+
+    threads = [threading.Thread(target=login_worker, args=(i,)) for i in range(login_threads)]
+    threads += [threading.Thread(target=browse_worker, args=(i,)) for i in range(browse_threads)]
+    for thread in threads:
+        thread.start()
+    time.sleep(duration)
+    stop.set()
+    for thread in threads:
+        thread.join()
+    hasher.shutdown()
+    with app.app_context():
+        db.engine.dispose()
+    return results
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--tier', default='1k')
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--duration', type=float, default=10)
+    parser.add_argument('--login-threads', type=int, default=8)
+    parser.add_argument('--browse-threads', type=int, default=4)
+    parser.add_argument('--workers', type=int, default=max(1, (os.cpu_count() or 2) // 2))
+    args = parser.parse_args()
+
+    source = ensure_dataset(args.tier, args.seed)
+    modes = {
+        'inline': {'PASSWORD_HASH_WORKERS': 0, 'PASSWORD_HASH_MAX_PENDING': args.login_threads},
+        f'pool x{args.workers}': {'PASSWORD_HASH_WORKERS': args.workers},
+    }
+    print(f'{args.login_threads} login threads, {args.browse_threads} browse threads, {args.duration:.0f}s per mode\n')
+    print(f'{"mode":10} {"logins/s":>9} {"login p50":>10} {"rejected":>9} {"browse/s":>9} {"browse p50":>11} {"browse p95":>11}')
+    with tempfile.TemporaryDirectory() as tmp:
+        path = working_copy(source, tmp)
+        for name, config in modes.items():
+            r = run_mode(path, args.duration, args.login_threads, args.browse_threads, args.seed, **config)
+            print(
+                f'{name:10} {len(r["login"]) / args.duration:9.1f} {statistics.median(r["login"] or [0]):8.1f}ms'
+                f' {r["rejected"]:9} {len(r["browse"]) / args.duration:9.1f}'
+                f' {percentile(r["browse"], 50):9.1f}ms {percentile(r["browse"], 95):9.1f}ms'
+                + (f'  ({r["failed"]} failed)' if r['failed'] else '')
+            )
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,120 @@
+"""Checkout burst: initiation latency and how fast the job workers settle it.
+
+    python benchmarks/bench_payments.py --tier 1k --payments 300 --clients 8 --workers 2
+    python benchmarks/bench_payments.py --gateway mpesa --delay 0.5 --duplicate-rate 0.2
+
+Client threads post /api/payments/initiate for unpaid bookings while job
+workers drain the queue. With --gateway mpesa the workers talk to the local
+stub (mpesa_stub.py) and payments settle through its callbacks, posted to the
+app served on --app-port. The report gives initiation p50/p95, the time until
+every payment has settled and the settled rate.
+"""
+import argparse
+import os
+import sys
+import tempfile
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from dataset import create_bench_app, ensure_dataset, working_copy
+
+def percentile(samples, pct):
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))] if ordered else 0.0
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--tier', default='1k')
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--payments', type=int, default=300)
+    parser.add_argument('--clients', type=int, default=8)
+    parser.add_argument('--workers', type=int, default=2)
+    parser.add_argument('--gateway', choices=['simulated', 'mpesa'], default='simulated')
+    parser.add_argument('--delay', type=float, default=0.5, help='Stub callback delay, seconds.')
+    parser.add_argument('--duplicate-rate', type=float, default=0.0)
+    parser.add_argument('--stub-port', type=int, default=5055)
+    parser.add_argument('--app-port', type=int, default=5056)
+    args = parser.parse_args()
+    if args.workers < 1:
+        parser.error('--workers must be at least 1')
+
+    from werkzeug.serving import make_server
+    from extensions import db
+    from jobs import Worker
+    from payments import JOB_HANDLERS
+
+    config = {'JOBS_POLL_INTERVAL': 0.05}
+    servers = []
+    if args.gateway == 'mpesa':
+        import mpesa_stub
+        servers.append(mpesa_stub.serve(args.stub_port, delay=args.delay, duplicate_rate=args.duplicate_rate, seed=args.seed))
+        config.update(
+            PAYMENT_GATEWAY='mpesa', MPESA_BASE_URL=f'http://127.0.0.1:{args.stub_port}',
+            MPESA_CONSUMER_KEY='bench', MPESA_CONSUMER_SECRET='bench', MPESA_SHORTCODE='174379',
+            MPESA_PASSKEY='bench', MPESA_CALLBACK_URL=f'http://127.0.0.1:{args.app_port}/api/payments/callback'
+        )
+
+    source = ensure_dataset(args.tier, args.seed)
+    with tempfile.TemporaryDirectory() as tmp:
+        app = create_bench_app(working_copy(source, tmp), **config)
+        app.logger.disabled = True
+        if args.gateway == 'mpesa':
+            servers.append(make_server('127.0.0.1', args.app_port, app, threaded=True))
+            threading.Thread(target=servers[-1].serve_forever, daemon=True).start()
+        with app.app_context():
+            bookings = [row[0] for row in db.session.execute(db.text(
+                "SELECT id FROM bookings WHERE payment_status = 'unpaid' ORDER BY id LIMIT :n"
+            ), {'n': args.payments})]
+
+        workers = [Worker(app, JOB_HANDLERS) for _ in range(args.workers)]
+        threads = [worker.start() for worker in workers]
+        latencies, lock = [], threading.Lock()
+
+        def client(worker):
+            http = app.test_client()
+            for booking_id in bookings[worker::args.clients]:
+                started = time.perf_counter()
+                response = http.post('/api/payments/initiate', json={'booking_id': booking_id, 'phone_number': '0712345678'},
+                                     headers={'Idempotency-Key': f'bench-{booking_id}'})
+                assert response.status_code == 202, response.get_json()
+                with lock:
+                    latencies.append((time.perf_counter() - started) * 1000)
+
+        started = time.perf_counter()
+        clients = [threading.Thread(target=client, args=(i,)) for i in range(args.clients)]
+        for thread in clients:
+            thread.start()
+        for thread in clients:
+            thread.join()
+        accepted = time.perf_counter() - started
+
+        with app.app_context():
+            while True:
+                pending = db.session.execute(db.text("SELECT COUNT(*) FROM payments WHERE status = 'pending'")).scalar()
+                db.session.rollback()
+                if not pending:
+                    break
+                time.sleep(0.05)
+            settled = time.perf_counter() - started
+            outcome = dict(db.session.execute(db.text(
+                'SELECT status, COUNT(*) FROM payments WHERE idempotency_key IS NOT NULL GROUP BY status'
+            )).all())
+        for worker in workers:
+            worker.stop()
+        for thread in threads:
+            thread.join()
+        for server in servers:
+            server.shutdown()
+        with app.app_context():
+            db.engine.dispose()
+
+    print(f'{len(bookings)} checkouts, {args.clients} clients, {args.workers} workers, {args.gateway} gateway')
+    print(f'  initiate   p50 {percentile(latencies, 50):7.2f}ms  p95 {percentile(latencies, 95):7.2f}ms  '
+          f'{len(latencies) / accepted:7.1f} accepted/s')
+    print(f'  settled    {settled:7.2f}s  {len(bookings) / settled:7.1f} payments/s  {outcome}')
+
+if __name__ == '__main__':
+    main()
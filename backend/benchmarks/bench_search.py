@@ -0,0 +1,91 @@
+"""Compare /api/services/search on the FTS5 index against the old ilike scan.
+
+    python benchmarks/bench_search.py --sizes 100000 1000000
+"""
+import argparse
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import migrations
+from app import create_app
+from extensions import db
+from vocab import KENYAN_CITIES, SERVICE_CATEGORIES
+
+WORDS = [
+    'cleaning', 'plumbing', 'tutoring', 'catering', 'braiding', 'delivery', 'design',
+    'repair', 'installation', 'painting', 'gardening', 'security', 'laundry', 'photography',
+    'mathematics', 'kcse', 'wedding', 'emergency', 'professional', 'affordable', 'reliable',
+    'matatu', 'boda', 'nyama', 'choma', 'solar', 'borehole', 'roofing', 'tiling', 'carpentry',
+]
+CATEGORIES = list(SERVICE_CATEGORIES)
+CITIES = list(KENYAN_CITIES)
+QUERIES = ['plumb', 'wedding catering', 'kcse math', 'solar installation', 'borehole']
+
+def filler_vocabulary(rng, size=5000):
+    syllables = ['ka', 'mu', 'ti', 'na', 'wa', 'ji', 'ro', 'se', 'lu', 'mbe', 'nyo', 'zi', 'pa', 'he']
+    return [''.join(rng.choices(syllables, k=rng.randint(2, 4))) for _ in range(size)]
+
+def populate(app, count, rng):
+    with app.app_context():
+        migrations.upgrade(db.engine)
+        db.session.execute(db.text(
+            "INSERT INTO users (id, name, email, password_hash, role) "
+            "VALUES (1, 'Bench Provider', 'bench@example.com', 'x', 'provider')"
+        ))
+        filler = filler_vocabulary(rng)
+        rows = []
+        for i in range(count):
+            rows.append({
+                'title': ' '.join(rng.choices(WORDS, k=1) + rng.choices(filler, k=3)).title(),
+                'description': ' '.join(rng.choices(filler, k=60) + rng.choices(WORDS, k=2)),
+                'category': rng.choice(CATEGORIES),
+                'city': rng.choice(CITIES),
+                'price': rng.randint(200, 30000),
+            })
+            if len(rows) == 10000 or i == count - 1:
+                db.session.execute(db.text(
+                    "INSERT INTO services (title, description, category, provider_id, price, city, rating, review_count, is_active) "
+                    "VALUES (:title, :description, :category, 1, :price, :city, 0, 0, 1)"
+                ), rows)
+                rows = []
+        db.session.commit()
+
+def time_queries(client, repeat):
+    timings = {}
+    for q in QUERIES:
+        samples = []
+        for _ in range(repeat):
+            start = time.perf_counter()
+            response = client.get('/api/services/search', query_string={'q': q, 'city': 'Nairobi'})
+            samples.append((time.perf_counter() - start) * 1000)
+            assert response.status_code == 200
+        timings[q] = (statistics.median(samples), len(response.get_json()))
+    return timings
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--sizes', type=int, nargs='+', default=[100000, 1000000])
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--seed', type=int, default=42)
+    args = parser.parse_args()
+
+    for size in args.sizes:
+        with tempfile.TemporaryDirectory() as tmp:
+            app = create_app({'SQLALCHEMY_DATABASE_URI': f'sqlite:///{os.path.join(tmp, "bench.db")}'})
+            start = time.perf_counter()
+            populate(app, size, random.Random(args.seed))
+            print(f'\n{size:,} services (loaded in {time.perf_counter() - start:.1f}s)')
+            client = app.test_client()
+            for engine in ('ilike', 'fts5'):
+                app.config['SEARCH_FTS'] = engine == 'fts5'
+                for q, (ms, hits) in time_queries(client, args.repeat).items():
+                    print(f'  {engine:5}  {q!r:24} {ms:9.2f} ms  {hits:7} hits')
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,113 @@
+"""CPU time to build a listing response, per 10k rows.
+
+    python benchmarks/bench_serialize.py --tier 100k --rows 10000 --repeat 5
+
+Compares, for the service list and booking list shapes:
+
+  entities   full ORM entities with joined eager loads, dumped attribute by
+             attribute (how listings were built before column projection)
+  projected  the shape's column projection and generated dump function
+  + orjson   the projection encoded by the orjson JSON provider
+
+and splits each into fetch (query, rows or entities, dicts) and encode time.
+CPU time is process time, so waiting on the disk is not counted.
+"""
+import argparse
+import os
+import statistics
+import sys
+import tempfile
+import time
+from operator import attrgetter
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from dataset import create_bench_app, ensure_dataset, working_copy
+
+def entity_loader(shape):
+    """Loader options and dump function reading the shape from entities"""
+    from sqlalchemy.orm import joinedload
+    from serializers import Field
+
+    options = {}
+    for path in shape._joins:
+        entity, option = shape.model, None
+        for name in path.split('.'):
+            attribute = getattr(entity, name)
+            option = joinedload(attribute) if option is None else option.joinedload(attribute)
+            entity = attribute.property.mapper.class_
+        options[path] = option
+    # Only the longest chains are needed; a chain loads its prefixes too
+    chains = [option for path, option in options.items() if not any(p.startswith(path + '.') for p in options)]
+
+    def compile_fields(fields):
+        getters = []
+        for key, source in fields:
+            if isinstance(source, list):
+                getters.append((key, compile_fields(source)))
+            elif isinstance(source, Field):
+                get, convert = attrgetter(source.path), source.convert
+                getters.append((key, lambda obj, get=get, convert=convert: convert(get(obj))))
+            else:
+                getters.append((key, attrgetter(source)))
+        return lambda obj: {key: get(obj) for key, get in getters}
+
+    return chains, compile_fields(shape.fields)
+
+def measure(fetch, encode, repeat):
+    fetch_ms, encode_ms, rows = [], [], 0
+    for _ in range(repeat):
+        started = time.process_time()
+        items = fetch()
+        fetched = time.process_time()
+        encode(items)
+        fetch_ms.append((fetched - started) * 1000)
+        encode_ms.append((time.process_time() - fetched) * 1000)
+        rows = len(items)
+    return rows, statistics.median(fetch_ms), statistics.median(encode_ms)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--tier', default='100k')
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--rows', type=int, default=10000)
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    from flask.json.provider import DefaultJSONProvider
+    from extensions import db
+    from json_provider import OrjsonProvider, orjson
+    from models import Booking, Service
+    from serializers import SERVICE_LIST, USER_BOOKING
+
+    source = ensure_dataset(args.tier, args.seed)
+    with tempfile.TemporaryDirectory() as tmp:
+        app = create_bench_app(working_copy(source, tmp))
+        encoders = {'stdlib': DefaultJSONProvider(app)}
+        if orjson is not None:
+            encoders['orjson'] = OrjsonProvider(app)
+        shapes = [
+            ('services', SERVICE_LIST, lambda: Service.query.filter_by(is_active=True).order_by(Service.id)),
+            ('bookings', USER_BOOKING, lambda: Booking.query.order_by(Booking.id)),
+        ]
+        print(f'{"shape":9} {"mode":18} {"rows":>6} {"fetch":>10} {"encode":>10} {"total":>10}   per 10k rows, CPU ms')
+        with app.app_context():
+            for name, shape, base in shapes:
+                chains, entity_dump = entity_loader(shape)
+                modes = [
+                    ('entities', lambda: [entity_dump(obj) for obj in base().options(*chains).limit(args.rows)], 'stdlib'),
+                    ('projected', lambda: shape.dump_many(shape.query(base()).limit(args.rows)), 'stdlib'),
+                    ('projected + orjson', lambda: shape.dump_many(shape.query(base()).limit(args.rows)), 'orjson'),
+                ]
+                for mode, fetch, encoder in modes:
+                    if encoder not in encoders:
+                        continue
+                    rows, fetch_ms, encode_ms = measure(fetch, encoders[encoder].dumps, args.repeat)
+                    db.session.expunge_all()
+                    scale = 10000 / rows
+                    print(f'{name:9} {mode:18} {rows:6} {fetch_ms * scale:8.1f}ms {encode_ms * scale:8.1f}ms '
+                          f'{(fetch_ms + encode_ms) * scale:8.1f}ms')
+            db.engine.dispose()
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,58 @@
+"""Shared helpers for the benchmark scripts: tiered datasets and bench apps."""
+import os
+import shutil
+import sys
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+
+DATA_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '.data')
+
+# Dataset tiers are named after their booking count, the largest table
+TIERS = {
+    '1k': {'users': 100, 'services': 50, 'bookings': 1000},
+    '100k': {'users': 10000, 'services': 5000, 'bookings': 100000},
+    '1m': {'users': 100000, 'services': 50000, 'bookings': 1000000},
+}
+
+def create_bench_app(database_path, **config):
+    """App bound to `database_path` with the response cache off unless asked
+    for, and event streams on: a bench app is a single process"""
+    from app import create_app
+    settings = {'SQLALCHEMY_DATABASE_URI': f'sqlite:///{database_path}', 'CACHE_BACKEND': 'null', 'EVENTS_STREAMS': 'on'}
+    settings.update(config)
+    return create_app(settings)
+
+def ensure_dataset(tier, seed=42, log=print):
+    """Path to a generated database for `tier`, built on first use and reused after"""
+    import migrations
+    from datagen import generate
+    from extensions import db
+
+    path = os.path.join(DATA_DIR, f'{tier}-seed{seed}.db')
+    if os.path.exists(path):
+        # Bring datasets built by an older tree up to the current schema
+        app = create_bench_app(path)
+        with app.app_context():
+            migrations.upgrade(db.engine)
+            db.engine.dispose()
+        return path
+    os.makedirs(DATA_DIR, exist_ok=True)
+    building = path + '.building'
+    if os.path.exists(building):
+        os.remove(building)
+    log(f'Building {tier} dataset at {path}')
+    app = create_bench_app(building)
+    with app.app_context():
+        migrations.upgrade(db.engine)
+        with db.engine.begin() as connection:
+            generate(connection, seed=seed, log=log, **TIERS[tier])
+        db.engine.dispose()
+    os.replace(building, path)
+    return path
+
+def working_copy(path, directory):
+    """Copy a dataset so write benchmarks never alter the cached original"""
+    target = os.path.join(directory, os.path.basename(path))
+    shutil.copyfile(path, target)
+    return target
@@ -0,0 +1,377 @@
+"""Endpoint benchmark suite: every route in register_routes, per dataset tier.
+
+    python benchmarks/suite.py --tiers 1k 100k --output benchmarks/results.json
+    python benchmarks/suite.py --tiers 1k --baseline benchmarks/results.json
+
+Each route runs through the Flask test client against a copy of a generated
+dataset. The suite records throughput, p50/p95/p99 latency, SQL query count
+and peak traced memory per request. With --baseline it exits non-zero when
+an endpoint's p95 regresses past --max-regression or it issues more queries
+than before. Every registered route needs a case in CASES. A route without
+one fails the run, so new endpoints cannot slip through unmeasured.
+"""
+import argparse
+import gc
+import json
+import platform
+import statistics
+import sys
+import tempfile
+import time
+import tracemalloc
+from collections import namedtuple
+from datetime import datetime, timedelta
+
+from dataset import TIERS, create_bench_app, ensure_dataset, working_copy
+
+from sqlalchemy import event, func, select, update
+
+Case = namedtuple('Case', 'request max_iterations', defaults=(None,))
+
+class Samples:
+    """Ids from the dataset that make each request do representative work"""
+
+    def __init__(self):
+        from datagen import DEFAULT_PASSWORD
+        from extensions import db
+        from models import User, Service, Booking, Payment, Review, ProviderStats
+
+        session = db.session
+        self.password = DEFAULT_PASSWORD
+        self.provider_id = session.scalar(
+            select(ProviderStats.provider_id).order_by(ProviderStats.total_bookings.desc()).limit(1)
+        )
+        self.buyer_id = session.scalar(
+            select(Booking.buyer_id).group_by(Booking.buyer_id).order_by(func.count().desc()).limit(1)
+        )
+        self.buyer_email = session.get(User, self.buyer_id).email
+        self.service_id = session.scalar(
+            select(Service.id).where(Service.provider_id == self.provider_id).order_by(Service.review_count.desc()).limit(1)
+        )
+        service = session.get(Service, self.service_id)
+        self.category = service.category
+        self.lat, self.lng = service.lat, service.lng
+        # Hour-long openings far enough ahead that generated bookings never collide
+        from availability import service_availability, windows
+        start = datetime(2030, 1, 1)
+        self.openings = [
+            opens + timedelta(hours=h)
+            for opens, closes in windows(service_availability(service), start, start + timedelta(days=90))
+            for h in range(int((closes - opens).total_seconds() // 3600))
+        ]
+        self.booking_ids = session.scalars(
+            select(Booking.id).where(Booking.provider_id == self.provider_id).order_by(Booking.id).limit(500)
+        ).all()
+        self.payment_id = session.scalar(select(func.max(Payment.id)))
+        self.unpaid_booking_ids = session.scalars(
+            select(Booking.id).where(Booking.payment_status == 'unpaid').order_by(Booking.id).limit(500)
+        ).all()
+        # A payment awaiting its M-Pesa callback; repeats exercise the duplicate path
+        self.checkout_request_id = 'ws_CO_BENCH'
+        session.execute(update(Payment).where(Payment.id == self.payment_id).values(checkout_request_id=self.checkout_request_id))
+        session.commit()
+        self.review_target = session.scalar(select(func.max(Review.booking_id)))
+
+    def booking(self, i):
+        return self.booking_ids[i % len(self.booking_ids)]
+
+CASES = {
+    'health_check': {
+        'default': Case(lambda s, i: ('GET', '/api/health', None)),
+    },
+    'ready_check': {
+        'default': Case(lambda s, i: ('GET', '/api/ready', None)),
+    },
+    'cache_stats_route': {
+        'default': Case(lambda s, i: ('GET', '/api/_cache/stats', None)),
+    },
+    'metrics_route': {
+        'default': Case(lambda s, i: ('GET', '/api/_metrics', None)),
+    },
+    'register_user_route': {
+        'default': Case(lambda s, i: ('POST', '/api/auth/register', {
+            'name': 'Bench User', 'email': f'bench.{time.time_ns()}@example.com',
+            'password': s.password, 'role': 'buyer'
+        }), max_iterations=10),
+    },
+    'login_user_route': {
+        'default': Case(lambda s, i: ('POST', '/api/auth/login', {
+            'email': s.buyer_email, 'password': s.password
+        }), max_iterations=10),
+    },
+    'get_all_services_route': {
+        'all': Case(lambda s, i: ('GET', '/api/services', None), max_iterations=10),
+        'category': Case(lambda s, i: ('GET', f'/api/services?category={s.category}&min_rating=4', None)),
+        'page': Case(lambda s, i: ('GET', '/api/services?limit=50', None)),
+        'relevance': Case(lambda s, i: ('GET', '/api/services?sort=relevance&limit=50', None)),
+        'category_sorted': Case(lambda s, i: ('GET', f'/api/services?category={s.category}&sort={("rating", "price", "relevance")[i % 3]}&limit=20', None)),
+    },
+    'get_single_service_route': {
+        'default': Case(lambda s, i: ('GET', f'/api/services/{s.service_id}', None)),
+    },
+    'get_provider_services_route': {
+        'default': Case(lambda s, i: ('GET', f'/api/services/provider/{s.provider_id}', None)),
+    },
+    'create_new_service_route': {
+        'default': Case(lambda s, i: ('POST', '/api/services', {
+            'title': f'Benchmark Cleaning {i}', 'description': 'Benchmark service description',
+            'category': s.category, 'provider_id': s.provider_id, 'price': 1500, 'city': 'Nairobi'
+        })),
+    },
+    'create_services_batch_route': {
+        'default': Case(lambda s, i: ('POST', '/api/services/batch', {'provider_id': s.provider_id, 'services': [{
+            'title': f'Benchmark Batch {i}-{j}', 'description': 'Benchmark service description',
+            'category': s.category, 'price': 1500, 'city': 'Nairobi'
+        } for j in range(50)]})),
+    },
+    'get_my_services_route': {
+        'default': Case(lambda s, i: ('GET', f'/api/me/services?user_id={s.provider_id}', None)),
+    },
+    'get_service_slots_route': {
+        'week': Case(lambda s, i: ('GET', f'/api/services/{s.service_id}/slots?from=2025-06-02&to=2025-06-09', None)),
+    },
+    'create_new_booking_route': {
+        'default': Case(lambda s, i: ('POST', '/api/bookings', {
+            'service_id': s.service_id, 'buyer_id': s.buyer_id,
+            'booking_date': s.openings[i % len(s.openings)].isoformat()
+        })),
+    },
+    'get_user_bookings_route': {
+        'all': Case(lambda s, i: ('GET', f'/api/bookings/user/{s.buyer_id}', None)),
+        'page': Case(lambda s, i: ('GET', f'/api/bookings/user/{s.buyer_id}?limit=20', None)),
+        'archived': Case(lambda s, i: ('GET', f'/api/bookings/user/{s.buyer_id}?limit=20&include_archived=1', None)),
+    },
+    'update_booking_status_route': {
+        'default': Case(lambda s, i: ('PUT', f'/api/bookings/{s.booking(i)}/status', {
+            'status': 'confirmed' if i % 2 else 'pending'
+        })),
+    },
+    'update_booking_statuses_batch_route': {
+        'default': Case(lambda s, i: ('PUT', '/api/bookings/status/batch', {'updates': [
+            {'booking_id': s.booking(i * 50 + j), 'status': 'confirmed' if (i + j) % 2 else 'pending'} for j in range(50)
+        ]})),
+    },
+    'create_new_review_route': {
+        'default': Case(lambda s, i: ('POST', '/api/reviews', {
+            'booking_id': s.review_target, 'reviewer_id': s.buyer_id,
+            'reviewee_id': s.provider_id, 'rating': i % 5 + 1
+        })),
+    },
+    'create_reviews_batch_route': {
+        'default': Case(lambda s, i: ('POST', '/api/reviews/batch', {'reviews': [{
+            'booking_id': s.review_target, 'reviewer_id': s.buyer_id,
+            'reviewee_id': s.provider_id, 'rating': (i + j) % 5 + 1
+        } for j in range(50)]})),
+    },
+    'get_service_reviews_route': {
+        'default': Case(lambda s, i: ('GET', f'/api/reviews/service/{s.service_id}', None)),
+    },
+    'get_provider_reviews_route': {
+        'all': Case(lambda s, i: ('GET', f'/api/reviews/provider/{s.provider_id}', None)),
+        'page': Case(lambda s, i: ('GET', f'/api/reviews/provider/{s.provider_id}?limit=20', None)),
+    },
+    'get_all_categories_route': {
+        'default': Case(lambda s, i: ('GET', '/api/categories', None)),
+    },
+    'suggest_route': {
+        'prefix': Case(lambda s, i: ('GET', f'/api/suggest?q={s.category[:3 + i % 3]}', None)),
+        'short': Case(lambda s, i: ('GET', f'/api/suggest?q={s.category[:2]}', None)),
+    },
+    'bootstrap_route': {
+        'default': Case(lambda s, i: ('GET', '/api/bootstrap', None)),
+    },
+    'search_services_route': {
+        'text': Case(lambda s, i: ('GET', '/api/services/search?q=plumbing', None)),
+        'filters': Case(lambda s, i: ('GET', f'/api/services/search?category={s.category}&max_price=3000&min_rating=4', None)),
+        'sorted': Case(lambda s, i: ('GET', '/api/services/search?q=plumbing&sort=rating&limit=20', None)),
+    },
+    'nearby_services_route': {
+        'default': Case(lambda s, i: ('GET', f'/api/services/nearby?lat={s.lat}&lng={s.lng}&radius_km=10', None)),
+        'filters': Case(lambda s, i: ('GET', f'/api/services/nearby?lat={s.lat}&lng={s.lng}&radius_km=25&category={s.category}&max_price=3000', None)),
+    },
+    'provider_dashboard_route': {
+        'default': Case(lambda s, i: ('GET', f'/api/provider/{s.provider_id}/dashboard', None)),
+    },
+    'provider_bookings_route': {
+        'all': Case(lambda s, i: ('GET', f'/api/provider/{s.provider_id}/bookings', None)),
+        'page': Case(lambda s, i: ('GET', f'/api/provider/{s.provider_id}/bookings?limit=20', None)),
+        'archived': Case(lambda s, i: ('GET', f'/api/provider/{s.provider_id}/bookings?limit=20&include_archived=1', None)),
+    },
+    'initiate_payment_route': {
+        'default': Case(lambda s, i: ('POST', '/api/payments/initiate', {
+            'booking_id': s.unpaid_booking_ids[i % len(s.unpaid_booking_ids)], 'phone_number': '+254700000000'
+        })),
+    },
+    'payment_callback_route': {
+        'default': Case(lambda s, i: ('POST', '/api/payments/callback', {'Body': {'stkCallback': {
+            'MerchantRequestID': f'BENCH-{i}', 'CheckoutRequestID': s.checkout_request_id, 'ResultCode': 0,
+            'ResultDesc': 'The service request is processed successfully.',
+            'CallbackMetadata': {'Item': [{'Name': 'MpesaReceiptNumber', 'Value': f'BENCH{i}'}]}
+        }}})),
+    },
+    'confirm_payment_route': {
+        'default': Case(lambda s, i: ('POST', '/api/payments/confirm', {
+            'payment_id': s.payment_id, 'mpesa_receipt': f'BENCH{i}'
+        })),
+    },
+    'get_payment_route': {
+        'default': Case(lambda s, i: ('GET', f'/api/payments/{s.payment_id}', None)),
+    },
+    'get_provider_earnings_route': {
+        'default': Case(lambda s, i: ('GET', f'/api/providers/{s.provider_id}/earnings', None)),
+        'archived': Case(lambda s, i: ('GET', f'/api/providers/{s.provider_id}/earnings?include_archived=1', None)),
+    },
+    'get_provider_earnings_series_route': {
+        'default': Case(lambda s, i: ('GET', f'/api/providers/{s.provider_id}/earnings/series?from=2024-01-01&to=2025-12-31&granularity=week', None)),
+    },
+    'complete_booking_route': {
+        'default': Case(lambda s, i: ('POST', '/api/bookings/complete', {'booking_id': s.booking(i)})),
+    },
+    'get_completed_unpaid_bookings_route': {
+        'default': Case(lambda s, i: ('GET', f'/api/users/{s.buyer_id}/completed-unpaid', None)),
+    },
+    'stream_user_events_route': {
+        # Opens the stream and lets it end at once: the cost of connecting
+        'connect': Case(lambda s, i: ('GET', f'/api/stream/users/{s.buyer_id}?timeout=0', None)),
+    },
+}
+
+def percentile(sorted_values, p):
+    index = min(len(sorted_values) - 1, max(0, round(p / 100 * (len(sorted_values) - 1))))
+    return sorted_values[index]
+
+class QueryCounter:
+
+    def __init__(self, engine):
+        self.count = 0
+        event.listen(engine, 'before_cursor_execute', self._on_execute)
+
+    def _on_execute(self, *args):
+        self.count += 1
+
+def run_case(client, counter, case, samples, iterations, warmup):
+    iterations = min(iterations, case.max_iterations or iterations)
+    gc.collect()
+    for i in range(warmup):
+        method, url, body = case.request(samples, i)
+        client.open(url, method=method, json=body)
+
+    latencies, queries, statuses = [], [], set()
+    for i in range(warmup, warmup + iterations):
+        method, url, body = case.request(samples, i)
+        counter.count = 0
+        start = time.perf_counter()
+        response = client.open(url, method=method, json=body)
+        response.get_data()
+        latencies.append((time.perf_counter() - start) * 1000)
+        queries.append(counter.count)
+        statuses.add(response.status_code)
+
+    # Memory is traced in a separate request: tracemalloc distorts timings
+    method, url, body = case.request(samples, warmup + iterations)
+    tracemalloc.start()
+    client.open(url, method=method, json=body).get_data()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    latencies.sort()
+    return {
+        'method': method,
+        'url': url,
+        'iterations': iterations,
+        'statuses': sorted(statuses),
+        'throughput_rps': round(iterations / (sum(latencies) / 1000), 2),
+        'p50_ms': round(percentile(latencies, 50), 3),
+        'p95_ms': round(percentile(latencies, 95), 3),
+        'p99_ms': round(percentile(latencies, 99), 3),
+        'mean_ms': round(statistics.fmean(latencies), 3),
+        'queries': max(queries),
+        'peak_memory_kb': round(peak / 1024, 1),
+    }
+
+def run_tier(tier, args):
+    from extensions import db
+
+    source = ensure_dataset(tier, args.seed)
+    with tempfile.TemporaryDirectory() as tmp:
+        config = {'CACHE_BACKEND': 'memory'} if args.cache else {}
+        app = create_bench_app(working_copy(source, tmp), **config)
+        # Failing routes show up in 'statuses'; their tracebacks would drown the report
+        app.logger.disabled = True
+        with app.app_context():
+            samples = Samples()
+            counter = QueryCounter(db.engine)
+            client = app.test_client()
+            endpoints = sorted(rule.endpoint for rule in app.url_map.iter_rules() if rule.endpoint != 'static')
+            missing = [endpoint for endpoint in endpoints if endpoint not in CASES]
+            if missing:
+                raise SystemExit(f'No benchmark case for: {", ".join(missing)}')
+
+            results = {}
+            for endpoint in endpoints:
+                if args.only and not any(name in endpoint for name in args.only):
+                    continue
+                for variant, case in CASES[endpoint].items():
+                    key = f'{endpoint}[{variant}]'
+                    results[key] = run_case(client, counter, case, samples, args.iterations, args.warmup)
+                    result = results[key]
+                    print(f'  {key:55} p50 {result["p50_ms"]:9.2f}ms  p95 {result["p95_ms"]:9.2f}ms  '
+                          f'{result["throughput_rps"]:9.1f} rps  {result["queries"]:3} q  '
+                          f'{result["peak_memory_kb"]:9.1f} KiB  {result["statuses"]}')
+            db.engine.dispose()
+    return results
+
+def compare(current, baseline, max_regression, noise_floor_ms):
+    """Return a list of human-readable regressions against a baseline run"""
+    regressions = []
+    for tier, results in current['tiers'].items():
+        for key, result in results.items():
+            before = baseline.get('tiers', {}).get(tier, {}).get(key)
+            if not before:
+                continue
+            slower = result['p95_ms'] - before['p95_ms']
+            if slower > noise_floor_ms and result['p95_ms'] > before['p95_ms'] * (1 + max_regression):
+                regressions.append(f'{tier} {key}: p95 {before["p95_ms"]:.2f}ms -> {result["p95_ms"]:.2f}ms')
+            if result['queries'] > before['queries']:
+                regressions.append(f'{tier} {key}: queries {before["queries"]} -> {result["queries"]}')
+    return regressions
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--tiers', nargs='+', default=['1k'], choices=sorted(TIERS))
+    parser.add_argument('--iterations', type=int, default=30)
+    parser.add_argument('--warmup', type=int, default=3)
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--only', nargs='+', help='Only run endpoints whose name contains one of these.')
+    parser.add_argument('--cache', action='store_true', help='Leave the response cache on.')
+    parser.add_argument('--output', help='Write results as JSON to this file.')
+    parser.add_argument('--baseline', help='Fail if results regress against this JSON file.')
+    parser.add_argument('--max-regression', type=float, default=0.25, help='Allowed p95 slowdown, as a fraction.')
+    parser.add_argument('--noise-floor-ms', type=float, default=1.0, help='Ignore p95 changes smaller than this.')
+    args = parser.parse_args()
+
+    report = {
+        'seed': args.seed,
+        'iterations': args.iterations,
+        'python': platform.python_version(),
+        'tiers': {}
+    }
+    for tier in args.tiers:
+        print(f'Tier {tier} ({TIERS[tier]["bookings"]:,} bookings)')
+        report['tiers'][tier] = run_tier(tier, args)
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2, sort_keys=True)
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            regressions = compare(report, json.load(f), args.max_regression, args.noise_floor_ms)
+        for regression in regressions:
+            print(f'REGRESSION {regression}')
+        if regressions:
+            sys.exit(1)
+        print('No regressions against baseline')
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,210 @@
+import hashlib
+import inspect
+import pickle
+import threading
+import time
+from collections import OrderedDict, defaultdict
+from functools import wraps
+from flask import Response, g, request
+
+# ===== BACKENDS =====
+class MemoryBackend:
+    """In-process LRU with per-entry TTL and a tag -> keys index"""
+
+    def __init__(self, max_entries=1024):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._tags = defaultdict(set)
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            value, expires_at, tags = entry
+            if expires_at < time.monotonic():
+                self._discard(key)
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key, value, ttl, tags=()):
+        with self._lock:
+            self._discard(key)
+            self._entries[key] = (value, time.monotonic() + ttl, tuple(tags))
+            for tag in tags:
+                self._tags[tag].add(key)
+            while len(self._entries) > self.max_entries:
+                self._discard(next(iter(self._entries)))
+
+    def invalidate_tags(self, tags):
+        with self._lock:
+            for tag in tags:
+                for key in list(self._tags.pop(tag, ())):
+                    self._discard(key)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._tags.clear()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def _discard(self, key):
+        entry = self._entries.pop(key, None)
+        if entry is None:
+            return
+        for tag in entry[2]:
+            keys = self._tags.get(tag)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._tags[tag]
+
+class RedisBackend:
+    """Shared cache for multi-process deployments.
+
+    `client` is anything speaking the redis-py API, so a local stand-in such
+    as fakeredis can replace a real server in tests.
+    """
+
+    def __init__(self, client, prefix='cache:'):
+        self.client = client
+        self.prefix = prefix
+
+    def get(self, key):
+        raw = self.client.get(self.prefix + key)
+        return pickle.loads(raw) if raw is not None else None
+
+    def set(self, key, value, ttl, tags=()):
+        pipe = self.client.pipeline()
+        pipe.set(self.prefix + key, pickle.dumps(value), ex=max(1, int(ttl)))
+        for tag in tags:
+            pipe.sadd(self.prefix + 'tag:' + tag, key)
+            pipe.expire(self.prefix + 'tag:' + tag, max(1, int(ttl)))
+        pipe.execute()
+
+    def invalidate_tags(self, tags):
+        for tag in tags:
+            tag_key = self.prefix + 'tag:' + tag
+            keys = self.client.smembers(tag_key)
+            pipe = self.client.pipeline()
+            for key in keys:
+                pipe.delete(self.prefix + (key.decode() if isinstance(key, bytes) else key))
+            pipe.delete(tag_key)
+            pipe.execute()
+
+    def clear(self):
+        keys = list(self.client.scan_iter(self.prefix + '*'))
+        if keys:
+            self.client.delete(*keys)
+
+# ===== RESPONSE CACHE =====
+class ResponseCache:
+    """Read-through cache for GET responses, invalidated by tag on writes.
+
+    Configuration:
+      CACHE_BACKEND      'memory' (default), 'redis' or 'null'
+      CACHE_REDIS_URL    used when CACHE_BACKEND is 'redis'
+      CACHE_DEFAULT_TTL  seconds, default 300
+      CACHE_MAX_ENTRIES  memory backend size, default 1024
+    """
+
+    def __init__(self, app=None):
+        self.backend = MemoryBackend()
+        self.default_ttl = 300
+        self.enabled = True
+        self._stats = defaultdict(lambda: {'hits': 0, 'misses': 0})
+        self._invalidations = 0
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        kind = app.config.setdefault('CACHE_BACKEND', 'memory')
+        self.default_ttl = app.config.setdefault('CACHE_DEFAULT_TTL', 300)
+        self.enabled = kind != 'null'
+        if kind == 'redis':
+            import redis
+            self.backend = RedisBackend(redis.Redis.from_url(app.config['CACHE_REDIS_URL']))
+        else:
+            self.backend = MemoryBackend(app.config.setdefault('CACHE_MAX_ENTRIES', 1024))
+        app.extensions['response_cache'] = self
+
+    def cached(self, endpoint, tags, ttl=None):
+        """Cache a controller's 200 responses under endpoint + normalized args.
+
+        `tags(**view_args)` returns the tags the response depends on; any
+        write that invalidates one of them evicts the entry. Cached responses
+        carry an ETag, and a matching If-None-Match gets a bodiless 304.
+
+        Under @conditional the key includes its ETag (versions.py), so a write
+        anywhere moves the key even when this process's entry was not
+        invalidated, and a stale entry is never sent under a newer ETag.
+        """
+        def decorator(f):
+            signature = inspect.signature(f)
+
+            @wraps(f)
+            def wrapper(*args, **kwargs):
+                if not self.enabled or 'stream' in request.args:
+                    return f(*args, **kwargs)
+                view_args = signature.bind(*args, **kwargs).arguments
+                key = self.make_key(endpoint, view_args)
+                hit = self.backend.get(key)
+                stats = self._stats[endpoint]
+                if hit is not None:
+                    stats['hits'] += 1
+                    body, status, mimetype, etag = hit
+                    if etag in request.if_none_match:
+                        return self._not_modified(etag)
+                    response = Response(body, status=status, mimetype=mimetype)
+                    response.set_etag(etag)
+                    return response
+                stats['misses'] += 1
+                response = f(*args, **kwargs)
+                if isinstance(response, Response) and response.status_code == 200:
+                    body = response.get_data()
+                    etag = hashlib.sha1(body).hexdigest()
+                    self.backend.set(
+                        key,
+                        (body, response.status_code, response.mimetype, etag),
+                        ttl or self.default_ttl,
+                        tags(**view_args)
+                    )
+                    response.set_etag(etag)
+                    if etag in request.if_none_match:
+                        return self._not_modified(etag)
+                return response
+            return wrapper
+        return decorator
+
+    @staticmethod
+    def _not_modified(etag):
+        response = Response(status=304)
+        response.set_etag(etag)
+        return response
+
+    @staticmethod
+    def make_key(endpoint, view_args):
+        args = sorted(request.args.items(multi=True))
+        return repr((endpoint, sorted(view_args.items()), args, g.get('resource_etag')))
+
+    def invalidate(self, *tags):
+        self._invalidations += 1
+        self.backend.invalidate_tags([tag for tag in tags if tag])
+
+    def clear(self):
+        self.backend.clear()
+
+    def stats(self):
+        endpoints = {}
+        for endpoint, counts in self._stats.items():
+            total = counts['hits'] + counts['misses']
+            endpoints[endpoint] = dict(counts, hit_rate=counts['hits'] / total if total else 0.0)
+        return {
+            'backend': type(self.backend).__name__,
+            'invalidations': self._invalidations,
+            'endpoints': endpoints
+        }
@@ -0,0 +1,144 @@
+import click
+from extensions import db, cache
+
+def register_commands(app):
+
+    @app.cli.command('db-upgrade')
+    @click.option('--to', 'target', type=int, help='Stop at this migration version.')
+    def db_upgrade(target):
+        """Apply pending schema migrations."""
+        import migrations
+        applied = migrations.upgrade(db.engine, target)
+        for version, name in applied:
+            click.echo(f'Applied {version:04d}_{name}')
+        click.echo(f'Schema is at version {migrations.current_version(db.engine)}')
+
+    @app.cli.command('db-downgrade')
+    @click.option('--to', 'target', type=int, required=True, help='Version to revert to.')
+    def db_downgrade(target):
+        """Revert schema migrations newer than --to."""
+        import migrations
+        for version, name in migrations.downgrade(db.engine, target):
+            click.echo(f'Reverted {version:04d}_{name}')
+        click.echo(f'Schema is at version {migrations.current_version(db.engine)}')
+
+    @app.cli.command('rebuild-provider-stats')
+    def rebuild_provider_stats_command():
+        """Recompute the provider_stats table from bookings and services."""
+        from stats import rebuild_provider_stats
+        with db.engine.begin() as connection:
+            count = rebuild_provider_stats(connection)
+        click.echo(f'Rebuilt stats for {count} providers')
+
+    @app.cli.command('rebuild-ratings')
+    def rebuild_ratings_command():
+        """Recompute service and provider rating aggregates from reviews, and
+        the ranking scores that depend on them."""
+        from stats import rebuild_ratings, rescore_services
+        with db.engine.begin() as connection:
+            services, providers = rebuild_ratings(connection)
+            rescore_services(connection)
+        click.echo(f'Rebuilt ratings for {services} services and {providers} providers')
+
+    @app.cli.command('rebuild-daily-earnings')
+    def rebuild_daily_earnings_command():
+        """Recompute the daily_earnings rollup from completed payments."""
+        from stats import rebuild_daily_earnings
+        with db.engine.begin() as connection:
+            count = rebuild_daily_earnings(connection)
+        click.echo(f'Rebuilt {count} provider-day rows')
+
+    @app.cli.command('ranking-refresh')
+    def ranking_refresh_command():
+        """Recount recent bookings and recompute every service's ranking score.
+
+        Reviews and new bookings update scores as they happen; run this
+        periodically (hourly from cron, say) so old bookings age out.
+        """
+        from stats import refresh_service_scores
+        from versions import bump_versions
+        count = refresh_service_scores(db.session.connection())
+        bump_versions('services')
+        db.session.commit()
+        # Reaches a shared (redis) cache; per-process caches expire on their TTL
+        cache.invalidate('ranking')
+        click.echo(f'Refreshed scores; {count} services booked in the window')
+
+    @app.cli.command('archive-bookings')
+    @click.option('--days', type=int, help='Archive bookings dated more than this many days ago (ARCHIVE_AFTER_DAYS).')
+    @click.option('--chunk-size', type=int, help='Bookings moved per transaction (ARCHIVE_CHUNK_SIZE).')
+    @click.option('--limit', type=int, help='Stop after moving this many bookings.')
+    @click.option('--pause', type=float, default=0.0, help='Seconds to wait between chunks, leaving room for other writers.')
+    @click.option('--dry-run', is_flag=True, help='Only count the bookings that would move.')
+    def archive_bookings_command(days, chunk_size, limit, pause, dry_run):
+        """Move old completed and cancelled bookings and their payments to the archive tables.
+
+        Safe to interrupt: each chunk moves in its own transaction, and
+        running the command again carries on with what is left.
+        """
+        import time
+        from datetime import datetime, timedelta
+        from sqlalchemy import func, select
+        from archive import archivable, archive_chunk
+        from ranking import RECENT_DAYS
+        from versions import bump_versions
+        days = app.config['ARCHIVE_AFTER_DAYS'] if days is None else days
+        chunk_size = chunk_size or app.config['ARCHIVE_CHUNK_SIZE']
+        if days < RECENT_DAYS:
+            # Ranking counts the recent bookings of the hot table only
+            raise click.BadParameter(f'must be at least {RECENT_DAYS}', param_hint='--days')
+        cutoff = datetime.utcnow() - timedelta(days=days)
+        if dry_run:
+            count = db.session.scalar(select(func.count()).select_from(archivable(cutoff).subquery()))
+            click.echo(f'{count} bookings dated before {cutoff:%Y-%m-%d} would be archived')
+            return
+        after_id, bookings, payments = 0, 0, 0
+        while limit is None or bookings < limit:
+            size = chunk_size if limit is None else min(chunk_size, limit - bookings)
+            moved = archive_chunk(db.session.connection(), cutoff, after_id, size)
+            if moved is None:
+                break
+            after_id, booking_count, payment_count = moved
+            bump_versions('bookings', 'payments')
+            db.session.commit()
+            bookings += booking_count
+            payments += payment_count
+            if pause:
+                time.sleep(pause)
+        db.session.commit()
+        click.echo(f'Archived {bookings} bookings and {payments} payments dated before {cutoff:%Y-%m-%d}')
+
+    @app.cli.command('jobs-work')
+    @click.option('--burst', is_flag=True, help='Exit once the queue is empty.')
+    def jobs_work(burst):
+        """Run queued background jobs (payment requests) until stopped."""
+        import signal
+        from jobs import Worker
+        from payments import JOB_HANDLERS
+        worker = Worker(app, JOB_HANDLERS)
+        signal.signal(signal.SIGTERM, lambda *args: worker.stop())
+        click.echo(f'Worker {worker.name} handling {", ".join(JOB_HANDLERS)}')
+        try:
+            worker.run(burst=burst)
+        except KeyboardInterrupt:
+            pass
+        click.echo(f'Processed {worker.processed} jobs, {worker.failed} failed attempts')
+
+    @app.cli.command('jobs-status')
+    def jobs_status():
+        """Show job counts per kind and status."""
+        from jobs import queue_stats
+        with db.engine.begin() as connection:
+            stats = queue_stats(connection)
+        for kind, counts in sorted(stats.items()):
+            click.echo(f'{kind}: ' + ', '.join(f'{status} {count}' for status, count in sorted(counts.items())))
+
+    @app.cli.command('jobs-purge')
+    @click.option('--days', type=int, default=7, help='Keep finished jobs this many days.')
+    def jobs_purge(days):
+        """Delete finished jobs older than --days."""
+        from datetime import datetime, timedelta
+        from jobs import purge_jobs
+        with db.engine.begin() as connection:
+            count = purge_jobs(connection, datetime.utcnow() - timedelta(days=days))
+        click.echo(f'Deleted {count} finished jobs')
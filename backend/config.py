@@ -1,9 +1,43 @@
 import os
 from datetime import timedelta
 
+def _env_bool(name, default):
+    value = os.environ.get(name)
+    return default if value is None else value.lower() in ('1', 'true', 'yes', 'on')
+
 class Config:
     SECRET_KEY = os.environ.get('SECRET_KEY') or 'service-marketplace-secret-key'
     SQLALCHEMY_DATABASE_URI = os.environ.get('DATABASE_URL') or 'sqlite:///marketplace.db'
     SQLALCHEMY_TRACK_MODIFICATIONS = False
     JWT_SECRET_KEY = os.environ.get('JWT_SECRET_KEY') or 'jwt-secret-key'
-    JWT_ACCESS_TOKEN_EXPIRES = timedelta(hours=24)
\ No newline at end of file
+    JWT_ACCESS_TOKEN_EXPIRES = timedelta(hours=24)
+    SEARCH_FTS = True
+    JSON_ENCODER = os.environ.get('JSON_ENCODER', 'auto')
+    
+    # Engine settings, see database.py
+    DATABASE_READ_URL = os.environ.get('DATABASE_READ_URL')
+    DB_POOL_SIZE = int(os.environ.get('DB_POOL_SIZE', 10))
+    DB_MAX_OVERFLOW = int(os.environ.get('DB_MAX_OVERFLOW', 20))
+    DB_POOL_TIMEOUT = int(os.environ.get('DB_POOL_TIMEOUT', 10))
+    DB_POOL_RECYCLE = int(os.environ.get('DB_POOL_RECYCLE', 1800))
+    DB_POOL_PRE_PING = _env_bool('DB_POOL_PRE_PING', True)
+    READ_YOUR_WRITES_SECONDS = float(os.environ.get('READ_YOUR_WRITES_SECONDS', 5))
+    
+    # Frontend origins allowed to call the API with credentials, comma-separated
+    CORS_ORIGINS = os.environ.get('CORS_ORIGINS', 'http://localhost:3000').split(',')
+    
+    # Event streams, see pubsub.py; 'redis' relays events between processes
+    EVENTS_BACKEND = os.environ.get('EVENTS_BACKEND', 'memory')
+    EVENTS_REDIS_URL = os.environ.get('EVENTS_REDIS_URL')
+    EVENTS_STREAMS = os.environ.get('EVENTS_STREAMS', 'auto')
+    if os.environ.get('EVENTS_MAX_STREAMS'):
+        EVENTS_MAX_STREAMS = int(os.environ['EVENTS_MAX_STREAMS'])
+    
+    # Booking archive, see archive.py
+    ARCHIVE_AFTER_DAYS = int(os.environ.get('ARCHIVE_AFTER_DAYS', 365))
+    ARCHIVE_CHUNK_SIZE = int(os.environ.get('ARCHIVE_CHUNK_SIZE', 500))
+    
+    # Production server, see gunicorn.conf.py and serving.py
+    WARM_UP = _env_bool('WARM_UP', True)
+    if os.environ.get('PASSWORD_HASH_WORKERS'):
+        PASSWORD_HASH_WORKERS = int(os.environ['PASSWORD_HASH_WORKERS'])
@@ -1,10 +1,92 @@
-from flask import request, jsonify
-from extensions import db  # Import from extensions
-from models import Payment, User, Service, Booking, Review
-from sqlalchemy import or_, and_
-from datetime import datetime
+from flask import Response, request, jsonify
+from extensions import db, cache, suggestions, events  # Import from extensions
+from passwords import HasherBusy
+from models import Payment, User, Service, Booking, Review, ProviderStats
+from sqlalchemy import or_, and_, literal, func, insert, update, bindparam
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import joinedload
+from collections import Counter, defaultdict
+from operator import attrgetter
+from datetime import datetime, date, timedelta
+from serializers import (
+    SERVICE_LIST, SERVICE_SEARCH, SERVICE_DETAIL, USER_BOOKING, PROVIDER_BOOKING,
+    DASHBOARD_BOOKING, UNPAID_BOOKING, REVIEW, RECENT_PAYMENT, PAYMENT_DETAIL
+)
+from search import build_match, fts_enabled, fts_hits
+from suggest import DEFAULT_LIMIT as SUGGEST_LIMIT, MAX_LIMIT as MAX_SUGGEST_LIMIT
+from pagination import list_response, page_limit
+from geo import MAX_RADIUS_KM, locate, nearest, resolve_location
+from validation import valid_id, validate_service_data, validate_booking_status_data, validate_review_data
+from availability import (
+    MAX_BOOKING_HOURS, MAX_SLOT_RANGE_DAYS, AvailabilityError, Schedule, free_slots,
+    provider_lock, service_availability, within_availability
+)
+from versions import bump_versions, conditional
+from gateways import parse_stk_callback
+from payments import PaymentInProgress, complete_payment, fail_payment, start_payment
+from notifications import booking_changed, user_channel
+from archive import sources, union
+from stats import (
+    lock_provider_stats, bump_provider_stats, bump_provider_stats_many, record_reviews, booking_status_deltas, record_review,
+    record_booking_created, earnings_series, PERIODS
+)
+
+# Keyset orderings for paginated listings: newest first, id breaks ties
+NEWEST_SERVICES = [(Service.created_at, True), (Service.id, True)]
+NEWEST_BOOKINGS = [(Booking.created_at, True), (Booking.id, True)]
+NEWEST_REVIEWS = [(Review.created_at, True), (Review.id, True)]
+
+def newest_key(obj):
+    return obj.created_at, obj.id
+
+# sort= orderings for the service listings. Each is served by a partial index
+# on active services, so a page is read in index order without a sort step.
+SERVICE_SORTS = {
+    'relevance': [(Service.score, True), (Service.id, True)],
+    'rating': [(Service.rating, True), (Service.id, True)],
+    'price': [(Service.price, False), (Service.id, False)],
+    'newest': NEWEST_SERVICES,
+}
+
+def service_sort():
+    """The requested sort= name, None when absent; ValueError when unknown"""
+    sort = request.args.get('sort') or None
+    if sort is not None and sort not in SERVICE_SORTS:
+        raise ValueError(f'sort must be one of: {", ".join(SERVICE_SORTS)}')
+    return sort
+
+def order_key(order):
+    """Keyset values of a projected row, read by column name"""
+    return attrgetter(*[column.key for column, _ in order])
+
+def unselected(shape, order):
+    """Order columns the shape does not select; the row needs them for its cursor"""
+    selected = {column.name for column in shape.columns}
+    return [column for column, _ in order if column.key not in selected]
+
+# ===== CACHE TAGS =====
+# Catalog reads are cached by tag; the write controllers below invalidate the
+# tags a change can affect so cached reads are never stale after a write.
+def listing_tags(**view_args):
+    category = request.args.get('category')
+    tags = [f'category:{category}'] if category else ['services']
+    # Scores also move with bookings, which invalidate only 'ranking'
+    if request.args.get('sort') == 'relevance':
+        tags.append('ranking')
+    return tags
+
+def catalog_tags(category, service_id, provider_id):
+    return [f'category:{category}', f'service:{service_id}', f'provider:{provider_id}']
+
+def invalidate_catalog(service):
+    cache.invalidate('services', 'categories', *catalog_tags(service.category, service.id, service.provider_id))
 
 # ===== USER CONTROLLERS =====
+def hashing_busy():
+    response = jsonify({'error': 'Too many sign-ins right now, please retry shortly'})
+    response.headers['Retry-After'] = '1'
+    return response, 503
+
 def register_user():
     data = request.get_json()
     
@@ -20,9 +102,13 @@ def register_user():
         city=data.get('city'),
         state=data.get('state')
     )
-    user.set_password(data['password'])
+    try:
+        user.set_password(data['password'])
+    except HasherBusy:
+        return hashing_busy()
     
     db.session.add(user)
+    bump_versions('users')
     db.session.commit()
     
     return jsonify({
@@ -40,7 +126,14 @@ def login_user():
     data = request.get_json()
     user = User.query.filter_by(email=data['email']).first()
     
-    if user and user.check_password(data['password']):
+    try:
+        authenticated = user is not None and user.check_password(data['password'])
+    except HasherBusy:
+        return hashing_busy()
+    
+    if authenticated:
+        if db.session.is_modified(user):
+            db.session.commit()
         return jsonify({
             'message': 'Login successful',
             'user': {
@@ -55,10 +148,17 @@ def login_user():
     return jsonify({'error': 'Invalid credentials'}), 401
 
 # ===== SERVICE CONTROLLERS =====
+@conditional('services', 'users')
+@cache.cached('get_services', tags=listing_tags)
 def get_services():
     category = request.args.get('category')
     city = request.args.get('city')
     min_rating = request.args.get('min_rating')
+    try:
+        sort = service_sort()
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    order = SERVICE_SORTS[sort or 'newest']
     
     query = Service.query.filter_by(is_active=True)
     
@@ -69,24 +169,8 @@ def get_services():
     if min_rating:
         query = query.filter(Service.rating >= float(min_rating))
     
-    services = query.all()
-    
-    result = []
-    for service in services:
-        result.append({
-            'id': service.id,
-            'title': service.title,
-            'description': service.description,
-            'category': service.category,
-            'price': service.price,
-            'price_type': service.price_type,
-            'city': service.city,
-            'rating': service.rating,
-            'review_count': service.review_count,
-            'provider_name': service.provider.name
-        })
-    
-    return jsonify(result)
+    query = SERVICE_LIST.query(query, *unselected(SERVICE_LIST, order))
+    return list_response(query, SERVICE_LIST.dump, order, order_key(order), ordered=sort is not None)
 
 def create_service():
     data = request.get_json()
@@ -105,38 +189,31 @@ def create_service():
         availability_start=data.get('availability_start', '09:00'),
         availability_end=data.get('availability_end', '17:00')
     )
+    try:
+        lat = float(data['lat']) if data.get('lat') is not None else None
+        lng = float(data['lng']) if data.get('lng') is not None else None
+    except (TypeError, ValueError):
+        return jsonify({'error': 'lat and lng must be numbers'}), 400
+    locate(service, lat, lng, db.session.get(User, service.provider_id))
     
     db.session.add(service)
+    bump_provider_stats(service.provider_id, total_services=1)
+    bump_versions('services')
     db.session.commit()
+    invalidate_catalog(service)
+    suggestions.add_service(service)
     
     return jsonify({'message': 'Service created successfully', 'service_id': service.id}), 201
 
+@conditional('services', 'users')
+@cache.cached('get_service', tags=lambda service_id: [f'service:{service_id}'])
 def get_service(service_id):
-    service = Service.query.get_or_404(service_id)
+    service = SERVICE_DETAIL.query(Service.query.filter_by(id=service_id)).first_or_404()
     
-    service_data = {
-        'id': service.id,
-        'title': service.title,
-        'description': service.description,
-        'category': service.category,
-        'price': service.price,
-        'price_type': service.price_type,
-        'city': service.city,
-        'rating': service.rating,
-        'review_count': service.review_count,
-        'availability_days': service.availability_days,
-        'availability_start': service.availability_start,
-        'availability_end': service.availability_end,
-        'provider': {
-            'id': service.provider.id,
-            'name': service.provider.name,
-            'phone': service.provider.phone,
-            'city': service.provider.city
-        }
-    }
-    
-    return jsonify(service_data)
+    return jsonify(SERVICE_DETAIL.dump(service))
 
+@conditional('services')
+@cache.cached('get_provider_services', tags=lambda provider_id: [f'provider:{provider_id}'])
 def get_provider_services(provider_id):
     services = Service.query.filter_by(provider_id=provider_id, is_active=True).all()
     result = [{
@@ -151,6 +228,7 @@ def get_provider_services(provider_id):
     
     return jsonify(result)
 
+@conditional('services')
 def get_my_services():
     user_id = request.args.get('user_id')
     services = Service.query.filter_by(provider_id=user_id).all()
@@ -176,53 +254,116 @@ def create_booking():
     if not service:
         return jsonify({'error': 'Service not found'}), 404
     
+    try:
+        start = datetime.fromisoformat(data['booking_date'])
+        duration = float(data.get('duration', 1))
+    except (TypeError, ValueError):
+        return jsonify({'error': 'booking_date must be an ISO datetime and duration a number of hours'}), 400
+    if not 0 < duration <= MAX_BOOKING_HOURS:
+        return jsonify({'error': f'duration must be between 0 and {MAX_BOOKING_HOURS} hours'}), 400
+    end = start + timedelta(hours=duration)
+    
+    try:
+        availability = service_availability(service)
+    except AvailabilityError:
+        availability = None  # Unparseable legacy availability: don't block bookings on it
+    if availability and not within_availability(availability, start, end):
+        return jsonify({'error': 'The service is not available at that time'}), 409
+    
     booking = Booking(
         service_id=data['service_id'],
         buyer_id=data['buyer_id'],
         provider_id=service.provider_id,
-        booking_date=datetime.fromisoformat(data['booking_date']),
-        duration=data.get('duration', 1),
-        total_price=service.price * (data.get('duration', 1)),
+        booking_date=start,
+        duration=duration,
+        total_price=service.price * duration,
         location_address=data.get('location_address'),
         special_requests=data.get('special_requests')
     )
     
-    db.session.add(booking)
-    db.session.commit()
+    # Check and insert under the provider's lock so two requests for the
+    # same slot can never both pass the conflict check
+    with provider_lock(service.provider_id):
+        lock_provider_stats(service.provider_id)
+        if Schedule.load(db.session, service.provider_id, start, end).conflicts(start, end):
+            db.session.rollback()
+            return jsonify({'error': 'The provider is already booked at that time'}), 409
+        db.session.add(booking)
+        db.session.flush()
+        booking_changed(booking)
+        bump_provider_stats(booking.provider_id, total_bookings=1, pending_bookings=1)
+        record_booking_created(booking.service_id)
+        bump_versions('bookings', 'services')
+        db.session.commit()
+    cache.invalidate('ranking')
     
     return jsonify({'message': 'Booking created successfully', 'booking_id': booking.id}), 201
 
-def get_user_bookings(user_id):
-    bookings = Booking.query.filter(
-        or_(Booking.buyer_id == user_id, Booking.provider_id == user_id)
-    ).all()
+@conditional('services', 'bookings', vary=lambda: request.args.get('from') or datetime.utcnow().strftime('%Y-%m-%dT%H'))
+def get_service_slots(service_id):
+    """Free time within the service's availability, net of the provider's bookings"""
+    service = Service.query.get_or_404(service_id)
+    try:
+        start = datetime.fromisoformat(request.args['from']) if request.args.get('from') else \
+            datetime.utcnow().replace(minute=0, second=0, microsecond=0)
+        end = datetime.fromisoformat(request.args['to']) if request.args.get('to') else start + timedelta(days=7)
+        duration = float(request.args.get('duration', 1))
+        availability = service_availability(service)
+    except (ValueError, AvailabilityError) as e:
+        return jsonify({'error': str(e)}), 400
+    if not 0 < duration <= MAX_BOOKING_HOURS:
+        return jsonify({'error': f'duration must be between 0 and {MAX_BOOKING_HOURS} hours'}), 400
+    min_length = timedelta(hours=duration)
+    if not start < end <= start + timedelta(days=MAX_SLOT_RANGE_DAYS):
+        return jsonify({'error': f'to must be after from and at most {MAX_SLOT_RANGE_DAYS} days later'}), 400
+    
+    schedule = Schedule.load(db.session, service.provider_id, start, end)
     
-    result = []
-    for booking in bookings:
-        result.append({
-            'id': booking.id,
-            'service_title': booking.service.title,
-            'booking_date': booking.booking_date.isoformat(),
-            'total_price': booking.total_price,
-            'status': booking.status,
-            'buyer_name': booking.buyer.name,
-            'provider_name': booking.provider_rel.name
-        })
+    return jsonify({
+        'service_id': service.id,
+        'from': start.isoformat(),
+        'to': end.isoformat(),
+        'slots': [
+            {'start': slot_start.isoformat(), 'end': slot_end.isoformat()}
+            for slot_start, slot_end in free_slots(availability, schedule, start, end, min_length)
+        ]
+    })
+
+def set_booking_status(booking, status):
+    bump_provider_stats(booking.provider_id, **booking_status_deltas(booking, booking.status, status))
+    booking.status = status
+
+@conditional('bookings', 'services', 'users')
+def get_user_bookings(user_id):
+    bookings = union([
+        USER_BOOKING.over(model).query(model.query, model.created_at).filter(
+            or_(model.buyer_id == user_id, model.provider_id == user_id)
+        ) for model in sources(Booking)
+    ])
     
-    return jsonify(result)
+    return list_response(bookings, USER_BOOKING.dump, NEWEST_BOOKINGS, newest_key)
 
 def update_booking_status(booking_id):
-    data = request.get_json()
+    data = request.get_json(silent=True) or {}
+    errors = validate_booking_status_data(dict(data, booking_id=booking_id))
+    if errors:
+        return jsonify({'error': '; '.join(errors)}), 400
     booking = Booking.query.get_or_404(booking_id)
     
-    booking.status = data['status']
+    set_booking_status(booking, data['status'])
+    booking_changed(booking)
+    bump_versions('bookings')
     db.session.commit()
     
     return jsonify({'message': 'Booking status updated successfully'})
 
 # ===== REVIEW CONTROLLERS =====
 def create_review():
-    data = request.get_json()
+    data = request.get_json(silent=True) or {}
+    errors = validate_review_data(data)
+    if errors:
+        return jsonify({'error': '; '.join(errors)}), 400
+    booking = Booking.query.get_or_404(data['booking_id'])
     
     review = Review(
         booking_id=data['booking_id'],
@@ -233,46 +374,263 @@ def create_review():
     )
     
     db.session.add(review)
+    record_review(booking.service_id, review.reviewee_id, review.rating)
+    bump_versions('reviews', 'services')
     db.session.commit()
+    invalidate_catalog(booking.service)
     
     return jsonify({'message': 'Review created successfully'}), 201
 
+@conditional('reviews', 'bookings', 'users')
 def get_service_reviews(service_id):
-    reviews = Review.query.join(Booking).filter(Booking.service_id == service_id).all()
+    reviews = REVIEW.query(Review.query.join(Booking).filter(Booking.service_id == service_id))
     
-    result = []
-    for review in reviews:
-        result.append({
-            'id': review.id,
-            'rating': review.rating,
-            'comment': review.comment,
-            'reviewer_name': review.reviewer.name,
-            'created_at': review.created_at.isoformat()
+    return list_response(reviews, REVIEW.dump, NEWEST_REVIEWS, newest_key)
+
+@conditional('reviews', 'users')
+def get_provider_reviews(provider_id):
+    reviews = REVIEW.query(Review.query.filter_by(reviewee_id=provider_id))
+    
+    return list_response(reviews, REVIEW.dump, NEWEST_REVIEWS, newest_key)
+
+# ===== BATCH CONTROLLERS =====
+# Each batch validates every item up front, writes the valid ones in one
+# transaction with executemany statements and reports a result per item.
+MAX_BATCH_SIZE = 1000
+
+def batch_items(key):
+    """The items of a batch request, sent as a bare JSON array or as {key: [...]}"""
+    data = request.get_json(silent=True)
+    items = data.get(key) if isinstance(data, dict) else data
+    if not isinstance(items, list) or not items:
+        raise ValueError(f'Expected a non-empty list of {key}')
+    if len(items) > MAX_BATCH_SIZE:
+        raise ValueError(f'At most {MAX_BATCH_SIZE} {key} per batch')
+    if not all(isinstance(item, dict) for item in items):
+        raise ValueError(f'Every item in {key} must be an object')
+    return items
+
+def item_error(index, status, errors):
+    return {'index': index, 'status': status, 'errors': errors}
+
+def batch_response(results, ok_status):
+    """ok_status when every item succeeded, 207 when some did and 400 when none did"""
+    succeeded = sum(1 for result in results if result['status'] < 400)
+    status = ok_status if succeeded == len(results) else 207 if succeeded else 400
+    return jsonify({'results': results, 'succeeded': succeeded, 'failed': len(results) - succeeded}), status
+
+def create_services_batch():
+    try:
+        items = batch_items('services')
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    data = request.get_json()
+    default_provider = data.get('provider_id') if isinstance(data, dict) else None
+    
+    # Ids are type-checked before they go in a set: a list or dict is unhashable
+    provider_ids = {p for p in (item.get('provider_id', default_provider) for item in items) if valid_id(p)}
+    providers = {
+        row.id: row for row in
+        db.session.query(User.id, User.lat, User.lng).filter(User.id.in_(provider_ids))
+    }
+    
+    results = [None] * len(items)
+    rows, indexes = [], []
+    for i, item in enumerate(items):
+        errors = validate_service_data(item)
+        provider_id = item.get('provider_id', default_provider)
+        provider = providers.get(provider_id) if valid_id(provider_id) else None
+        if provider is None:
+            errors.append('Unknown provider')
+        try:
+            lat = float(item['lat']) if item.get('lat') is not None else None
+            lng = float(item['lng']) if item.get('lng') is not None else None
+        except (TypeError, ValueError):
+            errors.append('lat and lng must be numbers')
+        if errors:
+            results[i] = item_error(i, 400, errors)
+            continue
+        lat, lng, cell = resolve_location(lat, lng, provider.lat, provider.lng, item['city'])
+        rows.append({
+            'title': item['title'],
+            'description': item['description'],
+            'category': item['category'],
+            'provider_id': provider.id,
+            'price': float(item['price']),
+            'price_type': item.get('price_type', 'hourly'),
+            'city': item['city'],
+            'state': item.get('state', ''),
+            'serves_area': item.get('serves_area', ''),
+            'availability_days': item.get('availability_days', ''),
+            'availability_start': item.get('availability_start', '09:00'),
+            'availability_end': item.get('availability_end', '17:00'),
+            'lat': lat,
+            'lng': lng,
+            'geo_cell': cell
         })
+        indexes.append(i)
+    
+    if rows:
+        service_ids = db.session.scalars(
+            insert(Service).returning(Service.id, sort_by_parameter_order=True), rows
+        ).all()
+        counts = Counter(row['provider_id'] for row in rows)
+        bump_provider_stats_many({pid: {'total_services': n} for pid, n in counts.items()})
+        bump_versions('services')
+        db.session.commit()
+        cache.invalidate('services', 'categories', *{
+            tag for row, service_id in zip(rows, service_ids)
+            for tag in catalog_tags(row['category'], service_id, row['provider_id'])
+        })
+        created = Service.query.options(joinedload(Service.provider)).filter(Service.id.in_(service_ids))
+        for service in created.order_by(Service.id):
+            suggestions.add_service(service)
+        for i, service_id in zip(indexes, service_ids):
+            results[i] = {'index': i, 'status': 201, 'service_id': service_id}
     
-    return jsonify(result)
+    return batch_response(results, 201)
 
-def get_provider_reviews(provider_id):
-    reviews = Review.query.filter_by(reviewee_id=provider_id).all()
+def update_booking_statuses_batch():
+    try:
+        items = batch_items('updates')
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    
+    results = [None] * len(items)
+    for i, item in enumerate(items):
+        errors = validate_booking_status_data(item)
+        if errors:
+            results[i] = item_error(i, 400, errors)
+    booking_ids = {item['booking_id'] for i, item in enumerate(items) if results[i] is None}
+    bookings = {booking.id: booking for booking in Booking.query.filter(Booking.id.in_(booking_ids))}
+    
+    # Apply the changes in order so repeated updates to one booking chain
+    # correctly, summing the stats deltas per provider as they go
+    statuses = {}
+    deltas = defaultdict(lambda: defaultdict(float))
+    for i, item in enumerate(items):
+        if results[i] is not None:
+            continue
+        booking = bookings.get(item['booking_id'])
+        if booking is None:
+            results[i] = item_error(i, 404, ['Booking not found'])
+            continue
+        old_status = statuses.get(booking.id, booking.status)
+        for name, delta in booking_status_deltas(booking, old_status, item['status']).items():
+            deltas[booking.provider_id][name] += delta
+        statuses[booking.id] = item['status']
+        results[i] = {'index': i, 'status': 200, 'booking_id': booking.id, 'booking_status': item['status']}
+    
+    if statuses:
+        table = Booking.__table__
+        db.session.connection().execute(
+            update(table).where(table.c.id == bindparam('key')).values(status=bindparam('new_status')),
+            [{'key': booking_id, 'new_status': status} for booking_id, status in statuses.items()]
+        )
+        bump_provider_stats_many(deltas)
+        for booking_id, status in statuses.items():
+            booking_changed(bookings[booking_id], status)
+        bump_versions('bookings')
+        db.session.commit()
     
-    result = []
-    for review in reviews:
-        result.append({
-            'id': review.id,
-            'rating': review.rating,
-            'comment': review.comment,
-            'reviewer_name': review.reviewer.name,
-            'created_at': review.created_at.isoformat()
+    return batch_response(results, 200)
+
+def create_reviews_batch():
+    try:
+        items = batch_items('reviews')
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    
+    results = [None] * len(items)
+    for i, item in enumerate(items):
+        errors = validate_review_data(item)
+        if errors:
+            results[i] = item_error(i, 400, errors)
+    booking_ids = {item['booking_id'] for i, item in enumerate(items) if results[i] is None}
+    bookings = {
+        row.id: row for row in db.session.query(
+            Booking.id, Booking.service_id, Service.category, Service.provider_id
+        ).join(Service, Booking.service_id == Service.id).filter(Booking.id.in_(booking_ids))
+    }
+    
+    rows, indexes, touched = [], [], []
+    for i, item in enumerate(items):
+        if results[i] is not None:
+            continue
+        booking = bookings.get(item['booking_id'])
+        if booking is None:
+            results[i] = item_error(i, 404, ['Booking not found'])
+            continue
+        rows.append({
+            'booking_id': booking.id,
+            'reviewer_id': item['reviewer_id'],
+            'reviewee_id': item['reviewee_id'],
+            'rating': item['rating'],
+            'comment': item.get('comment', '')
         })
+        indexes.append(i)
+        touched.append(booking)
+    
+    if rows:
+        review_ids = db.session.scalars(
+            insert(Review).returning(Review.id, sort_by_parameter_order=True), rows
+        ).all()
+        record_reviews([(booking.service_id, row['reviewee_id'], row['rating']) for booking, row in zip(touched, rows)])
+        bump_versions('reviews', 'services')
+        db.session.commit()
+        cache.invalidate('services', 'categories', *{
+            tag for booking in touched
+            for tag in catalog_tags(booking.category, booking.service_id, booking.provider_id)
+        })
+        for i, review_id in zip(indexes, review_ids):
+            results[i] = {'index': i, 'status': 201, 'review_id': review_id}
     
-    return jsonify(result)
+    return batch_response(results, 201)
 
 # ===== SEARCH & CATEGORY CONTROLLERS =====
+@conditional('services')
+@cache.cached('get_categories', tags=lambda: ['categories'])
 def get_categories():
     categories = db.session.query(Service.category).distinct().all()
     category_list = [cat[0] for cat in categories if cat[0]]
     return jsonify(category_list)
 
+FEATURED_COUNT = 6
+
+# Platform totals change with every booking, which does not invalidate the
+# catalog tags, so the bootstrap payload also expires on a short TTL
+@conditional('services', 'users', 'bookings', 'reviews')
+@cache.cached('get_bootstrap', tags=lambda: ['services', 'categories'], ttl=60)
+def get_bootstrap():
+    """Everything the home and services pages need on load, in three queries"""
+    categories = db.session.query(Service.category, func.count(Service.id)).filter(
+        Service.is_active == True, Service.category != None
+    ).group_by(Service.category).order_by(func.count(Service.id).desc(), Service.category).all()
+    
+    featured = SERVICE_LIST.query(Service.query).filter(Service.is_active == True).order_by(
+        Service.rating.desc(), Service.review_count.desc(), Service.id.desc()
+    ).limit(FEATURED_COUNT).all()
+    
+    # provider_stats already holds per-provider counts, so the totals sum a
+    # row per provider instead of counting bookings and reviews
+    providers, bookings, reviews = db.session.query(
+        func.count(ProviderStats.provider_id).filter(ProviderStats.total_services > 0),
+        func.coalesce(func.sum(ProviderStats.total_bookings), 0),
+        func.coalesce(func.sum(ProviderStats.review_count), 0)
+    ).one()
+    
+    return jsonify({
+        'categories': [{'name': name, 'count': count} for name, count in categories],
+        'featured': SERVICE_LIST.dump_many(featured),
+        'totals': {
+            'services': sum(count for _, count in categories),
+            'providers': providers,
+            'bookings': bookings,
+            'reviews': reviews
+        }
+    })
+
+@conditional('services', 'users')
 def search_services():
     query = request.args.get('q', '')
     category = request.args.get('category')
@@ -280,15 +638,31 @@ def search_services():
     max_price = request.args.get('max_price')
     min_rating = request.args.get('min_rating')
     
-    search_query = Service.query.filter_by(is_active=True)
-    
-    if query:
-        search_query = search_query.filter(
-            or_(
-                Service.title.ilike(f'%{query}%'),
-                Service.description.ilike(f'%{query}%')
+    try:
+        sort = service_sort()
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    
+    match = build_match(query) if query and fts_enabled() else ''
+    
+    if match:
+        # Ranked full-text lookup; the usual filters still apply on top.
+        # Relevance here is the text rank rather than the stored score.
+        hits = fts_hits(match)
+        search_query = Service.query.join(hits, hits.c.service_id == Service.id).filter(Service.is_active == True)
+        snippet = hits.c.snippet
+        order = SERVICE_SORTS[sort] if sort not in (None, 'relevance') else [(hits.c.rank, False), (Service.id, False)]
+    else:
+        search_query = Service.query.filter(Service.is_active == True)
+        snippet = literal(None).label('snippet')
+        order = SERVICE_SORTS[sort or 'newest']
+        if query:
+            search_query = search_query.filter(
+                or_(
+                    Service.title.ilike(f'%{query}%'),
+                    Service.description.ilike(f'%{query}%')
+                )
             )
-        )
     
     if category:
         search_query = search_query.filter(Service.category == category)
@@ -299,166 +673,256 @@ def search_services():
     if min_rating:
         search_query = search_query.filter(Service.rating >= float(min_rating))
     
-    services = search_query.all()
+    search_query = SERVICE_SEARCH.query(search_query, snippet, *unselected(SERVICE_SEARCH, order))
+    
+    def dump(row):
+        item = SERVICE_SEARCH.dump(row)
+        item['snippet'] = row.snippet
+        return item
     
+    return list_response(search_query, dump, order, order_key(order), ordered=sort is not None)
+
+def suggest():
+    """Typeahead over service titles, categories, cities and provider names"""
+    try:
+        limit = int(request.args.get('limit', SUGGEST_LIMIT))
+    except ValueError:
+        return jsonify({'error': 'limit must be an integer'}), 400
+    if not 1 <= limit <= MAX_SUGGEST_LIMIT:
+        return jsonify({'error': f'limit must be between 1 and {MAX_SUGGEST_LIMIT}'}), 400
+    q = request.args.get('q', '')
+    
+    return jsonify({'query': q, 'suggestions': suggestions.lookup(q, limit)})
+
+@conditional('services', 'users')
+@cache.cached('nearby_services', tags=listing_tags)
+def nearby_services():
+    try:
+        lat = float(request.args['lat'])
+        lng = float(request.args['lng'])
+        radius_km = float(request.args.get('radius_km', 10))
+        limit = page_limit()
+        bounds = {
+            name: float(request.args[name])
+            for name in ('min_price', 'max_price', 'min_rating') if request.args.get(name)
+        }
+    except KeyError:
+        return jsonify({'error': 'lat and lng are required'}), 400
+    except ValueError:
+        return jsonify({'error': 'lat, lng, radius_km, limit and the filters must be numbers'}), 400
+    if not (-90 <= lat <= 90 and -180 <= lng <= 180):
+        return jsonify({'error': 'lat or lng out of range'}), 400
+    if not 0 < radius_km <= MAX_RADIUS_KM:
+        return jsonify({'error': f'radius_km must be between 0 and {MAX_RADIUS_KM}'}), 400
+    
+    candidates = db.session.query(Service.id, Service.lat, Service.lng).filter(Service.is_active == True)
+    if request.args.get('category'):
+        candidates = candidates.filter(Service.category == request.args['category'])
+    if 'min_price' in bounds:
+        candidates = candidates.filter(Service.price >= bounds['min_price'])
+    if 'max_price' in bounds:
+        candidates = candidates.filter(Service.price <= bounds['max_price'])
+    if 'min_rating' in bounds:
+        candidates = candidates.filter(Service.rating >= bounds['min_rating'])
+    
+    hits = nearest(candidates, lat, lng, radius_km, limit)
+    
+    services = SERVICE_LIST.query(Service.query).filter(Service.id.in_([service_id for _, service_id in hits]))
+    by_id = {service.id: service for service in services}
     result = []
-    for service in services:
-        result.append({
-            'id': service.id,
-            'title': service.title,
-            'description': service.description,
-            'category': service.category,
-            'price': service.price,
-            'city': service.city,
-            'rating': service.rating,
-            'provider_name': service.provider.name
-        })
+    for distance, service_id in hits:
+        item = SERVICE_LIST.dump(by_id[service_id])
+        item['distance_km'] = round(distance, 3)
+        result.append(item)
     
     return jsonify(result)
 
 # ===== DASHBOARD CONTROLLERS =====
+@conditional('services', 'bookings', 'reviews', 'payments')
 def get_provider_dashboard(provider_id):
     """Get provider dashboard data"""
-    services = Service.query.filter_by(provider_id=provider_id).all()
-    bookings = Booking.query.filter_by(provider_id=provider_id).all()
-    
-    total_earnings = sum(booking.total_price for booking in bookings if booking.status == 'completed')
-    pending_bookings = len([b for b in bookings if b.status == 'pending'])
+    stats = db.session.get(ProviderStats, provider_id) or ProviderStats(
+        total_services=0, total_bookings=0, pending_bookings=0, total_earnings=0.0,
+        rating=0.0, review_count=0
+    )
+    recent = DASHBOARD_BOOKING.query(Booking.query.filter_by(provider_id=provider_id)).order_by(
+        Booking.created_at.desc(), Booking.id.desc()
+    ).limit(5).all()
     
     return jsonify({
         'stats': {
-            'total_services': len(services),
-            'total_bookings': len(bookings),
-            'pending_bookings': pending_bookings,
-            'total_earnings': total_earnings
+            'total_services': stats.total_services,
+            'total_bookings': stats.total_bookings,
+            'pending_bookings': stats.pending_bookings,
+            'total_earnings': stats.total_earnings,
+            'rating': stats.rating,
+            'review_count': stats.review_count
         },
-        'recent_bookings': [{
-            'id': booking.id,
-            'service_title': booking.service.title,
-            'booking_date': booking.booking_date.isoformat(),
-            'status': booking.status,
-            'total_price': booking.total_price
-        } for booking in bookings[:5]]
+        'recent_bookings': DASHBOARD_BOOKING.dump_many(recent)
     })
 
+@conditional('bookings', 'services', 'users')
 def get_provider_bookings(provider_id):
     """Get all bookings for a provider"""
-    bookings = Booking.query.filter_by(provider_id=provider_id).all()
+    bookings = union([
+        PROVIDER_BOOKING.over(model).query(model.query.filter_by(provider_id=provider_id), model.created_at)
+        for model in sources(Booking)
+    ])
     
-    result = []
-    for booking in bookings:
-        result.append({
-            'id': booking.id,
-            'service_title': booking.service.title,
-            'booking_date': booking.booking_date.isoformat(),
-            'total_price': booking.total_price,
-            'status': booking.status,
-            'buyer_name': booking.buyer.name,
-            'buyer_phone': booking.buyer.phone
-        })
+    return list_response(bookings, PROVIDER_BOOKING.dump, NEWEST_BOOKINGS, newest_key)
 
 
-def initiate_payment():
-    data = request.get_json()
-    booking_id = data['booking_id']
-    phone_number = data['phone_number']
-    
-    booking = Booking.query.get_or_404(booking_id)
-    
-    
-    total_amount = booking.total_price
-    commission = total_amount * 0.10  
-    seller_amount = total_amount - commission
-    
-    
-    payment = Payment(
-        booking_id=booking_id,
-        amount=total_amount,
-        commission=commission,
-        seller_amount=seller_amount,
-        phone_number=phone_number,
-        status='pending'
-    )
-    
-    db.session.add(payment)
-    db.session.commit()
+def payment_accepted(payment):
+    response = jsonify({
+        'message': 'Payment initiated successfully',
+        'payment_id': payment.id,
+        'status': payment.status,
+        'amount': payment.amount,
+        'commission': payment.commission,
+        'seller_amount': payment.seller_amount,
+        'mpesa_prompt': f"You will receive an M-Pesa prompt to pay KSh {payment.amount}"
+    })
+    response.headers['Location'] = f'/api/payments/{payment.id}'
+    return response
 
-   
-    payment.status = 'completed'
-    payment.mpesa_receipt = 'SIM001'  # 
+def payment_in_flight(payment):
+    response = jsonify({
+        'error': 'A payment for this booking is already in progress',
+        'payment_id': payment.id,
+        'status': payment.status
+    })
+    response.headers['Location'] = f'/api/payments/{payment.id}'
+    return response, 409
 
-    db.session.commit()
+def initiate_payment():
+    """Queue a payment for the booking and return at once; poll the payment
+    (Location header) for the outcome. Retries carrying the same
+    Idempotency-Key get the original payment back instead of a second charge;
+    without one, a booking with a payment in flight gets a 409 naming it."""
+    data = request.get_json()
+    booking = Booking.query.get_or_404(data['booking_id'])
+    key = request.headers.get('Idempotency-Key') or data.get('idempotency_key')
+    
+    if key:
+        existing = Payment.query.filter_by(idempotency_key=key).first()
+        if existing:
+            if existing.booking_id != booking.id:
+                return jsonify({'error': 'Idempotency-Key was already used for another booking'}), 422
+            return payment_accepted(existing), 200
+    if booking.payment_status == 'paid':
+        return jsonify({'error': 'Booking is already paid'}), 409
+    in_flight = Payment.query.filter_by(booking_id=booking.id, status='pending').order_by(Payment.id.desc()).first()
+    if in_flight is not None:
+        return payment_in_flight(in_flight)
+    
+    try:
+        payment = start_payment(booking, data['phone_number'], key)
+    except PaymentInProgress:
+        # A concurrent initiation claimed the booking after the check above
+        db.session.rollback()
+        return jsonify({'error': 'A payment for this booking is already in progress'}), 409
+    bump_versions('payments', 'bookings')
+    try:
+        db.session.commit()
+    except IntegrityError:
+        # A concurrent retry with the same key got there first
+        db.session.rollback()
+        return payment_accepted(Payment.query.filter_by(idempotency_key=key).one()), 200
+    
+    return payment_accepted(payment), 202
 
-    return jsonify({
-        'message': 'Payment initiated successfully',
-        'payment_id': payment.id,
-        'amount': total_amount,
-        'commission': commission,
-        'seller_amount': seller_amount,
-        'mpesa_prompt': f"You will receive an M-Pesa prompt to pay KSh {total_amount}"
-    }), 201
+def payment_callback():
+    """M-Pesa STK callback. The CheckoutRequestID identifies the payment, so
+    a redelivered callback finds it settled and changes nothing."""
+    try:
+        result = parse_stk_callback(request.get_json(silent=True))
+    except (KeyError, TypeError, ValueError):
+        return jsonify({'ResultCode': 1, 'ResultDesc': 'Malformed callback'}), 400
+    
+    payment = Payment.query.filter_by(checkout_request_id=result.checkout_request_id).first()
+    if payment is None:
+        return jsonify({'ResultCode': 1, 'ResultDesc': 'Unknown CheckoutRequestID'}), 404
+    
+    if result.success:
+        changed = complete_payment(payment, result.receipt)
+    else:
+        changed = fail_payment(payment, result.reason)
+    if changed:
+        bump_versions('payments', 'bookings')
+        db.session.commit()
+    
+    return jsonify({'ResultCode': 0, 'ResultDesc': 'Accepted'})
 
 def confirm_payment():
+    """Settle a payment by hand, e.g. from a receipt the customer forwarded"""
     data = request.get_json()
-    payment_id = data['payment_id']
-    mpesa_receipt = data.get('mpesa_receipt', 'SIM001')  
+    payment = Payment.query.get_or_404(data['payment_id'])
     
-    payment = Payment.query.get_or_404(payment_id)
-    booking = payment.booking
-    
-    
-    payment.status = 'completed'
-    payment.mpesa_receipt = mpesa_receipt
-    
-    
-    booking.payment_status = 'paid'
-    
-    db.session.commit()
+    if complete_payment(payment, data.get('mpesa_receipt', 'SIM001')):
+        bump_versions('payments', 'bookings')
+        db.session.commit()
     
     return jsonify({
         'message': 'Payment confirmed successfully',
         'payment_id': payment.id,
         'seller_amount': payment.seller_amount,
         'commission': payment.commission,
-        'mpesa_receipt': mpesa_receipt
+        'mpesa_receipt': payment.mpesa_receipt
     })
 
+@conditional('payments', 'bookings', 'services')
 def get_payment_details(payment_id):
-    payment = Payment.query.get_or_404(payment_id)
+    payment = PAYMENT_DETAIL.query(Payment.query.filter_by(id=payment_id)).first_or_404()
     
-    return jsonify({
-        'id': payment.id,
-        'amount': payment.amount,
-        'commission': payment.commission,
-        'seller_amount': payment.seller_amount,
-        'status': payment.status,
-        'mpesa_receipt': payment.mpesa_receipt,
-        'booking_id': payment.booking_id,
-        'service_title': payment.booking.service.title
-    })
+    return jsonify(PAYMENT_DETAIL.dump(payment))
 
+@conditional('payments', 'bookings', 'services')
 def get_provider_earnings(provider_id):
-    
-    payments = Payment.query.join(Booking).join(Service).filter(
-        Service.provider_id == provider_id,
-        Payment.status == 'completed'
-    ).all()
-    
-    total_earnings = sum(p.seller_amount for p in payments)
-    total_commission = sum(p.commission for p in payments)
-    recent_payments = [{
-        'id': p.id,
-        'amount': p.seller_amount,
-        'service_title': p.booking.service.title,
-        'date': p.created_at.isoformat(),
-        'mpesa_receipt': p.mpesa_receipt
-    } for p in payments[:5]]
+    total_earnings, total_commission, payment_count, recent = 0.0, 0.0, 0, []
+    for payment, booking in zip(sources(Payment), sources(Booking)):
+        completed = payment.query.join(booking, payment.booking_id == booking.id).filter(
+            booking.provider_id == provider_id,
+            payment.status == 'completed'
+        )
+        earnings, commission, count = completed.with_entities(
+            func.coalesce(func.sum(payment.seller_amount), 0.0),
+            func.coalesce(func.sum(payment.commission), 0.0),
+            func.count(payment.id)
+        ).one()
+        total_earnings += earnings
+        total_commission += commission
+        payment_count += count
+        recent += RECENT_PAYMENT.over(payment).query(completed, payment.created_at, payment.id).order_by(
+            payment.created_at.desc(), payment.id.desc()
+        ).limit(5).all()
+    recent = sorted(recent, key=lambda row: row[-2:], reverse=True)[:5]
     
     return jsonify({
         'total_earnings': total_earnings,
         'total_commission': total_commission,
-        'recent_payments': recent_payments,
-        'payment_count': len(payments)
+        'recent_payments': RECENT_PAYMENT.dump_many(recent),
+        'payment_count': payment_count
+    })
+
+@conditional('payments', vary=lambda: request.args.get('to') or datetime.utcnow().date().isoformat())
+def get_provider_earnings_series(provider_id):
+    """Earnings per day, week or month, served from the daily_earnings rollup"""
+    granularity = request.args.get('granularity', 'day')
+    if granularity not in PERIODS:
+        return jsonify({'error': 'granularity must be one of: day, week, month'}), 400
+    
+    try:
+        end = date.fromisoformat(request.args['to']) if request.args.get('to') else datetime.utcnow().date()
+        start = date.fromisoformat(request.args['from']) if request.args.get('from') else end - timedelta(days=29)
+    except ValueError:
+        return jsonify({'error': 'from and to must be YYYY-MM-DD dates'}), 400
+    
+    return jsonify({
+        'provider_id': provider_id,
+        'granularity': granularity,
+        'from': start.isoformat(),
+        'to': end.isoformat(),
+        'series': earnings_series(provider_id, start, end, granularity)
     })
 
 def complete_booking():
@@ -468,8 +932,10 @@ def complete_booking():
     booking = Booking.query.get_or_404(booking_id)
     
     # Update booking status to completed
-    booking.status = 'completed'
+    set_booking_status(booking, 'completed')
+    booking_changed(booking)
     
+    bump_versions('bookings')
     db.session.commit()
     
     return jsonify({
@@ -478,22 +944,36 @@ def complete_booking():
         'total_amount': booking.total_price
     })
 
+@conditional('bookings', 'payments', 'services', 'users')
 def get_completed_unpaid_bookings(user_id):
     # Get bookings that are completed but not paid
-    bookings = Booking.query.filter(
+    bookings = UNPAID_BOOKING.query(Booking.query).filter(
         Booking.buyer_id == user_id,
         Booking.status == 'completed',
         Booking.payment_status == 'unpaid'
     ).all()
     
-    result = []
-    for booking in bookings:
-        result.append({
-            'id': booking.id,
-            'service_title': booking.service.title,
-            'booking_date': booking.booking_date.isoformat(),
-            'total_price': booking.total_price,
-            'provider_name': booking.provider_rel.name
-        })
-    
-    return jsonify(result)
\ No newline at end of file
+    return jsonify(UNPAID_BOOKING.dump_many(bookings))
+
+# ===== EVENT STREAM CONTROLLERS =====
+def stream_user_events(user_id):
+    """Server-Sent Events for the bookings and payments the user is buyer or
+    provider of. ?timeout= ends the stream sooner than EVENTS_STREAM_SECONDS.
+    503 when this server does not serve streams (pubsub.py) or has as many
+    open as it allows; the browser's EventSource then stops retrying."""
+    if not events.streams:
+        return jsonify({'error': 'Event streams are not enabled on this server'}), 503
+    timeout = request.args.get('timeout', type=float)
+    if timeout is not None and not 0 <= timeout <= events.stream_seconds:
+        return jsonify({'error': f'timeout must be between 0 and {events.stream_seconds} seconds'}), 400
+    if db.session.get(User, user_id) is None:
+        return jsonify({'error': 'User not found'}), 404
+    # Hand the connection back before streaming; the stream itself never queries
+    db.session.close()
+    stream = events.stream([user_channel(user_id)], timeout)
+    if stream is None:
+        return jsonify({'error': 'Too many open event streams'}), 503
+    return Response(stream, mimetype='text/event-stream', headers={
+        'Cache-Control': 'no-cache',
+        'X-Accel-Buffering': 'no'
+    })
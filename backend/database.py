@@ -0,0 +1,139 @@
+"""Engine configuration: pool settings, SQLite pragmas and read routing.
+
+Configuration (config.Config fills these from the environment):
+  SQLALCHEMY_DATABASE_URI   primary database, DATABASE_URL
+  DATABASE_READ_URL         optional read engine for GET requests, e.g. a
+                            replica or, for SQLite, the same file opened
+                            read-only ('sqlite:///file:/path/db.sqlite?mode=ro&uri=true')
+  DB_POOL_SIZE              connections kept open per engine, default 10
+  DB_MAX_OVERFLOW           extra connections under load, default 20
+  DB_POOL_TIMEOUT           seconds to wait for a connection, default 10
+  DB_POOL_RECYCLE           seconds before a connection is replaced, default 1800
+  DB_POOL_PRE_PING          check connections before use, default True
+  SQLITE_PRAGMAS            applied to every new SQLite connection; WAL lets
+                            readers run alongside the single writer
+  READ_YOUR_WRITES_SECONDS  how long a client's GETs stay on the primary after
+                            it wrote something, default 5
+
+The read-your-writes window travels in the db_primary_until cookie. The
+frontend is another origin, so it only comes back on requests made with
+credentials, from an origin listed in CORS_ORIGINS (app.py).
+"""
+import math
+import time
+from flask import current_app, g, has_request_context, request
+from flask_sqlalchemy.session import Session
+from sqlalchemy import create_engine, event
+from sqlalchemy.engine import make_url
+
+DEFAULT_SQLITE_PRAGMAS = {
+    'journal_mode': 'wal',
+    'synchronous': 'normal',
+    'busy_timeout': 5000,
+    'mmap_size': 256 * 1024 * 1024,
+    'cache_size': -64 * 1024,  # negative: KiB rather than pages
+}
+READ_METHODS = ('GET', 'HEAD')
+PRIMARY_COOKIE = 'db_primary_until'
+
+def _is_memory_sqlite(url):
+    return url.get_backend_name() == 'sqlite' and url.database in (None, '', ':memory:')
+
+def engine_options(config, url):
+    """create_engine() keyword arguments for `url` from the DB_* settings"""
+    url = make_url(url)
+    if _is_memory_sqlite(url):
+        # A private in-memory database lives in its one connection; no pool to tune
+        return {}
+    return {
+        'pool_size': config['DB_POOL_SIZE'],
+        'max_overflow': config['DB_MAX_OVERFLOW'],
+        'pool_timeout': config['DB_POOL_TIMEOUT'],
+        'pool_recycle': config['DB_POOL_RECYCLE'],
+        'pool_pre_ping': config['DB_POOL_PRE_PING'],
+    }
+
+def apply_sqlite_pragmas(engine, pragmas):
+    if engine.dialect.name != 'sqlite' or not pragmas:
+        return
+
+    @event.listens_for(engine, 'connect')
+    def set_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        for name, value in pragmas.items():
+            cursor.execute(f'PRAGMA {name}={value}')
+        cursor.close()
+
+# ===== READ ROUTING =====
+class RoutingSession(Session):
+    """Session that sends the reads of GET requests to the read engine.
+
+    Everything else uses the primary: writes, anything a GET does after it
+    has written, requests outside a GET and GETs from a client that wrote
+    within READ_YOUR_WRITES_SECONDS.
+    """
+
+    def __init__(self, db, **kwargs):
+        super().__init__(db, **kwargs)
+        self._wrote = False
+
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        if bind is None and not self._wrote:
+            if self._flushing or getattr(clause, 'is_dml', False):
+                self._wrote = True
+            elif _reads_from_replica():
+                return current_app.extensions['read_engine']
+        return super().get_bind(mapper=mapper, clause=clause, bind=bind, **kwargs)
+
+def _reads_from_replica():
+    return (
+        has_request_context()
+        and request.method in READ_METHODS
+        and 'read_engine' in current_app.extensions
+        and not g.get('db_primary')
+    )
+
+def init_database(app, db):
+    """Fill the engine options from the DB_* settings, then create the engines.
+
+    Call this instead of db.init_app(app).
+    """
+    config = app.config
+    config.setdefault('DATABASE_READ_URL', None)
+    config.setdefault('DB_POOL_SIZE', 10)
+    config.setdefault('DB_MAX_OVERFLOW', 20)
+    config.setdefault('DB_POOL_TIMEOUT', 10)
+    config.setdefault('DB_POOL_RECYCLE', 1800)
+    config.setdefault('DB_POOL_PRE_PING', True)
+    config.setdefault('SQLITE_PRAGMAS', DEFAULT_SQLITE_PRAGMAS)
+    config.setdefault('READ_YOUR_WRITES_SECONDS', 5)
+    config['SQLALCHEMY_ENGINE_OPTIONS'] = dict(
+        engine_options(config, config['SQLALCHEMY_DATABASE_URI']),
+        **config.get('SQLALCHEMY_ENGINE_OPTIONS', {})
+    )
+    db.init_app(app)
+    with app.app_context():
+        apply_sqlite_pragmas(db.engine, config['SQLITE_PRAGMAS'])
+
+    read_url = config['DATABASE_READ_URL']
+    if not read_url:
+        return
+    read_engine = create_engine(read_url, **engine_options(config, read_url))
+    # The primary owns the journal mode; a read-only connection cannot change it
+    apply_sqlite_pragmas(read_engine, {
+        name: value for name, value in config['SQLITE_PRAGMAS'].items() if name != 'journal_mode'
+    })
+    app.extensions['read_engine'] = read_engine
+
+    @app.before_request
+    def stick_to_primary():
+        until = request.cookies.get(PRIMARY_COOKIE)
+        if until and until.replace('.', '', 1).isdigit() and float(until) > time.time():
+            g.db_primary = True
+
+    @app.after_request
+    def remember_write(response):
+        if request.method not in READ_METHODS and response.status_code < 400:
+            seconds = config['READ_YOUR_WRITES_SECONDS']
+            response.set_cookie(PRIMARY_COOKIE, f'{time.time() + seconds:.3f}', max_age=math.ceil(seconds), httponly=True, samesite='Lax')
+        return response
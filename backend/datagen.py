@@ -0,0 +1,258 @@
+"""Generate production-scale synthetic marketplace data.
+
+    python datagen.py --users 200000 --services 50000 --bookings 1000000 --seed 7
+
+Rows are built in chunks and written with Core executemany inserts, so memory
+stays flat however many bookings are requested. The same --seed always
+produces the same rows; only the password salt differs between runs.
+"""
+import argparse
+import random
+import time
+from datetime import datetime, timedelta
+from itertools import accumulate
+from sqlalchemy import delete, insert
+from werkzeug.security import generate_password_hash
+from extensions import hasher
+from vocab import KENYAN_CITIES, SERVICE_CATEGORIES, FIRST_NAMES, LAST_NAMES, REVIEW_COMMENTS
+
+EPOCH_START = datetime(2024, 1, 1)
+EPOCH_SECONDS = 2 * 365 * 24 * 3600
+DEFAULT_PASSWORD = 'password123'
+
+BOOKING_STATUSES = ['pending', 'confirmed', 'completed', 'cancelled']
+BOOKING_STATUS_WEIGHTS = [0.15, 0.15, 0.6, 0.1]
+AVAILABILITY_DAYS = ['mon,tue,wed,thu,fri', 'mon,tue,wed,thu,fri,sat', 'mon,tue,wed,thu,fri,sat,sun', 'tue,wed,thu,fri,sat']
+AVAILABILITY_HOURS = [('06:00', '22:00'), ('08:00', '18:00'), ('09:00', '17:00'), ('14:00', '20:00')]
+# Rating skew: most completed jobs get 4 or 5 stars
+RATING_WEIGHTS = [0.03, 0.05, 0.12, 0.35, 0.45]
+
+def chunks(total, size):
+    for start in range(0, total, size):
+        yield start, min(size, total - start)
+
+class DataGenerator:
+
+    def __init__(self, connection, seed=42, chunk_size=20000, provider_ratio=0.2,
+                 popularity_skew=1.1, review_rate=0.6, payment_rate=0.85, log=print):
+        self.connection = connection
+        self.rng = random.Random(seed)
+        self.chunk_size = chunk_size
+        self.provider_ratio = provider_ratio
+        self.popularity_skew = popularity_skew
+        self.review_rate = review_rate
+        self.payment_rate = payment_rate
+        self.log = log
+        self.cities = list(KENYAN_CITIES)
+        self.categories = list(SERVICE_CATEGORIES)
+
+    def _timestamp(self):
+        return EPOCH_START + timedelta(seconds=self.rng.randrange(EPOCH_SECONDS))
+
+    def _insert(self, model, rows):
+        if rows:
+            self.connection.execute(insert(model), rows)
+
+    def users(self, count):
+        from models import User
+        # One hash for every synthetic account: hashing is deliberately slow
+        password_hash = generate_password_hash(
+            DEFAULT_PASSWORD, method=hasher.method, salt_length=hasher.salt_length
+        )
+        self.provider_count = max(1, int(count * self.provider_ratio))
+        self.user_count = count
+        self.provider_location = [None] * (self.provider_count + 1)
+        rng = self.rng
+        for start, size in chunks(count, self.chunk_size):
+            rows = []
+            for user_id in range(start + 1, start + size + 1):
+                first, last = rng.choice(FIRST_NAMES), rng.choice(LAST_NAMES)
+                city = rng.choice(self.cities)
+                place = KENYAN_CITIES[city]
+                phone = f'+2547{rng.randrange(10 ** 8):08d}'
+                lat = place['lat'] + rng.uniform(-0.08, 0.08)
+                lng = place['lng'] + rng.uniform(-0.08, 0.08)
+                if user_id <= self.provider_count:
+                    self.provider_location[user_id] = (lat, lng)
+                rows.append({
+                    'id': user_id,
+                    'name': f'{first} {last}',
+                    'email': f'{first}.{last}.{user_id}@example.com'.lower(),
+                    'password_hash': password_hash,
+                    'role': 'provider' if user_id <= self.provider_count else 'buyer',
+                    'phone': phone,
+                    'city': city,
+                    'state': place['state'],
+                    'lat': lat,
+                    'lng': lng,
+                    'is_verified': rng.random() < 0.7,
+                    'created_at': self._timestamp()
+                })
+            self._insert(User, rows)
+
+    def services(self, count):
+        from models import Service
+        from geo import geo_cell
+        rng = self.rng
+        self.service_provider = [0] * (count + 1)
+        self.service_price = [0.0] * (count + 1)
+        for start, size in chunks(count, self.chunk_size):
+            rows = []
+            for service_id in range(start + 1, start + size + 1):
+                category = rng.choice(self.categories)
+                spec = SERVICE_CATEGORIES[category]
+                city = rng.choice(self.cities)
+                area = rng.choice(KENYAN_CITIES[city]['areas'])
+                low, high = spec['price']
+                price = float(rng.randrange(low, high + 1, 50))
+                provider_id = rng.randint(1, self.provider_count)
+                opens, closes = rng.choice(AVAILABILITY_HOURS)
+                title = rng.choice(spec['titles'])
+                self.service_provider[service_id] = provider_id
+                self.service_price[service_id] = price
+                lat, lng = self.provider_location[provider_id]
+                rows.append({
+                    'id': service_id,
+                    'title': f'{title} - {area}',
+                    'description': f'{title} serving {area} and the wider {city} area. Reliable, affordable and experienced.',
+                    'category': category,
+                    'provider_id': provider_id,
+                    'price': price,
+                    'price_type': rng.choice(['fixed', 'hourly']),
+                    'city': city,
+                    'state': KENYAN_CITIES[city]['state'],
+                    'serves_area': ', '.join(rng.sample(KENYAN_CITIES[city]['areas'], 2)),
+                    'availability_days': rng.choice(AVAILABILITY_DAYS),
+                    'availability_start': opens,
+                    'availability_end': closes,
+                    'rating': 0.0,
+                    'review_count': 0,
+                    'is_active': rng.random() < 0.9,
+                    'created_at': self._timestamp(),
+                    'lat': lat,
+                    'lng': lng,
+                    'geo_cell': geo_cell(lat, lng)
+                })
+            self._insert(Service, rows)
+
+    def bookings(self, count):
+        """Bookings plus the reviews and payments of the completed ones.
+
+        Service popularity follows a Zipf-like curve so a few listings get
+        most of the traffic, as in production.
+        """
+        from models import Booking, Review, Payment
+        rng = self.rng
+        service_ids = list(range(1, len(self.service_provider)))
+        weights = [1.0 / (rank ** self.popularity_skew) for rank in range(1, len(service_ids) + 1)]
+        rng.shuffle(weights)
+        cum_weights = list(accumulate(weights))
+        first_buyer = self.provider_count + 1 if self.provider_count < self.user_count else 1
+
+        for start, size in chunks(count, self.chunk_size):
+            picked = rng.choices(service_ids, cum_weights=cum_weights, k=size)
+            statuses = rng.choices(BOOKING_STATUSES, BOOKING_STATUS_WEIGHTS, k=size)
+            bookings, reviews, payments = [], [], []
+            for offset, (service_id, status) in enumerate(zip(picked, statuses)):
+                booking_id = start + offset + 1
+                buyer_id = rng.randint(first_buyer, self.user_count)
+                provider_id = self.service_provider[service_id]
+                duration = rng.choice([1, 1, 1, 2, 3])
+                total = self.service_price[service_id] * duration
+                created_at = self._timestamp()
+                booking_date = (created_at + timedelta(days=rng.randint(1, 14))).replace(
+                    hour=rng.randint(8, 17), minute=0, second=0, microsecond=0
+                )
+                bookings.append({
+                    'id': booking_id, 'service_id': service_id, 'buyer_id': buyer_id,
+                    'provider_id': provider_id, 'booking_date': booking_date, 'duration': duration,
+                    'total_price': total, 'status': status, 'payment_status': 'unpaid', 'created_at': created_at
+                })
+                if status != 'completed':
+                    continue
+                if rng.random() < self.review_rate:
+                    reviews.append({
+                        'booking_id': booking_id, 'reviewer_id': buyer_id, 'reviewee_id': provider_id,
+                        'rating': rng.choices(range(1, 6), RATING_WEIGHTS)[0],
+                        'comment': rng.choice(REVIEW_COMMENTS),
+                        'created_at': booking_date + timedelta(days=1)
+                    })
+                if rng.random() < self.payment_rate:
+                    commission = total * 0.10
+                    payments.append({
+                        'booking_id': booking_id, 'amount': total, 'commission': commission,
+                        'seller_amount': total - commission, 'phone_number': f'+2547{rng.randrange(10 ** 8):08d}',
+                        'mpesa_receipt': f'SIM{booking_id:08d}', 'status': 'completed',
+                        'created_at': booking_date + timedelta(hours=rng.randint(1, 48))
+                    })
+                    bookings[-1]['payment_status'] = 'paid'
+            self._insert(Booking, bookings)
+            self._insert(Review, reviews)
+            self._insert(Payment, payments)
+            self.log(f'  bookings {start + size:,}/{count:,}')
+
+    def rebuild_derived(self):
+        from stats import rebuild_provider_stats, rebuild_ratings, rebuild_daily_earnings, refresh_service_scores
+        rebuild_provider_stats(self.connection)
+        rebuild_ratings(self.connection)
+        refresh_service_scores(self.connection)
+        rebuild_daily_earnings(self.connection)
+        if self.connection.dialect.name == 'sqlite':
+            self.connection.exec_driver_sql('ANALYZE')
+
+def clear_data(connection):
+    from extensions import db
+    for table in reversed(db.metadata.sorted_tables):
+        connection.execute(delete(table))
+
+def generate(connection, users, services, bookings, **options):
+    """Fill an empty, migrated database; returns the seconds taken per stage"""
+    generator = DataGenerator(connection, **options)
+    timings = {}
+    for stage, run in [
+        ('users', lambda: generator.users(users)),
+        ('services', lambda: generator.services(services)),
+        ('bookings', lambda: generator.bookings(bookings)),
+        ('derived', generator.rebuild_derived),
+    ]:
+        started = time.perf_counter()
+        run()
+        timings[stage] = time.perf_counter() - started
+        generator.log(f'{stage}: {timings[stage]:.1f}s')
+    return timings
+
+def main():
+    parser = argparse.ArgumentParser(description='Generate synthetic marketplace data.')
+    parser.add_argument('--users', type=int, default=10000)
+    parser.add_argument('--services', type=int, default=5000)
+    parser.add_argument('--bookings', type=int, default=100000)
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--chunk-size', type=int, default=20000)
+    parser.add_argument('--provider-ratio', type=float, default=0.2)
+    parser.add_argument('--popularity-skew', type=float, default=1.1,
+                        help='Zipf exponent for how bookings concentrate on popular services.')
+    parser.add_argument('--review-rate', type=float, default=0.6, help='Share of completed bookings reviewed.')
+    parser.add_argument('--payment-rate', type=float, default=0.85, help='Share of completed bookings paid.')
+    parser.add_argument('--database-url', help='Defaults to the app configuration.')
+    parser.add_argument('--reset', action='store_true', help='Delete existing rows first.')
+    args = parser.parse_args()
+
+    from app import create_app
+    from extensions import db
+    import migrations
+
+    app = create_app({'SQLALCHEMY_DATABASE_URI': args.database_url} if args.database_url else None)
+    with app.app_context():
+        migrations.upgrade(db.engine)
+        with db.engine.begin() as connection:
+            if args.reset:
+                clear_data(connection)
+            generate(
+                connection, args.users, args.services, args.bookings,
+                seed=args.seed, chunk_size=args.chunk_size, provider_ratio=args.provider_ratio,
+                popularity_skew=args.popularity_skew, review_rate=args.review_rate,
+                payment_rate=args.payment_rate
+            )
+
+if __name__ == '__main__':
+    main()
@@ -1,4 +1,16 @@
 from flask_sqlalchemy import SQLAlchemy
+from cache import ResponseCache
+from passwords import PasswordHasher
+from gateways import PaymentGateway
+from database import RoutingSession
+from suggest import Suggestions
+from pubsub import EventBus
 
 # Initialize extensions here to avoid circular imports
-db = SQLAlchemy()
\ No newline at end of file
+# GET requests read from DATABASE_READ_URL when one is configured
+db = SQLAlchemy(session_options={'class_': RoutingSession})
+cache = ResponseCache()
+hasher = PasswordHasher()
+gateway = PaymentGateway()
+suggestions = Suggestions()
+events = EventBus()
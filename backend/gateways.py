@@ -0,0 +1,172 @@
+"""Payment gateways behind the payment jobs.
+
+A gateway takes a pending Payment and asks the provider to collect it. The
+simulated gateway settles on the spot; the M-Pesa gateway sends an STK push
+and the result arrives later at /api/payments/callback. mpesa_stub.py serves
+the same API locally for development and benchmarks.
+"""
+import base64
+import json
+import threading
+import time
+import uuid
+from collections import defaultdict, namedtuple
+from datetime import datetime
+from urllib.error import HTTPError, URLError
+from urllib.request import Request, urlopen
+
+# What a gateway returns for a payment request; `receipt` is set when the
+# payment settled immediately, otherwise a callback will follow
+PaymentRequest = namedtuple('PaymentRequest', 'checkout_request_id receipt')
+CallbackResult = namedtuple('CallbackResult', 'checkout_request_id success receipt reason')
+
+class GatewayError(Exception):
+    """The request may succeed if retried (network error, provider outage)"""
+
+class GatewayRejected(GatewayError):
+    """The provider refused the request; retrying will not help"""
+
+def normalize_phone(phone):
+    """'+254 712 345678', '0712345678' -> '254712345678'"""
+    digits = ''.join(ch for ch in phone or '' if ch.isdigit())
+    if digits.startswith('0'):
+        digits = '254' + digits[1:]
+    elif len(digits) == 9:
+        digits = '254' + digits
+    return digits
+
+# ===== BACKENDS =====
+class SimulatedGateway:
+    """Settles every payment immediately, for development without M-Pesa"""
+
+    def request_payment(self, payment):
+        return PaymentRequest(f'SIM-{uuid.uuid4().hex}', f'SIM{payment.id:08d}')
+
+class MpesaGateway:
+    """Lipa na M-Pesa Online (STK push) through the Daraja API"""
+
+    def __init__(self, base_url, consumer_key, consumer_secret, shortcode, passkey, callback_url, timeout=10):
+        self.base_url = base_url.rstrip('/')
+        self.consumer_key = consumer_key
+        self.consumer_secret = consumer_secret
+        self.shortcode = str(shortcode)
+        self.passkey = passkey
+        self.callback_url = callback_url
+        self.timeout = timeout
+        self._token = None
+        self._token_expires = 0
+        self._token_lock = threading.Lock()
+
+    def _call(self, method, path, body=None, headers=None):
+        data = json.dumps(body).encode() if body is not None else None
+        request = Request(self.base_url + path, data=data, method=method, headers=dict(headers or {}))
+        if data is not None:
+            request.add_header('Content-Type', 'application/json')
+        try:
+            with urlopen(request, timeout=self.timeout) as response:
+                return json.loads(response.read() or b'{}')
+        except HTTPError as e:
+            detail = e.read().decode(errors='replace')[:200]
+            if 400 <= e.code < 500 and e.code not in (401, 408, 429):
+                raise GatewayRejected(f'{e.code} from M-Pesa: {detail}') from e
+            raise GatewayError(f'{e.code} from M-Pesa: {detail}') from e
+        except (URLError, TimeoutError, OSError, ValueError) as e:
+            raise GatewayError(f'M-Pesa unreachable: {e}') from e
+
+    def access_token(self):
+        with self._token_lock:
+            if self._token is None or time.monotonic() >= self._token_expires:
+                credentials = base64.b64encode(f'{self.consumer_key}:{self.consumer_secret}'.encode()).decode()
+                reply = self._call('GET', '/oauth/v1/generate?grant_type=client_credentials',
+                                   headers={'Authorization': f'Basic {credentials}'})
+                self._token = reply['access_token']
+                # Renew a minute early so a request never carries an expired token
+                self._token_expires = time.monotonic() + int(reply.get('expires_in', 3599)) - 60
+            return self._token
+
+    def request_payment(self, payment):
+        timestamp = datetime.now().strftime('%Y%m%d%H%M%S')
+        password = base64.b64encode(f'{self.shortcode}{self.passkey}{timestamp}'.encode()).decode()
+        phone = normalize_phone(payment.phone_number)
+        reply = self._call('POST', '/mpesa/stkpush/v1/processrequest', {
+            'BusinessShortCode': self.shortcode,
+            'Password': password,
+            'Timestamp': timestamp,
+            'TransactionType': 'CustomerPayBillOnline',
+            'Amount': max(1, int(round(payment.amount))),
+            'PartyA': phone,
+            'PartyB': self.shortcode,
+            'PhoneNumber': phone,
+            'CallBackURL': self.callback_url,
+            'AccountReference': f'BOOKING{payment.booking_id}',
+            'TransactionDesc': f'Payment {payment.id}'
+        }, headers={'Authorization': f'Bearer {self.access_token()}'})
+        if str(reply.get('ResponseCode')) != '0' or not reply.get('CheckoutRequestID'):
+            raise GatewayRejected(reply.get('errorMessage') or reply.get('ResponseDescription') or 'STK push rejected')
+        return PaymentRequest(reply['CheckoutRequestID'], None)
+
+def parse_stk_callback(data):
+    """CallbackResult from a Daraja STK callback body"""
+    callback = data['Body']['stkCallback']
+    items = {
+        item['Name']: item.get('Value')
+        for item in (callback.get('CallbackMetadata') or {}).get('Item', [])
+    }
+    checkout_request_id = callback['CheckoutRequestID']
+    if not isinstance(checkout_request_id, str):
+        raise ValueError('CheckoutRequestID must be a string')
+    success = int(callback['ResultCode']) == 0
+    return CallbackResult(
+        checkout_request_id,
+        success,
+        items.get('MpesaReceiptNumber') if success else None,
+        None if success else str(callback.get('ResultDesc', 'Payment failed'))[:200]
+    )
+
+# ===== GATEWAY =====
+class PaymentGateway:
+    """The configured payment gateway, with request counters.
+
+    Configuration:
+      PAYMENT_GATEWAY         'simulated' (default) or 'mpesa'
+      MPESA_BASE_URL          Daraja base URL, or the local stub (mpesa_stub.py)
+      MPESA_CONSUMER_KEY      Daraja app credentials
+      MPESA_CONSUMER_SECRET
+      MPESA_SHORTCODE         paybill or till number
+      MPESA_PASSKEY           Lipa na M-Pesa Online passkey
+      MPESA_CALLBACK_URL      public URL of /api/payments/callback
+      MPESA_TIMEOUT           seconds per HTTP call, default 10
+    """
+
+    def __init__(self, app=None):
+        self.backend = SimulatedGateway()
+        self._stats = defaultdict(int)
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        kind = app.config.setdefault('PAYMENT_GATEWAY', 'simulated')
+        if kind == 'mpesa':
+            config = app.config
+            self.backend = MpesaGateway(
+                config['MPESA_BASE_URL'], config['MPESA_CONSUMER_KEY'], config['MPESA_CONSUMER_SECRET'],
+                config['MPESA_SHORTCODE'], config['MPESA_PASSKEY'], config['MPESA_CALLBACK_URL'],
+                timeout=config.setdefault('MPESA_TIMEOUT', 10)
+            )
+        else:
+            self.backend = SimulatedGateway()
+        app.extensions['payment_gateway'] = self
+
+    def request_payment(self, payment):
+        self._stats['requests'] += 1
+        try:
+            return self.backend.request_payment(payment)
+        except GatewayRejected:
+            self._stats['rejected'] += 1
+            raise
+        except GatewayError:
+            self._stats['errors'] += 1
+            raise
+
+    def stats(self):
+        return dict(self._stats, backend=type(self.backend).__name__)
@@ -0,0 +1,139 @@
+"""Grid-cell location index for services.
+
+The world is split into CELL_DEG x CELL_DEG cells numbered row-major, so the
+cells covering a bounding box are a handful of contiguous id ranges, one per
+row, that an index on services.geo_cell answers with range scans.
+"""
+import math
+from sqlalchemy import and_, or_, select, update, bindparam
+from models import Service, User
+from vocab import KENYAN_CITIES
+
+EARTH_RADIUS_KM = 6371.0088
+CELL_DEG = 0.01
+CELL_COLUMNS = int(360 / CELL_DEG)
+KM_PER_DEG_LAT = math.pi * EARTH_RADIUS_KM / 180
+MAX_RADIUS_KM = 200
+# The nearby search starts this close and widens until it has enough hits
+INITIAL_REACH_KM = 0.5
+REACH_GROWTH = 4
+BACKFILL_CHUNK = 5000
+
+def geo_cell(lat, lng):
+    if lat is None or lng is None:
+        return None
+    row = int((lat + 90) // CELL_DEG)
+    col = int((lng + 180) // CELL_DEG) % CELL_COLUMNS
+    return row * CELL_COLUMNS + col
+
+def bounding_box(lat, lng, radius_km):
+    dlat = radius_km / KM_PER_DEG_LAT
+    # Near the poles a degree of longitude shrinks to nothing; cap the span
+    dlng = min(180.0, radius_km / (KM_PER_DEG_LAT * max(math.cos(math.radians(lat)), 1e-6)))
+    return lat - dlat, lat + dlat, lng - dlng, lng + dlng
+
+def cell_ranges(lat, lng, radius_km):
+    """Inclusive (first, last) geo_cell ranges covering the radius, one per row"""
+    south, north, west, east = bounding_box(lat, lng, radius_km)
+    first_row = int((max(south, -90) + 90) // CELL_DEG)
+    last_row = int((min(north, 90 - 1e-9) + 90) // CELL_DEG)
+    first_col = int((max(west, -180) + 180) // CELL_DEG)
+    last_col = int((min(east, 180 - 1e-9) + 180) // CELL_DEG)
+    return [
+        (row * CELL_COLUMNS + first_col, row * CELL_COLUMNS + last_col)
+        for row in range(first_row, last_row + 1)
+    ]
+
+def near_filter(lat, lng, radius_km):
+    """Candidate filter: the covering cells, tightened to the bounding box"""
+    south, north, west, east = bounding_box(lat, lng, radius_km)
+    return and_(
+        or_(*[Service.geo_cell.between(first, last) for first, last in cell_ranges(lat, lng, radius_km)]),
+        Service.lat.between(south, north),
+        Service.lng.between(west, east)
+    )
+
+def approx_distance(lat, lng):
+    """Equirectangular squared distance, monotonic enough to rank candidates in SQL"""
+    scale = math.cos(math.radians(lat))
+    return (Service.lat - lat) * (Service.lat - lat) + \
+        (Service.lng - lng) * (Service.lng - lng) * (scale * scale)
+
+def haversine_km(lat, lng, points):
+    """Great-circle distances from (lat, lng) to every (lat, lng) in points.
+
+    One tight pass over the candidates with the origin terms hoisted out; the
+    per-point work is a few float operations.
+    """
+    sin, cos, asin, sqrt, radians = math.sin, math.cos, math.asin, math.sqrt, math.radians
+    phi = radians(lat)
+    cos_phi = cos(phi)
+    lam = radians(lng)
+    diameter = 2 * EARTH_RADIUS_KM
+    distances = []
+    for point_lat, point_lng in points:
+        phi2 = radians(point_lat)
+        a = sin((phi2 - phi) / 2) ** 2 + cos_phi * cos(phi2) * sin((radians(point_lng) - lam) / 2) ** 2
+        distances.append(diameter * asin(sqrt(min(1.0, a))))
+    return distances
+
+def nearest(candidates, lat, lng, radius_km, limit):
+    """The `limit` closest rows of `candidates` within radius_km, as sorted
+    (distance_km, service_id) pairs.
+
+    The reach starts small and widens, so a dense city centre only ranks the
+    few cells around the point while a sparse area widens to the full radius.
+    Each pass ranks by the planar distance in SQL and settles the exact order
+    and the cut-off with haversine on a small overfetch.
+    """
+    reach = min(radius_km, INITIAL_REACH_KM)
+    while True:
+        rows = candidates.filter(near_filter(lat, lng, reach)).order_by(
+            approx_distance(lat, lng), Service.id
+        ).limit(limit * 2).all()
+        distances = haversine_km(lat, lng, [(row.lat, row.lng) for row in rows])
+        found = sorted((d, row.id) for d, row in zip(distances, rows) if d <= reach)
+        if len(found) >= limit or reach >= radius_km:
+            return found[:limit]
+        reach = min(radius_km, reach * REACH_GROWTH)
+
+def city_centre(city):
+    place = KENYAN_CITIES.get((city or '').strip().title())
+    return (place['lat'], place['lng']) if place else (None, None)
+
+def resolve_location(lat, lng, provider_lat, provider_lng, city):
+    """(lat, lng, geo_cell) for a service: explicit coordinates first, then
+    the provider's, then the centre of the service's city"""
+    if lat is None or lng is None:
+        lat, lng = provider_lat, provider_lng
+    if lat is None or lng is None:
+        lat, lng = city_centre(city)
+    return lat, lng, geo_cell(lat, lng)
+
+def locate(service, lat=None, lng=None, provider=None):
+    service.lat, service.lng, service.geo_cell = resolve_location(
+        lat, lng, getattr(provider, 'lat', None), getattr(provider, 'lng', None), service.city
+    )
+
+def backfill_service_locations(connection):
+    """Locate every service without a geo_cell"""
+    services, users = Service.__table__, User.__table__
+    rows = connection.execute(
+        select(services.c.id, services.c.lat, services.c.lng, users.c.lat, users.c.lng, services.c.city)
+        .join(users, users.c.id == services.c.provider_id)
+        .where(services.c.geo_cell.is_(None))
+    ).all()
+    statement = update(services).where(services.c.id == bindparam('service_id')).values(
+        lat=bindparam('new_lat'), lng=bindparam('new_lng'), geo_cell=bindparam('new_cell')
+    )
+    batch = []
+    for service_id, lat, lng, provider_lat, provider_lng, city in rows:
+        lat, lng, cell = resolve_location(lat, lng, provider_lat, provider_lng, city)
+        if cell is None:
+            continue
+        batch.append({'service_id': service_id, 'new_lat': lat, 'new_lng': lng, 'new_cell': cell})
+        if len(batch) == BACKFILL_CHUNK:
+            connection.execute(statement, batch)
+            batch = []
+    if batch:
+        connection.execute(statement, batch)
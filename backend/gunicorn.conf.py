@@ -0,0 +1,109 @@
+"""Production server settings.
+
+    gunicorn -c gunicorn.conf.py wsgi:app
+
+The app is imported once in the master (preload_app) and forked, so workers
+start fast and share the master's memory pages until they write to them.
+Each worker drops the database connections it inherited, warms up (WARM_UP)
+and only then reports ready on /api/ready; it is recycled after
+max_requests requests, with jitter so the workers do not restart together.
+
+Signals to the master:
+  HUP         graceful reload: new workers are forked from the preloaded app,
+              old ones finish their requests within graceful_timeout
+  USR2, then  deploy new code: USR2 starts a new master that imports it,
+  WINCH/TERM  WINCH stops the old master's workers, TERM stops the old master
+  TERM        graceful shutdown
+
+Environment:
+  BIND                   default 0.0.0.0:5000
+  WEB_CONCURRENCY        worker processes, default 2 * cores + 1
+  WEB_THREADS            threads per worker, default 1 (sync workers)
+  WORKER_CLASS           default gthread with WEB_THREADS > 1, else sync.
+                         Only gthread workers serve event streams; see below
+  MAX_REQUESTS           requests before a worker is recycled, default 1000
+  MAX_REQUESTS_JITTER    default 100
+  TIMEOUT                seconds a worker may spend on a request, default 30
+  GRACEFUL_TIMEOUT       seconds to finish in-flight requests, default 30
+  WARM_UP                prime caches before serving, default true (config.py)
+  PASSWORD_HASH_WORKERS  see passwords.py; defaults to hashing inline here
+
+Event streams (/api/stream/...) each hold a worker thread for as long as
+they stay open, up to EVENTS_STREAM_SECONDS. A gthread worker serves at most
+WEB_THREADS // 2 of them (EVENTS_MAX_STREAMS) and keeps the other threads
+for ordinary requests, so a server holds at most
+
+    WEB_CONCURRENCY * (WEB_THREADS // 2)
+
+open streams: 3 workers of 8 threads hold 12, 4 workers of 64 threads 128.
+That is tens to low hundreds of browsers, not thousands; beyond it, a
+stream request gets a 503 and that page does not update live. Sync
+workers, the default, serve none, and neither do other worker classes,
+which the event bus is not tested under. Streams also need
+EVENTS_BACKEND=redis (pubsub.py).
+"""
+import multiprocessing
+import os
+
+cores = multiprocessing.cpu_count()
+
+bind = os.environ.get('BIND', '0.0.0.0:5000')
+workers = int(os.environ.get('WEB_CONCURRENCY', cores * 2 + 1))
+threads = int(os.environ.get('WEB_THREADS', 1))
+worker_class = os.environ.get('WORKER_CLASS', 'gthread' if threads > 1 else 'sync')
+preload_app = True
+
+max_requests = int(os.environ.get('MAX_REQUESTS', 1000))
+max_requests_jitter = int(os.environ.get('MAX_REQUESTS_JITTER', 100))
+timeout = int(os.environ.get('TIMEOUT', 30))
+graceful_timeout = int(os.environ.get('GRACEFUL_TIMEOUT', 30))
+keepalive = 5
+
+accesslog = '-'
+errorlog = '-'
+
+# A sync worker serves one request at a time, so a password hash blocks
+# nothing else in it, and a hashing pool in each of 2 * cores + 1 workers
+# would oversubscribe the cores. Threaded workers keep one helper process.
+os.environ.setdefault('PASSWORD_HASH_WORKERS', '0' if worker_class == 'sync' else '1')
+
+# An event stream stays open for minutes: it would take a sync worker away
+# from every other request until `timeout` killed it. A threaded worker
+# keeps at least half its threads for ordinary requests.
+if worker_class == 'gthread':
+    os.environ.setdefault('EVENTS_MAX_STREAMS', str(threads // 2))
+else:
+    os.environ['EVENTS_STREAMS'] = 'off'
+
+def when_ready(server):
+    from app import app
+    with app.app_context():
+        import migrations
+        from extensions import db, events
+        migrations.upgrade(db.engine)
+        db.engine.dispose()
+    server.log.info('Migrations applied, serving with %s %s workers', workers, worker_class)
+    if events.streams:
+        server.log.info('Event streams: at most %s per worker, %s in all',
+                        events.max_streams, events.max_streams * workers)
+
+def post_fork(server, worker):
+    from app import app
+    from serving import after_fork
+    after_fork(app)
+
+def post_worker_init(worker):
+    from app import app
+    from serving import mark_ready, warm_up
+    if app.config['WARM_UP']:
+        try:
+            summary = warm_up(app)
+            worker.log.info('Worker %s warmed up: %s', worker.pid, summary)
+        except Exception:
+            # A cold worker is still a working one
+            worker.log.exception('Worker %s warm-up failed', worker.pid)
+    mark_ready()
+
+def worker_exit(server, worker):
+    from extensions import hasher
+    hasher.shutdown()
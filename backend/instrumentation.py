@@ -0,0 +1,185 @@
+import logging
+import sys
+import threading
+import time
+from bisect import bisect_left
+from collections import defaultdict
+from flask import current_app, g, has_request_context, request
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+slow_log = logging.getLogger('marketplace.slow')
+
+# Upper bounds (ms) of the latency histogram buckets; the last one is open
+BUCKETS_MS = [1, 2, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000]
+
+# Modules whose frames identify "the calling controller" in the slow log
+CALLER_MODULES = ('controllers', 'stats', 'search', 'pagination', 'geo')
+
+class RequestTimings:
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.queries = 0
+        self.db_ms = 0.0
+        self.serialize_ms = 0.0
+        self.slowest = None
+
+class Metrics:
+    """Per-route latency histograms, query counts and DB time"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._routes = defaultdict(self._empty)
+
+    @staticmethod
+    def _empty():
+        return {
+            'count': 0, 'total_ms': 0.0, 'max_ms': 0.0, 'db_ms': 0.0,
+            'serialize_ms': 0.0, 'queries': 0, 'buckets': [0] * (len(BUCKETS_MS) + 1)
+        }
+
+    def observe(self, route, total_ms, timings):
+        with self._lock:
+            stats = self._routes[route]
+            stats['count'] += 1
+            stats['total_ms'] += total_ms
+            stats['max_ms'] = max(stats['max_ms'], total_ms)
+            stats['db_ms'] += timings.db_ms
+            stats['serialize_ms'] += timings.serialize_ms
+            stats['queries'] += timings.queries
+            stats['buckets'][bisect_left(BUCKETS_MS, total_ms)] += 1
+
+    def snapshot(self):
+        with self._lock:
+            routes = {}
+            for route, stats in self._routes.items():
+                count = stats['count']
+                routes[route] = {
+                    'count': count,
+                    'mean_ms': round(stats['total_ms'] / count, 3),
+                    'max_ms': round(stats['max_ms'], 3),
+                    'mean_db_ms': round(stats['db_ms'] / count, 3),
+                    'mean_serialize_ms': round(stats['serialize_ms'] / count, 3),
+                    'mean_queries': round(stats['queries'] / count, 2),
+                    'histogram_ms': {
+                        (f'le_{bound}' if i < len(BUCKETS_MS) else 'inf'): n
+                        for i, (bound, n) in enumerate(zip(BUCKETS_MS + [None], stats['buckets']))
+                    }
+                }
+            return routes
+
+    def reset(self):
+        with self._lock:
+            self._routes.clear()
+
+metrics = Metrics()
+_engine_hooks_installed = False
+
+def _timings():
+    if has_request_context():
+        return g.get('_timings')
+    return None
+
+def _calling_controller():
+    frame = sys._getframe(2)
+    while frame is not None:
+        if frame.f_globals.get('__name__') in CALLER_MODULES:
+            return f'{frame.f_globals["__name__"]}.{frame.f_code.co_name}'
+        frame = frame.f_back
+    return None
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault('_query_started', []).append(time.perf_counter())
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    elapsed_ms = (time.perf_counter() - conn.info['_query_started'].pop()) * 1000
+    timings = _timings()
+    if timings is None:
+        return
+    timings.queries += 1
+    timings.db_ms += elapsed_ms
+    if timings.slowest is None or elapsed_ms > timings.slowest[0]:
+        timings.slowest = (elapsed_ms, statement)
+    if elapsed_ms >= current_app.config['SLOW_QUERY_MS']:
+        slow_log.warning(
+            'slow query %.1fms in %s: %s params=%.500r',
+            elapsed_ms, _calling_controller(), ' '.join(statement.split()), parameters
+        )
+
+def _install_engine_hooks():
+    # Listening on the Engine class covers every engine, including any
+    # read replica, without needing an app context at startup.
+    global _engine_hooks_installed
+    if not _engine_hooks_installed:
+        event.listen(Engine, 'before_cursor_execute', _before_cursor_execute)
+        event.listen(Engine, 'after_cursor_execute', _after_cursor_execute)
+        _engine_hooks_installed = True
+
+def _timed_json_provider(app):
+    base = type(app.json)
+
+    class TimedJSONProvider(base):
+        def dumps(self, obj, **kwargs):
+            started = time.perf_counter()
+            try:
+                return super().dumps(obj, **kwargs)
+            finally:
+                timings = _timings()
+                if timings is not None:
+                    timings.serialize_ms += (time.perf_counter() - started) * 1000
+
+    return TimedJSONProvider(app)
+
+def init_instrumentation(app):
+    """Opt-in request instrumentation.
+
+    Configuration:
+      INSTRUMENTATION_ENABLED  default False
+      SLOW_QUERY_MS            log queries at least this slow, default 100
+      SLOW_REQUEST_MS          log requests at least this slow, default 500
+
+    Each response carries a Server-Timing header with db, serialize, handler
+    and total durations, and /api/_metrics serves per-route histograms.
+    """
+    app.config.setdefault('INSTRUMENTATION_ENABLED', False)
+    app.config.setdefault('SLOW_QUERY_MS', 100)
+    app.config.setdefault('SLOW_REQUEST_MS', 500)
+    if not app.config['INSTRUMENTATION_ENABLED']:
+        return
+
+    _install_engine_hooks()
+    app.json = _timed_json_provider(app)
+    app.extensions['instrumentation'] = metrics
+
+    @app.before_request
+    def start_timings():
+        g._timings = RequestTimings()
+
+    @app.after_request
+    def record_timings(response):
+        timings = g.pop('_timings', None)
+        if timings is None:
+            return response
+        total_ms = (time.perf_counter() - timings.started) * 1000
+        handler_ms = max(0.0, total_ms - timings.db_ms - timings.serialize_ms)
+        response.headers['Server-Timing'] = ', '.join([
+            f'db;dur={timings.db_ms:.2f};desc="{timings.queries} queries"',
+            f'serialize;dur={timings.serialize_ms:.2f}',
+            f'handler;dur={handler_ms:.2f}',
+            f'total;dur={total_ms:.2f}',
+        ])
+        route = f'{request.method} {request.url_rule.rule if request.url_rule else "<unmatched>"}'
+        metrics.observe(route, total_ms, timings)
+        if total_ms >= app.config['SLOW_REQUEST_MS']:
+            slowest_ms, slowest_sql = timings.slowest or (0.0, '')
+            slow_log.warning(
+                'slow request %.1fms %s %s: %d queries, db %.1fms, serialize %.1fms, slowest query %.1fms: %s',
+                total_ms, request.method, request.full_path, timings.queries, timings.db_ms,
+                timings.serialize_ms, slowest_ms, ' '.join(slowest_sql.split())[:500]
+            )
+        return response
+
+def metrics_snapshot():
+    enabled = current_app.config.get('INSTRUMENTATION_ENABLED', False)
+    return {'enabled': enabled, 'routes': metrics.snapshot() if enabled else {}}
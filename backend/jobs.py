@@ -0,0 +1,162 @@
+"""Durable job queue stored in the application database.
+
+Jobs are rows of the jobs table. `enqueue` adds one in the caller's session,
+so the job commits or rolls back with the change that needs it. Workers claim
+a ready job with a single UPDATE ... RETURNING, which SQLite serializes under
+its write lock and other databases with FOR UPDATE SKIP LOCKED, then run its
+handler. A claim is a lease: a worker that dies mid-job leaves the job to be
+claimed again once the lease expires. Delivery is therefore at least once and
+handlers must be idempotent.
+
+Failed attempts are retried with exponential backoff until max_attempts, after
+which the job is marked failed. `job.final` tells a handler that the current
+attempt is its last.
+"""
+import json
+import logging
+import os
+import socket
+import threading
+from collections import namedtuple
+from datetime import datetime, timedelta
+from sqlalchemy import and_, delete, func, insert, or_, select, update
+from extensions import db
+from models import Job
+
+logger = logging.getLogger('marketplace.jobs')
+
+MAX_BACKOFF_SECONDS = 300
+
+class ClaimedJob(namedtuple('ClaimedJob', 'id kind payload attempts max_attempts')):
+    @property
+    def final(self):
+        return self.attempts >= self.max_attempts
+
+# ===== QUEUEING =====
+def enqueue(kind, payload, delay=0, max_attempts=5):
+    """Queue a job in the current transaction"""
+    now = datetime.utcnow()
+    db.session.execute(insert(Job).values(
+        kind=kind, payload=json.dumps(payload), status='queued', attempts=0, max_attempts=max_attempts,
+        run_at=now + timedelta(seconds=delay), created_at=now
+    ))
+
+def claim(connection, kinds, worker_id, lease_seconds):
+    """Lease the next ready job of one of `kinds`, or return None.
+
+    Ready means queued and due, or running under a lease that has expired.
+    """
+    jobs = Job.__table__
+    now = datetime.utcnow()
+    ready = select(jobs.c.id).where(
+        jobs.c.kind.in_(kinds),
+        or_(
+            and_(jobs.c.status == 'queued', jobs.c.run_at <= now),
+            and_(jobs.c.status == 'running', jobs.c.locked_until < now)
+        )
+    ).order_by(jobs.c.run_at, jobs.c.id).limit(1).with_for_update(skip_locked=True).scalar_subquery()
+    row = connection.execute(
+        update(jobs).where(jobs.c.id == ready).values(
+            status='running', attempts=jobs.c.attempts + 1, locked_by=worker_id,
+            locked_until=now + timedelta(seconds=lease_seconds)
+        ).returning(jobs.c.id, jobs.c.kind, jobs.c.payload, jobs.c.attempts, jobs.c.max_attempts)
+    ).first()
+    if row is None:
+        return None
+    return ClaimedJob(row.id, row.kind, json.loads(row.payload), row.attempts, row.max_attempts)
+
+def finish(connection, job, worker_id, error=None):
+    """Record the outcome of a claimed job: done, retry later or failed"""
+    jobs = Job.__table__
+    now = datetime.utcnow()
+    if error is None:
+        values = {'status': 'done', 'finished_at': now, 'last_error': None}
+    elif job.final:
+        values = {'status': 'failed', 'finished_at': now, 'last_error': error}
+    else:
+        delay = min(MAX_BACKOFF_SECONDS, 2 ** job.attempts)
+        values = {'status': 'queued', 'run_at': now + timedelta(seconds=delay), 'last_error': error}
+    # A worker whose lease expired no longer owns the job; leave it alone
+    connection.execute(
+        update(jobs).where(jobs.c.id == job.id, jobs.c.locked_by == worker_id)
+        .values(locked_by=None, locked_until=None, **values)
+    )
+
+def queue_stats(connection):
+    jobs = Job.__table__
+    rows = connection.execute(select(jobs.c.kind, jobs.c.status, func.count()).group_by(jobs.c.kind, jobs.c.status))
+    stats = {}
+    for kind, status, count in rows:
+        stats.setdefault(kind, {})[status] = count
+    return stats
+
+def purge_jobs(connection, older_than):
+    """Delete finished jobs older than `older_than`; failed jobs are kept for inspection"""
+    jobs = Job.__table__
+    return connection.execute(
+        delete(jobs).where(jobs.c.status == 'done', jobs.c.finished_at < older_than)
+    ).rowcount
+
+# ===== WORKER =====
+class Worker:
+    """Claims and runs jobs until stopped.
+
+    `handlers` maps a job kind to handler(payload, job). Handlers run in an
+    application context; the session is committed when a handler returns and
+    rolled back when it raises.
+
+    Configuration:
+      JOBS_POLL_INTERVAL  seconds to sleep when the queue is empty, default 0.5
+      JOBS_LEASE_SECONDS  how long a claim lasts before another worker may
+                          retry the job, default 60
+    """
+
+    def __init__(self, app, handlers, name=None):
+        self.app = app
+        self.handlers = dict(handlers)
+        self.name = name or f'{socket.gethostname()}:{os.getpid()}:{id(self):x}'
+        self.poll_interval = app.config.setdefault('JOBS_POLL_INTERVAL', 0.5)
+        self.lease_seconds = app.config.setdefault('JOBS_LEASE_SECONDS', 60)
+        self._stop = threading.Event()
+        self.processed = 0
+        self.failed = 0
+
+    def run_once(self):
+        """Claim and run one job; returns False when none was ready"""
+        with self.app.app_context():
+            with db.engine.begin() as connection:
+                job = claim(connection, list(self.handlers), self.name, self.lease_seconds)
+            if job is None:
+                return False
+            error = None
+            try:
+                self.handlers[job.kind](job.payload, job)
+                db.session.commit()
+            except Exception as e:
+                db.session.rollback()
+                error = f'{type(e).__name__}: {e}'
+                logger.warning('job %s (%s) attempt %s/%s failed: %s', job.id, job.kind, job.attempts, job.max_attempts, error)
+                self.failed += 1
+            finally:
+                db.session.remove()
+            with db.engine.begin() as connection:
+                finish(connection, job, self.name, error)
+            self.processed += 1
+            return True
+
+    def run(self, burst=False):
+        """Work until stop() is called, or until the queue is empty with `burst`"""
+        while not self._stop.is_set():
+            if not self.run_once():
+                if burst:
+                    return
+                self._stop.wait(self.poll_interval)
+
+    def start(self):
+        """Run in a daemon thread, for the development server"""
+        thread = threading.Thread(target=self.run, name='job-worker', daemon=True)
+        thread.start()
+        return thread
+
+    def stop(self):
+        self._stop.set()
@@ -0,0 +1,107 @@
+"""Versioned schema migrations.
+
+Each module named ``vNNNN_<slug>.py`` in this package is one migration. It
+defines ``upgrade(connection)`` and, where it can be undone,
+``downgrade(connection)``. Every migration runs in its own transaction and the
+applied versions are recorded in ``schema_migrations``.
+
+v0001 builds a fresh database straight from the models, so later migrations
+must also be safe on a schema that already has their changes. The helpers
+below skip objects that already exist.
+
+A migration runs against the schema of its own version, which on an old
+database can be several versions behind the models. Migrations that create
+tables or move data therefore spell out the tables and queries they need as
+they stood at that version instead of importing the models, stats.py and the
+like, whose later columns would not exist yet.
+"""
+import importlib
+import pkgutil
+import re
+from datetime import datetime
+from sqlalchemy import Column, DateTime, Integer, MetaData, String, Table, inspect, text
+from sqlalchemy.schema import CreateColumn
+
+_metadata = MetaData()
+
+schema_migrations = Table(
+    'schema_migrations', _metadata,
+    Column('version', Integer, primary_key=True),
+    Column('name', String(100), nullable=False),
+    Column('applied_at', DateTime, nullable=False)
+)
+
+_MODULE_NAME = re.compile(r'^v(\d{4})_(\w+)$')
+
+class MigrationError(Exception):
+    pass
+
+def discover():
+    """Return [(version, name, module)] for every migration, oldest first"""
+    found = []
+    for info in pkgutil.iter_modules(__path__):
+        match = _MODULE_NAME.match(info.name)
+        if match:
+            module = importlib.import_module(f'{__name__}.{info.name}')
+            found.append((int(match.group(1)), match.group(2), module))
+    return sorted(found, key=lambda m: m[0])
+
+def applied_versions(connection):
+    schema_migrations.create(connection, checkfirst=True)
+    return {row.version for row in connection.execute(schema_migrations.select())}
+
+def current_version(engine):
+    with engine.begin() as connection:
+        return max(applied_versions(connection), default=0)
+
+def upgrade(engine, target=None):
+    """Apply every pending migration up to `target` (default: latest)"""
+    applied = []
+    with engine.begin() as connection:
+        done = applied_versions(connection)
+    for version, name, module in discover():
+        if version in done or (target is not None and version > target):
+            continue
+        with engine.begin() as connection:
+            module.upgrade(connection)
+            connection.execute(schema_migrations.insert().values(
+                version=version, name=name, applied_at=datetime.utcnow()
+            ))
+        applied.append((version, name))
+    return applied
+
+def downgrade(engine, target):
+    """Undo applied migrations newer than `target`, newest first"""
+    reverted = []
+    with engine.begin() as connection:
+        done = applied_versions(connection)
+    for version, name, module in reversed(discover()):
+        if version not in done or version <= target:
+            continue
+        if not hasattr(module, 'downgrade'):
+            raise MigrationError(f'Migration {version:04d}_{name} cannot be reverted')
+        with engine.begin() as connection:
+            module.downgrade(connection)
+            connection.execute(schema_migrations.delete().where(schema_migrations.c.version == version))
+        reverted.append((version, name))
+    return reverted
+
+# ===== HELPERS =====
+def create_indexes(connection, table, names):
+    by_name = {index.name: index for index in table.indexes}
+    for name in names:
+        by_name[name].create(connection, checkfirst=True)
+
+def drop_indexes(connection, table, names):
+    by_name = {index.name: index for index in table.indexes}
+    for name in names:
+        by_name[name].drop(connection, checkfirst=True)
+
+def add_columns(connection, table, names):
+    """ALTER TABLE ... ADD COLUMN for model columns the table does not have yet"""
+    existing = {c['name'] for c in inspect(connection).get_columns(table.name)}
+    table_name = connection.dialect.identifier_preparer.format_table(table)
+    for name in names:
+        if name not in existing:
+            column = CreateColumn(table.c[name]).compile(dialect=connection.dialect)
+            connection.execute(text(f'ALTER TABLE {table_name} ADD COLUMN {column}'))
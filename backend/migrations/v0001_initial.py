@@ -0,0 +1,7 @@
+"""Tables as they stood before migrations were introduced."""
+from extensions import db
+from search import ensure_search_index
+
+def upgrade(connection):
+    db.metadata.create_all(connection)
+    ensure_search_index(connection)
@@ -0,0 +1,29 @@
+"""Composite and partial indexes for the listing and dashboard filters."""
+from migrations import create_indexes, drop_indexes
+from models import Service, Booking, Review, Payment
+
+INDEXES = [
+    (Service.__table__, [
+        'ix_services_active_category_rating',
+        'ix_services_active_rating',
+        'ix_services_active_price',
+        'ix_services_active_created',
+        'ix_services_provider_active',
+        'ix_services_category',
+    ]),
+    (Booking.__table__, [
+        'ix_bookings_provider_status',
+        'ix_bookings_buyer_status',
+        'ix_bookings_service',
+    ]),
+    (Review.__table__, ['ix_reviews_reviewee_created', 'ix_reviews_booking']),
+    (Payment.__table__, ['ix_payments_booking_status']),
+]
+
+def upgrade(connection):
+    for table, names in INDEXES:
+        create_indexes(connection, table, names)
+
+def downgrade(connection):
+    for table, names in INDEXES:
+        drop_indexes(connection, table, names)
@@ -0,0 +1,51 @@
+"""provider_stats read model for the provider dashboard, backfilled from history."""
+from datetime import datetime
+from sqlalchemy import Column, DateTime, Float, ForeignKey, Integer, MetaData, Table, case, column, delete, func, insert, select, table
+
+# The schema as of this version; see the package docstring
+metadata = MetaData()
+Table('users', metadata, Column('id', Integer, primary_key=True))
+provider_stats = Table(
+    'provider_stats', metadata,
+    Column('provider_id', Integer, ForeignKey('users.id'), primary_key=True),
+    Column('total_services', Integer, nullable=False, default=0),
+    Column('total_bookings', Integer, nullable=False, default=0),
+    Column('pending_bookings', Integer, nullable=False, default=0),
+    Column('total_earnings', Float, nullable=False, default=0.0),
+    Column('updated_at', DateTime)
+)
+services = table('services', column('id'), column('provider_id'))
+bookings = table('bookings', column('id'), column('provider_id'), column('status'), column('total_price'))
+
+def upgrade(connection):
+    provider_stats.create(connection, checkfirst=True)
+    rows = {}
+
+    def row(provider_id):
+        return rows.setdefault(provider_id, {
+            'provider_id': provider_id, 'total_services': 0, 'total_bookings': 0,
+            'pending_bookings': 0, 'total_earnings': 0.0, 'updated_at': datetime.utcnow()
+        })
+
+    for provider_id, count in connection.execute(
+        select(services.c.provider_id, func.count(services.c.id)).group_by(services.c.provider_id)
+    ):
+        row(provider_id)['total_services'] = count
+
+    for provider_id, total, pending, earnings in connection.execute(select(
+        bookings.c.provider_id,
+        func.count(bookings.c.id),
+        func.sum(case((bookings.c.status == 'pending', 1), else_=0)),
+        func.sum(case((bookings.c.status == 'completed', bookings.c.total_price), else_=0.0))
+    ).group_by(bookings.c.provider_id)):
+        stats = row(provider_id)
+        stats['total_bookings'] = total
+        stats['pending_bookings'] = pending or 0
+        stats['total_earnings'] = earnings or 0.0
+
+    connection.execute(delete(provider_stats))
+    if rows:
+        connection.execute(insert(provider_stats), list(rows.values()))
+
+def downgrade(connection):
+    provider_stats.drop(connection, checkfirst=True)
@@ -0,0 +1,57 @@
+"""Running rating average and count on provider_stats, backfilled from reviews."""
+from datetime import datetime
+from sqlalchemy import Column, DateTime, Float, Integer, MetaData, Table, bindparam, column, func, insert, select, table, update
+from migrations import add_columns
+
+# The schema as of this version; see the package docstring
+provider_stats = Table(
+    'provider_stats', MetaData(),
+    Column('provider_id', Integer, primary_key=True),
+    Column('total_services', Integer),
+    Column('total_bookings', Integer),
+    Column('pending_bookings', Integer),
+    Column('total_earnings', Float),
+    Column('rating', Float, nullable=False, default=0.0, server_default='0'),
+    Column('review_count', Integer, nullable=False, default=0, server_default='0'),
+    Column('updated_at', DateTime)
+)
+services = table('services', column('id'), column('rating'), column('review_count'))
+bookings = table('bookings', column('id'), column('service_id'))
+reviews = table('reviews', column('id'), column('booking_id'), column('reviewee_id'), column('rating'))
+
+def upgrade(connection):
+    add_columns(connection, provider_stats, ['rating', 'review_count'])
+
+    service_ratings = connection.execute(
+        select(bookings.c.service_id, func.avg(reviews.c.rating), func.count(reviews.c.id))
+        .join(bookings, reviews.c.booking_id == bookings.c.id)
+        .group_by(bookings.c.service_id)
+    ).all()
+    connection.execute(update(services).values(rating=0.0, review_count=0))
+    if service_ratings:
+        connection.execute(
+            update(services).where(services.c.id == bindparam('key')).values(
+                rating=bindparam('average'), review_count=bindparam('count')
+            ),
+            [{'key': sid, 'average': average, 'count': count} for sid, average, count in service_ratings]
+        )
+
+    provider_ratings = connection.execute(
+        select(reviews.c.reviewee_id, func.avg(reviews.c.rating), func.count(reviews.c.id))
+        .group_by(reviews.c.reviewee_id)
+    ).all()
+    existing = set(connection.execute(select(provider_stats.c.provider_id)).scalars())
+    missing = [pid for pid, _, _ in provider_ratings if pid not in existing]
+    if missing:
+        connection.execute(insert(provider_stats), [{
+            'provider_id': pid, 'total_services': 0, 'total_bookings': 0, 'pending_bookings': 0,
+            'total_earnings': 0.0, 'updated_at': datetime.utcnow()
+        } for pid in missing])
+    connection.execute(update(provider_stats).values(rating=0.0, review_count=0))
+    if provider_ratings:
+        connection.execute(
+            update(provider_stats).where(provider_stats.c.provider_id == bindparam('key')).values(
+                rating=bindparam('average'), review_count=bindparam('count')
+            ),
+            [{'key': pid, 'average': average, 'count': count} for pid, average, count in provider_ratings]
+        )
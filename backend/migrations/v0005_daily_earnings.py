@@ -0,0 +1,43 @@
+"""daily_earnings rollup of completed payments, backfilled from history."""
+from sqlalchemy import Column, Date, Float, ForeignKey, Integer, MetaData, Table, column, delete, func, insert, select, table
+
+# The schema as of this version; see the package docstring
+metadata = MetaData()
+Table('users', metadata, Column('id', Integer, primary_key=True))
+daily_earnings = Table(
+    'daily_earnings', metadata,
+    Column('provider_id', Integer, ForeignKey('users.id'), primary_key=True),
+    Column('day', Date, primary_key=True),
+    Column('amount', Float, nullable=False, default=0.0),
+    Column('commission', Float, nullable=False, default=0.0),
+    Column('seller_amount', Float, nullable=False, default=0.0),
+    Column('payment_count', Integer, nullable=False, default=0)
+)
+bookings = table('bookings', column('id'), column('provider_id'))
+payments = table('payments', column('id'), column('booking_id'), column('amount'), column('commission'),
+                 column('seller_amount'), column('status'), column('created_at'))
+
+def upgrade(connection):
+    daily_earnings.create(connection, checkfirst=True)
+    day = func.date(payments.c.created_at, type_=Date)
+    rollup = select(
+        bookings.c.provider_id,
+        day,
+        func.sum(payments.c.amount),
+        func.sum(payments.c.commission),
+        func.sum(payments.c.seller_amount),
+        func.count(payments.c.id)
+    ).join(bookings, payments.c.booking_id == bookings.c.id).where(
+        payments.c.status == 'completed'
+    ).group_by(bookings.c.provider_id, day)
+    rows = [{
+        'provider_id': provider_id, 'day': day, 'amount': amount, 'commission': commission,
+        'seller_amount': seller_amount, 'payment_count': count
+    } for provider_id, day, amount, commission, seller_amount, count in connection.execute(rollup)]
+
+    connection.execute(delete(daily_earnings))
+    if rows:
+        connection.execute(insert(daily_earnings), rows)
+
+def downgrade(connection):
+    daily_earnings.drop(connection, checkfirst=True)
@@ -0,0 +1,9 @@
+"""Service coordinates with a grid-cell index, backfilled from the providers."""
+from geo import backfill_service_locations
+from migrations import add_columns, create_indexes
+from models import Service
+
+def upgrade(connection):
+    add_columns(connection, Service.__table__, ['lat', 'lng', 'geo_cell'])
+    create_indexes(connection, Service.__table__, ['ix_services_active_geo'])
+    backfill_service_locations(connection)
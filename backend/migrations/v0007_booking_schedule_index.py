@@ -0,0 +1,9 @@
+"""Index bookings by provider and start time for schedule window lookups."""
+from migrations import create_indexes, drop_indexes
+from models import Booking
+
+def upgrade(connection):
+    create_indexes(connection, Booking.__table__, ['ix_bookings_provider_date'])
+
+def downgrade(connection):
+    drop_indexes(connection, Booking.__table__, ['ix_bookings_provider_date'])
@@ -0,0 +1,10 @@
+"""entity_versions counters behind the conditional GET validators."""
+from models import EntityVersion
+from versions import seed_versions
+
+def upgrade(connection):
+    EntityVersion.__table__.create(connection, checkfirst=True)
+    seed_versions(connection)
+
+def downgrade(connection):
+    EntityVersion.__table__.drop(connection, checkfirst=True)
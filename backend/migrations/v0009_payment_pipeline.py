@@ -0,0 +1,17 @@
+"""Payment job queue: jobs table, bookings.payment_status and the payment
+idempotency columns, with payment_status backfilled from completed payments."""
+from sqlalchemy import exists, select, update
+from migrations import add_columns, create_indexes
+from models import Booking, Job, Payment
+
+def upgrade(connection):
+    Job.__table__.create(connection, checkfirst=True)
+    add_columns(connection, Booking.__table__, ['payment_status'])
+    add_columns(connection, Payment.__table__, ['idempotency_key', 'checkout_request_id', 'failure_reason'])
+    create_indexes(connection, Booking.__table__, ['ix_bookings_buyer_payment'])
+    create_indexes(connection, Payment.__table__, ['ix_payments_idempotency_key', 'ix_payments_checkout_request'])
+    bookings, payments = Booking.__table__, Payment.__table__
+    connection.execute(update(bookings).where(
+        bookings.c.payment_status == 'unpaid',
+        exists(select(payments.c.id).where(payments.c.booking_id == bookings.c.id, payments.c.status == 'completed'))
+    ).values(payment_status='paid'))
@@ -0,0 +1,58 @@
+"""Stored ranking score for sort=relevance, with its indexes, computed for
+every existing service."""
+from datetime import datetime, timedelta
+from sqlalchemy import (Boolean, Column, DateTime, Float, Index, Integer, MetaData, String, Table, bindparam,
+                        column, func, select, table, text, update)
+from migrations import add_columns, create_indexes
+
+# The schema and ranking.py's formula as of this version; see the package docstring
+PRIOR_RATING = 3.5
+PRIOR_WEIGHT = 5.0
+BOOKING_WEIGHT = 1.0
+BOOKING_HALF = 10.0
+RECENT_DAYS = 30
+INITIAL_SCORE = PRIOR_RATING
+
+services = Table(
+    'services', MetaData(),
+    Column('id', Integer, primary_key=True),
+    Column('category', String(100)),
+    Column('rating', Float),
+    Column('review_count', Integer),
+    Column('is_active', Boolean),
+    Column('recent_bookings', Integer, nullable=False, default=0, server_default='0'),
+    Column('score', Float, nullable=False, default=INITIAL_SCORE, server_default=str(INITIAL_SCORE)),
+    Index('ix_services_active_score', 'score', 'id',
+          sqlite_where=text('is_active = 1'), postgresql_where=text('is_active')),
+    Index('ix_services_active_category_score', 'category', 'score', 'id',
+          sqlite_where=text('is_active = 1'), postgresql_where=text('is_active'))
+)
+bookings = table('bookings', column('id'), column('service_id'), column('created_at', DateTime))
+
+def upgrade(connection):
+    add_columns(connection, services, ['recent_bookings', 'score'])
+    create_indexes(connection, services, ['ix_services_active_score', 'ix_services_active_category_score'])
+
+    since = datetime.utcnow() - timedelta(days=RECENT_DAYS)
+    recent = connection.execute(
+        select(bookings.c.service_id, func.count(bookings.c.id))
+        .where(bookings.c.created_at >= since)
+        .group_by(bookings.c.service_id)
+    ).all()
+    connection.execute(update(services).values(recent_bookings=0))
+    if recent:
+        connection.execute(
+            update(services).where(services.c.id == bindparam('key')).values(recent_bookings=bindparam('count')),
+            [{'key': service_id, 'count': count} for service_id, count in recent]
+        )
+    review_count = func.coalesce(services.c.review_count, 0)
+    rating_total = func.coalesce(services.c.rating, 0.0) * review_count
+    connection.execute(update(services).values(score=(
+        (PRIOR_WEIGHT * PRIOR_RATING + rating_total) / (PRIOR_WEIGHT + review_count)
+        + BOOKING_WEIGHT * services.c.recent_bookings / (services.c.recent_bookings + BOOKING_HALF)
+    )))
+
+    if connection.dialect.name == 'sqlite':
+        # Without statistics for the new indexes the planner guesses, and
+        # may pick the category/score index for a category/rating listing
+        connection.exec_driver_sql('ANALYZE services')
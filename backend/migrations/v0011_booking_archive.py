@@ -0,0 +1,15 @@
+"""Archive tables for old bookings and their payments (see archive.py)."""
+from sqlalchemy import func, select
+from migrations import MigrationError
+from models import ArchivedBooking, ArchivedPayment
+
+def upgrade(connection):
+    ArchivedBooking.__table__.create(connection, checkfirst=True)
+    ArchivedPayment.__table__.create(connection, checkfirst=True)
+
+def downgrade(connection):
+    archived = connection.scalar(select(func.count()).select_from(ArchivedBooking.__table__))
+    if archived:
+        raise MigrationError(f'{archived} bookings are archived; dropping the archive would lose them')
+    ArchivedPayment.__table__.drop(connection, checkfirst=True)
+    ArchivedBooking.__table__.drop(connection, checkfirst=True)
@@ -1,6 +1,6 @@
-from extensions import db  # Import from extensions instead of app
+from extensions import db, hasher  # Import from extensions instead of app
 from datetime import datetime
-from werkzeug.security import generate_password_hash, check_password_hash
+from ranking import INITIAL_SCORE
 
 class User(db.Model):
     __tablename__ = 'users'
@@ -27,13 +27,40 @@ class User(db.Model):
     bookings_as_provider = db.relationship('Booking', foreign_keys='Booking.provider_id', backref='provider_rel', lazy=True)
     
     def set_password(self, password):
-        self.password_hash = generate_password_hash(password)
+        self.password_hash = hasher.hash(password)
     
     def check_password(self, password):
-        return check_password_hash(self.password_hash, password)
+        # Upgrade the stored hash when it predates the configured parameters
+        matches, new_hash = hasher.verify(self.password_hash, password)
+        if new_hash:
+            self.password_hash = new_hash
+        return matches
 
 class Service(db.Model):
     __tablename__ = 'services'
+    __table_args__ = (
+        # Listings only ever show active services, so the filter indexes are
+        # partial and stay small as inactive listings pile up.
+        db.Index('ix_services_active_category_rating', 'category', 'rating',
+                 sqlite_where=db.text('is_active = 1'), postgresql_where=db.text('is_active')),
+        db.Index('ix_services_active_rating', 'rating',
+                 sqlite_where=db.text('is_active = 1'), postgresql_where=db.text('is_active')),
+        db.Index('ix_services_active_price', 'price',
+                 sqlite_where=db.text('is_active = 1'), postgresql_where=db.text('is_active')),
+        db.Index('ix_services_active_created', 'created_at', 'id',
+                 sqlite_where=db.text('is_active = 1'), postgresql_where=db.text('is_active')),
+        # sort=relevance, with and without a category filter
+        db.Index('ix_services_active_score', 'score', 'id',
+                 sqlite_where=db.text('is_active = 1'), postgresql_where=db.text('is_active')),
+        db.Index('ix_services_active_category_score', 'category', 'score', 'id',
+                 sqlite_where=db.text('is_active = 1'), postgresql_where=db.text('is_active')),
+        db.Index('ix_services_provider_active', 'provider_id', 'is_active'),
+        db.Index('ix_services_category', 'category'),
+        # Cover the nearby search, filters included, so candidates are ranked
+        # without touching the table: cell ranges, bounding box, then filters
+        db.Index('ix_services_active_geo', 'geo_cell', 'lat', 'lng', 'category', 'price', 'rating',
+                 sqlite_where=db.text('is_active = 1'), postgresql_where=db.text('is_active')),
+    )
     
     id = db.Column(db.Integer, primary_key=True)
     title = db.Column(db.String(200), nullable=False)
@@ -51,11 +78,24 @@ class Service(db.Model):
     images = db.Column(db.Text)
     rating = db.Column(db.Float, default=0.0)
     review_count = db.Column(db.Integer, default=0)
+    # Ranking inputs and result, see ranking.py
+    recent_bookings = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+    score = db.Column(db.Float, nullable=False, default=INITIAL_SCORE, server_default=str(INITIAL_SCORE))
     is_active = db.Column(db.Boolean, default=True)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    lat = db.Column(db.Float)
+    lng = db.Column(db.Float)
+    geo_cell = db.Column(db.Integer)
 
 class Booking(db.Model):
     __tablename__ = 'bookings'
+    __table_args__ = (
+        db.Index('ix_bookings_provider_status', 'provider_id', 'status'),
+        db.Index('ix_bookings_buyer_status', 'buyer_id', 'status'),
+        db.Index('ix_bookings_service', 'service_id'),
+        db.Index('ix_bookings_provider_date', 'provider_id', 'booking_date'),
+        db.Index('ix_bookings_buyer_payment', 'buyer_id', 'payment_status', 'status'),
+    )
     
     id = db.Column(db.Integer, primary_key=True)
     service_id = db.Column(db.Integer, db.ForeignKey('services.id'), nullable=False)
@@ -65,6 +105,8 @@ class Booking(db.Model):
     duration = db.Column(db.Float)
     total_price = db.Column(db.Float, nullable=False)
     status = db.Column(db.String(20), default='pending')
+    # 'unpaid', 'pending' while a payment is in flight, then 'paid'
+    payment_status = db.Column(db.String(20), nullable=False, default='unpaid', server_default='unpaid')
     location_address = db.Column(db.String(200))
     special_requests = db.Column(db.Text)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
@@ -73,6 +115,10 @@ class Booking(db.Model):
 
 class Review(db.Model):
     __tablename__ = 'reviews'
+    __table_args__ = (
+        db.Index('ix_reviews_reviewee_created', 'reviewee_id', 'created_at'),
+        db.Index('ix_reviews_booking', 'booking_id'),
+    )
     
     id = db.Column(db.Integer, primary_key=True)
     booking_id = db.Column(db.Integer, db.ForeignKey('bookings.id'), nullable=False)
@@ -88,6 +134,11 @@ class Review(db.Model):
 
 class Payment(db.Model):
     __tablename__ = 'payments'
+    __table_args__ = (
+        db.Index('ix_payments_booking_status', 'booking_id', 'status'),
+        db.Index('ix_payments_idempotency_key', 'idempotency_key', unique=True),
+        db.Index('ix_payments_checkout_request', 'checkout_request_id', unique=True),
+    )
     
     id = db.Column(db.Integer, primary_key=True)
     booking_id = db.Column(db.Integer, db.ForeignKey('bookings.id'), nullable=False)
@@ -98,6 +149,115 @@ class Payment(db.Model):
     phone_number = db.Column(db.String(20), nullable=False)  
     status = db.Column(db.String(20), default='pending')  
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    # Client-supplied key that makes retried initiations return the same payment
+    idempotency_key = db.Column(db.String(64))
+    # Gateway reference of the payment request, matched by its callback
+    checkout_request_id = db.Column(db.String(64))
+    failure_reason = db.Column(db.String(200))
     
     booking = db.relationship('Booking', backref='payment')
 
+
+# ===== ARCHIVE =====
+# Completed and cancelled bookings past ARCHIVE_AFTER_DAYS, with their
+# payments, moved out of the hot tables by `flask archive-bookings` (see
+# archive.py). Same columns and relationship names as Booking and Payment, so
+# the listing shapes read either; indexed only for the per-user listings.
+class ArchivedBooking(db.Model):
+    __tablename__ = 'bookings_archive'
+    __table_args__ = (
+        db.Index('ix_bookings_archive_buyer', 'buyer_id', 'created_at'),
+        db.Index('ix_bookings_archive_provider', 'provider_id', 'created_at'),
+    )
+    
+    id = db.Column(db.Integer, primary_key=True)
+    service_id = db.Column(db.Integer, db.ForeignKey('services.id'), nullable=False)
+    buyer_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
+    provider_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
+    booking_date = db.Column(db.DateTime, nullable=False)
+    duration = db.Column(db.Float)
+    total_price = db.Column(db.Float, nullable=False)
+    status = db.Column(db.String(20))
+    payment_status = db.Column(db.String(20), nullable=False)
+    location_address = db.Column(db.String(200))
+    special_requests = db.Column(db.Text)
+    created_at = db.Column(db.DateTime)
+    archived_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+    
+    service = db.relationship('Service')
+    buyer = db.relationship('User', foreign_keys=[buyer_id])
+    provider_rel = db.relationship('User', foreign_keys=[provider_id])
+
+class ArchivedPayment(db.Model):
+    __tablename__ = 'payments_archive'
+    __table_args__ = (
+        db.Index('ix_payments_archive_booking', 'booking_id'),
+    )
+    
+    id = db.Column(db.Integer, primary_key=True)
+    booking_id = db.Column(db.Integer, db.ForeignKey('bookings_archive.id'), nullable=False)
+    amount = db.Column(db.Float, nullable=False)
+    commission = db.Column(db.Float, nullable=False)
+    seller_amount = db.Column(db.Float, nullable=False)
+    mpesa_receipt = db.Column(db.String(50))
+    phone_number = db.Column(db.String(20), nullable=False)
+    status = db.Column(db.String(20))
+    created_at = db.Column(db.DateTime)
+    idempotency_key = db.Column(db.String(64))
+    checkout_request_id = db.Column(db.String(64))
+    failure_reason = db.Column(db.String(200))
+    
+    booking = db.relationship('ArchivedBooking')
+
+class ProviderStats(db.Model):
+    __tablename__ = 'provider_stats'
+    
+    # Read model for the provider dashboard, kept current by the write
+    # controllers in the same transaction as the change (see stats.py)
+    provider_id = db.Column(db.Integer, db.ForeignKey('users.id'), primary_key=True)
+    total_services = db.Column(db.Integer, nullable=False, default=0)
+    total_bookings = db.Column(db.Integer, nullable=False, default=0)
+    pending_bookings = db.Column(db.Integer, nullable=False, default=0)
+    total_earnings = db.Column(db.Float, nullable=False, default=0.0)
+    rating = db.Column(db.Float, nullable=False, default=0.0, server_default='0')
+    review_count = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+class DailyEarnings(db.Model):
+    __tablename__ = 'daily_earnings'
+    
+    # Per-provider, per-day rollup of completed payments (see stats.py)
+    provider_id = db.Column(db.Integer, db.ForeignKey('users.id'), primary_key=True)
+    day = db.Column(db.Date, primary_key=True)
+    amount = db.Column(db.Float, nullable=False, default=0.0)
+    commission = db.Column(db.Float, nullable=False, default=0.0)
+    seller_amount = db.Column(db.Float, nullable=False, default=0.0)
+    payment_count = db.Column(db.Integer, nullable=False, default=0)
+
+class EntityVersion(db.Model):
+    __tablename__ = 'entity_versions'
+    
+    # One counter per table, bumped by every write to it (see versions.py)
+    entity = db.Column(db.String(50), primary_key=True)
+    version = db.Column(db.Integer, nullable=False, default=0)
+    updated_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+
+class Job(db.Model):
+    __tablename__ = 'jobs'
+    __table_args__ = (
+        db.Index('ix_jobs_ready', 'status', 'run_at'),
+    )
+    
+    # Durable background work, claimed and run by `flask jobs-work` (see jobs.py)
+    id = db.Column(db.Integer, primary_key=True)
+    kind = db.Column(db.String(50), nullable=False)
+    payload = db.Column(db.Text, nullable=False)
+    status = db.Column(db.String(20), nullable=False, default='queued')
+    attempts = db.Column(db.Integer, nullable=False, default=0)
+    max_attempts = db.Column(db.Integer, nullable=False, default=5)
+    run_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+    locked_by = db.Column(db.String(100))
+    locked_until = db.Column(db.DateTime)
+    last_error = db.Column(db.Text)
+    created_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+    finished_at = db.Column(db.DateTime)
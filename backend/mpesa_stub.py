@@ -0,0 +1,126 @@
+"""Local stand-in for the Daraja STK push API.
+
+    python mpesa_stub.py --port 5055 --delay 1 --fail-rate 0.1 --duplicate-rate 0.05
+
+Point the app at it with PAYMENT_GATEWAY='mpesa', MPESA_BASE_URL set to the
+stub and MPESA_CALLBACK_URL to the app's /api/payments/callback. Every
+accepted STK push is answered with a callback after --delay seconds: a
+success with a receipt number, or a cancellation (--fail-rate). With
+--duplicate-rate some callbacks are delivered twice, and --error-rate makes
+some pushes fail with a 503, to exercise idempotency and job retries.
+Callbacks that do not get a 2xx are retried a few times with backoff.
+"""
+import argparse
+import json
+import random
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from urllib.request import Request, urlopen
+from flask import Flask, jsonify, request
+from werkzeug.serving import make_server
+
+CALLBACK_ATTEMPTS = 4
+
+def create_stub_app(delay=1.0, fail_rate=0.0, duplicate_rate=0.0, error_rate=0.0, seed=None):
+    app = Flask('mpesa_stub')
+    rng = random.Random(seed)
+    rng_lock = threading.Lock()
+    pool = ThreadPoolExecutor(max_workers=8, thread_name_prefix='stk-callback')
+    stats = {'pushes': 0, 'rejected': 0, 'callbacks': 0, 'callback_failures': 0}
+    app.config['STUB_STATS'] = stats
+
+    def chance(rate):
+        with rng_lock:
+            return rng.random() < rate
+
+    def count(key):
+        with rng_lock:
+            stats[key] += 1
+
+    def deliver(url, body):
+        data = json.dumps(body).encode()
+        for attempt in range(CALLBACK_ATTEMPTS):
+            try:
+                with urlopen(Request(url, data=data, headers={'Content-Type': 'application/json'}), timeout=10):
+                    count('callbacks')
+                    return
+            except Exception:
+                time.sleep(0.5 * 2 ** attempt)
+        count('callback_failures')
+
+    def settle(push, checkout_id, merchant_id, succeed, duplicate):
+        time.sleep(delay)
+        callback = {'MerchantRequestID': merchant_id, 'CheckoutRequestID': checkout_id}
+        if succeed:
+            callback.update(ResultCode=0, ResultDesc='The service request is processed successfully.', CallbackMetadata={'Item': [
+                {'Name': 'Amount', 'Value': push['Amount']},
+                {'Name': 'MpesaReceiptNumber', 'Value': 'STB' + uuid.uuid4().hex[:7].upper()},
+                {'Name': 'TransactionDate', 'Value': int(datetime.now().strftime('%Y%m%d%H%M%S'))},
+                {'Name': 'PhoneNumber', 'Value': int(push['PhoneNumber'])},
+            ]})
+        else:
+            callback.update(ResultCode=1032, ResultDesc='Request cancelled by user')
+        body = {'Body': {'stkCallback': callback}}
+        deliver(push['CallBackURL'], body)
+        if duplicate:
+            deliver(push['CallBackURL'], body)
+
+    @app.route('/oauth/v1/generate', methods=['GET'])
+    def token():
+        if not request.authorization:
+            return jsonify({'errorMessage': 'Invalid Authentication passed'}), 400
+        return jsonify({'access_token': 'stub-' + uuid.uuid4().hex, 'expires_in': '3599'})
+
+    @app.route('/mpesa/stkpush/v1/processrequest', methods=['POST'])
+    def stk_push():
+        if not request.headers.get('Authorization', '').startswith('Bearer '):
+            return jsonify({'errorMessage': 'Invalid Access Token'}), 401
+        push = request.get_json()
+        missing = [key for key in ('BusinessShortCode', 'Password', 'Amount', 'PhoneNumber', 'CallBackURL') if not push.get(key)]
+        if missing:
+            count('rejected')
+            return jsonify({'errorMessage': f'Missing {", ".join(missing)}'}), 400
+        if chance(error_rate):
+            return jsonify({'errorMessage': 'System is busy'}), 503
+        count('pushes')
+        checkout_id = f'ws_CO_{uuid.uuid4().hex}'
+        merchant_id = f'{uuid.uuid4().int % 10 ** 5}-{uuid.uuid4().int % 10 ** 8}-1'
+        pool.submit(settle, push, checkout_id, merchant_id, not chance(fail_rate), chance(duplicate_rate))
+        return jsonify({
+            'MerchantRequestID': merchant_id,
+            'CheckoutRequestID': checkout_id,
+            'ResponseCode': '0',
+            'ResponseDescription': 'Success. Request accepted for processing',
+            'CustomerMessage': 'Success. Request accepted for processing'
+        })
+
+    @app.route('/_stats', methods=['GET'])
+    def stub_stats():
+        return jsonify(stats)
+
+    return app
+
+def serve(port=5055, host='127.0.0.1', **options):
+    """Start the stub in a background thread; returns the server (call shutdown())"""
+    server = make_server(host, port, create_stub_app(**options), threaded=True)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=5055)
+    parser.add_argument('--delay', type=float, default=1.0, help='Seconds before the callback is sent.')
+    parser.add_argument('--fail-rate', type=float, default=0.0, help='Share of pushes the customer cancels.')
+    parser.add_argument('--duplicate-rate', type=float, default=0.0, help='Share of callbacks delivered twice.')
+    parser.add_argument('--error-rate', type=float, default=0.0, help='Share of pushes answered with a 503.')
+    parser.add_argument('--seed', type=int)
+    args = parser.parse_args()
+    app = create_stub_app(args.delay, args.fail_rate, args.duplicate_rate, args.error_rate, args.seed)
+    app.run(host=args.host, port=args.port, threaded=True)
+
+if __name__ == '__main__':
+    main()
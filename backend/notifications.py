@@ -0,0 +1,30 @@
+"""Booking and payment change events for the buyer's and the provider's
+streams (see pubsub.py). Events carry only what changed, so a page can patch
+the row it shows instead of refetching the list."""
+from extensions import db, events
+
+def user_channel(user_id):
+    return f'user:{user_id}'
+
+def _publish(booking, event):
+    channels = {user_channel(booking.buyer_id), user_channel(booking.provider_id)}
+    events.publish_after_commit(db.session, channels, {k: v for k, v in event.items() if v is not None})
+
+def booking_changed(booking, status=None):
+    """The booking was created or changed status; `booking` must have an id"""
+    _publish(booking, {
+        'type': 'booking',
+        'booking_id': booking.id,
+        'status': status or booking.status,
+        'payment_status': booking.payment_status
+    })
+
+def payment_changed(payment, status, payment_status=None):
+    """`payment` moved to `status`, and its booking to `payment_status` if given"""
+    _publish(payment.booking, {
+        'type': 'payment',
+        'payment_id': payment.id,
+        'booking_id': payment.booking_id,
+        'status': status,
+        'payment_status': payment_status
+    })
@@ -0,0 +1,133 @@
+import base64
+import json
+from datetime import datetime
+from flask import Response, current_app, jsonify, request, stream_with_context
+from sqlalchemy import and_, or_
+
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 500
+STREAM_BATCH_SIZE = 1000
+
+class CursorError(ValueError):
+    pass
+
+def encode_cursor(values):
+    payload = json.dumps(values, default=lambda v: v.isoformat(), separators=(',', ':'))
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip('=')
+
+def decode_cursor(cursor, order):
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        values = json.loads(base64.urlsafe_b64decode(padded.encode()))
+    except (ValueError, TypeError):
+        raise CursorError('Invalid cursor')
+    if not isinstance(values, list) or len(values) != len(order):
+        raise CursorError('Invalid cursor')
+    return [_coerce(column, value) for (column, _), value in zip(order, values)]
+
+def _coerce(column, value):
+    """A cursor value as its column's Python type; CursorError when it is not one"""
+    if value is None and getattr(column, 'nullable', False):
+        return value
+    if isinstance(value, (list, dict)) or value is None:
+        raise CursorError('Invalid cursor')
+    try:
+        python_type = column.type.python_type
+    except NotImplementedError:
+        return value
+    if python_type is datetime:
+        if not isinstance(value, str):
+            raise CursorError('Invalid cursor')
+        try:
+            return datetime.fromisoformat(value)
+        except ValueError:
+            raise CursorError('Invalid cursor')
+    if isinstance(value, bool) and python_type is not bool:
+        raise CursorError('Invalid cursor')
+    if python_type is float and isinstance(value, int):
+        return float(value)
+    if not isinstance(value, python_type):
+        raise CursorError('Invalid cursor')
+    return value
+
+def keyset_filter(order, values):
+    """Rows strictly after `values` in `order`, expanded so each column may
+    have its own direction: (a > x) OR (a = x AND b > y) OR ..."""
+    clauses = []
+    for i, (column, descending) in enumerate(order):
+        beyond = column < values[i] if descending else column > values[i]
+        ties = [order[j][0] == values[j] for j in range(i)]
+        clauses.append(and_(*ties, beyond))
+    return or_(*clauses)
+
+def order_clauses(order):
+    return [column.desc() if descending else column.asc() for column, descending in order]
+
+def paginate(query, order, values, limit, cursor=None):
+    """Return one page of rows and the cursor for the next one.
+
+    `order` is a list of (column, descending) pairs that must end in a unique
+    column, and `values(row)` returns the matching key values for a row.
+    """
+    if cursor:
+        query = query.filter(keyset_filter(order, decode_cursor(cursor, order)))
+    rows = query.order_by(*order_clauses(order)).limit(limit + 1).all()
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = encode_cursor(list(values(rows[-1])))
+    return rows, next_cursor
+
+def stream_rows(query, order, dump, fmt):
+    """Stream every row as a JSON array or NDJSON without materialising the list"""
+    dumps = current_app.json.dumps
+    rows = query.order_by(*order_clauses(order)).yield_per(STREAM_BATCH_SIZE)
+
+    def generate_ndjson():
+        for row in rows:
+            yield dumps(dump(row)) + '\n'
+
+    def generate_array():
+        yield '['
+        first = True
+        for row in rows:
+            yield dumps(dump(row)) if first else ',' + dumps(dump(row))
+            first = False
+        yield ']'
+
+    if fmt == 'ndjson':
+        return Response(stream_with_context(generate_ndjson()), mimetype='application/x-ndjson')
+    return Response(stream_with_context(generate_array()), mimetype='application/json')
+
+def page_limit():
+    try:
+        limit = int(request.args.get('limit', DEFAULT_PAGE_SIZE))
+    except ValueError:
+        raise ValueError('limit must be an integer')
+    if limit < 1:
+        raise ValueError('limit must be positive')
+    return min(limit, MAX_PAGE_SIZE)
+
+def list_response(query, dump, order, values, ordered=False):
+    """Render a listing in whichever mode the request asks for.
+
+    `?stream=json|ndjson` streams the full result, `?limit=` and `?cursor=`
+    return one keyset page as {'items': [...], 'next_cursor': ...}, and a
+    plain request keeps returning the whole list, in `order` when `ordered`.
+    """
+    fmt = request.args.get('stream')
+    if fmt:
+        if fmt not in ('json', 'ndjson'):
+            return jsonify({'error': 'stream must be "json" or "ndjson"'}), 400
+        return stream_rows(query, order, dump, fmt)
+
+    if 'limit' in request.args or 'cursor' in request.args:
+        try:
+            rows, next_cursor = paginate(query, order, values, page_limit(), request.args.get('cursor'))
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+        return jsonify({'items': [dump(row) for row in rows], 'next_cursor': next_cursor})
+
+    if ordered:
+        query = query.order_by(*order_clauses(order))
+    return jsonify([dump(row) for row in query.all()])
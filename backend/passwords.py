@@ -0,0 +1,136 @@
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor, TimeoutError as FutureTimeout
+from werkzeug.security import generate_password_hash, check_password_hash
+
+class HasherBusy(Exception):
+    """Raised instead of queueing when every hashing slot is taken"""
+
+# ===== WORKER FUNCTIONS =====
+# These run in the pool processes, so they only take and return plain values.
+def _hash(password, method, salt_length):
+    return generate_password_hash(password, method=method, salt_length=salt_length)
+
+def _verify(stored, password, method, salt_length):
+    """Check a password and, when the stored hash uses old parameters, return
+    a replacement hash computed in the same round trip"""
+    if not check_password_hash(stored, password):
+        return False, None
+    if needs_rehash(stored, method, salt_length):
+        return True, _hash(password, method, salt_length)
+    return True, None
+
+def needs_rehash(stored, method, salt_length):
+    stored_method, _, rest = stored.partition('$')
+    salt = rest.partition('$')[0]
+    return stored_method != method or len(salt) != salt_length
+
+# ===== HASHER =====
+class PasswordHasher:
+    """Hashes and checks passwords in a bounded process pool.
+
+    Hashing is deliberately slow and holds the GIL, so running it in the web
+    worker stalls every other request. The pool moves that work off the
+    worker, and the pending limit makes a login burst fail fast with
+    HasherBusy instead of building an unbounded queue.
+
+    Configuration:
+      PASSWORD_HASH_METHOD       werkzeug method string, default 'pbkdf2:sha256:600000'
+      PASSWORD_SALT_LENGTH       default 16
+      PASSWORD_HASH_WORKERS      pool processes, default half the cores; 0 hashes inline
+      PASSWORD_HASH_MAX_PENDING  hashes queued or running before rejecting, default 4 per worker
+      PASSWORD_HASH_TIMEOUT      seconds to wait for a result, default 10
+    """
+
+    def __init__(self, app=None):
+        self.method = 'pbkdf2:sha256:600000'
+        self.salt_length = 16
+        self.workers = 0
+        self.timeout = 10
+        self.max_pending = None
+        self._slots = None
+        self._pool = None
+        self._pool_pid = None
+        self._pending = set()
+        self._lock = threading.Lock()
+        self._rejected = 0
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        self.method = app.config.setdefault('PASSWORD_HASH_METHOD', 'pbkdf2:sha256:600000')
+        self.salt_length = app.config.setdefault('PASSWORD_SALT_LENGTH', 16)
+        self.workers = app.config.setdefault('PASSWORD_HASH_WORKERS', max(1, (os.cpu_count() or 2) // 2))
+        max_pending = app.config.setdefault('PASSWORD_HASH_MAX_PENDING', max(1, self.workers) * 4)
+        self.timeout = app.config.setdefault('PASSWORD_HASH_TIMEOUT', 10)
+        self.max_pending = max_pending
+        self._slots = threading.BoundedSemaphore(max_pending)
+        self.shutdown()
+        app.extensions['password_hasher'] = self
+
+    def hash(self, password):
+        return self._run(_hash, password, self.method, self.salt_length)
+
+    def verify(self, stored, password):
+        """Return (matches, new_hash); new_hash is set when the caller should
+        store an upgraded hash for this user"""
+        return self._run(_verify, stored, password, self.method, self.salt_length)
+
+    def needs_rehash(self, stored):
+        return needs_rehash(stored, self.method, self.salt_length)
+
+    def _run(self, fn, *args):
+        if self._slots is None:
+            return fn(*args)
+        if not self._slots.acquire(blocking=False):
+            self._rejected += 1
+            raise HasherBusy('Password hashing is saturated')
+        if not self.workers:
+            try:
+                return fn(*args)
+            finally:
+                self._slots.release()
+        try:
+            future = self._executor().submit(fn, *args)
+        except Exception:
+            self._slots.release()
+            raise
+        # The slot is held until the worker finishes, even if this request
+        # gives up waiting, so abandoned hashes still count against the limit.
+        self._pending.add(future)
+        future.add_done_callback(self._done)
+        try:
+            return future.result(timeout=self.timeout)
+        except FutureTimeout:
+            future.cancel()
+            raise HasherBusy('Password hashing timed out')
+
+    def _done(self, future):
+        self._pending.discard(future)
+        self._slots.release()
+
+    def _executor(self):
+        # Created lazily and per process, so a pre-forking server never
+        # shares one parent's pool between its workers.
+        with self._lock:
+            if self._pool is None or self._pool_pid != os.getpid():
+                self._pool = ProcessPoolExecutor(max_workers=self.workers)
+                self._pool_pid = os.getpid()
+            return self._pool
+
+    def shutdown(self):
+        with self._lock:
+            if self._pool is not None and self._pool_pid == os.getpid():
+                # By hand rather than shutdown(cancel_futures=True), which
+                # needs Python 3.9; running hashes cannot be cancelled
+                for future in list(self._pending):
+                    future.cancel()
+                self._pool.shutdown(wait=False)
+            self._pool = None
+
+    def stats(self):
+        return {
+            'workers': self.workers,
+            'max_pending': self.max_pending,
+            'rejected': self._rejected
+        }
@@ -0,0 +1,112 @@
+"""Payment workflow.
+
+Initiation only records a pending Payment and queues a job, in one
+transaction, so checkout returns without waiting on the gateway. A job worker
+sends the request to the gateway; the outcome comes back either immediately
+(simulated gateway) or later through the M-Pesa callback. Completion and
+failure are conditional updates on the payment's status, so a job retried
+after a crash, or a callback delivered twice, changes nothing the second time.
+"""
+from datetime import datetime
+from sqlalchemy import update
+from extensions import db, gateway
+from gateways import GatewayRejected
+from jobs import enqueue
+from models import Booking, Payment
+from notifications import payment_changed
+from stats import record_payment_completed
+from versions import bump_versions
+
+COMMISSION_RATE = 0.10
+REQUEST_JOB = 'payments.request'
+
+class PaymentInProgress(Exception):
+    """Raised when the booking already has a payment in flight, or is paid"""
+
+def start_payment(booking, phone_number, idempotency_key=None):
+    """Add a pending payment for the booking and queue its gateway request.
+
+    The booking moves to 'pending' with a conditional update, so of two
+    concurrent initiations only one queues a charge; the other raises
+    PaymentInProgress.
+    """
+    claimed = db.session.execute(
+        update(Booking).where(Booking.id == booking.id, Booking.payment_status.notin_(('pending', 'paid')))
+        .values(payment_status='pending')
+    )
+    if claimed.rowcount == 0:
+        raise PaymentInProgress(f'Booking {booking.id} already has a payment in flight or is paid')
+    commission = booking.total_price * COMMISSION_RATE
+    payment = Payment(
+        booking_id=booking.id,
+        amount=booking.total_price,
+        commission=commission,
+        seller_amount=booking.total_price - commission,
+        phone_number=phone_number,
+        status='pending',
+        idempotency_key=idempotency_key,
+        created_at=datetime.utcnow()
+    )
+    db.session.add(payment)
+    db.session.flush()
+    enqueue(REQUEST_JOB, {'payment_id': payment.id})
+    payment_changed(payment, 'pending', 'pending')
+    return payment
+
+def complete_payment(payment, receipt):
+    """Mark a payment completed; returns False when it already was.
+
+    A late success also settles a payment previously marked failed: the
+    customer has paid either way.
+    """
+    result = db.session.execute(
+        update(Payment).where(Payment.id == payment.id, Payment.status != 'completed')
+        .values(status='completed', mpesa_receipt=receipt, failure_reason=None)
+    )
+    if result.rowcount == 0:
+        return False
+    record_payment_completed(payment, payment.booking.provider_id)
+    db.session.execute(update(Booking).where(Booking.id == payment.booking_id).values(payment_status='paid'))
+    payment_changed(payment, 'completed', 'paid')
+    return True
+
+def fail_payment(payment, reason):
+    """Mark a pending payment failed; returns False when it was not pending"""
+    result = db.session.execute(
+        update(Payment).where(Payment.id == payment.id, Payment.status == 'pending')
+        .values(status='failed', failure_reason=(reason or 'Payment failed')[:200])
+    )
+    if result.rowcount == 0:
+        return False
+    # Another payment may have settled the booking in the meantime
+    result = db.session.execute(
+        update(Booking).where(Booking.id == payment.booking_id, Booking.payment_status == 'pending')
+        .values(payment_status='unpaid')
+    )
+    payment_changed(payment, 'failed', 'unpaid' if result.rowcount else None)
+    return True
+
+def request_payment_job(payload, job):
+    """Send a pending payment to the gateway. Safe to run more than once: a
+    payment that already has a gateway reference or is settled is skipped."""
+    payment = db.session.get(Payment, payload['payment_id'])
+    if payment is None or payment.status != 'pending' or payment.checkout_request_id:
+        return
+    try:
+        requested = gateway.request_payment(payment)
+    except GatewayRejected as e:
+        fail_payment(payment, str(e))
+        bump_versions('payments', 'bookings')
+        return
+    except Exception as e:
+        if not job.final:
+            raise
+        fail_payment(payment, str(e))
+        bump_versions('payments', 'bookings')
+        return
+    payment.checkout_request_id = requested.checkout_request_id
+    if requested.receipt:
+        complete_payment(payment, requested.receipt)
+    bump_versions('payments', 'bookings')
+
+JOB_HANDLERS = {REQUEST_JOB: request_payment_job}
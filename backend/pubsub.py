@@ -0,0 +1,289 @@
+"""Change events pushed to browsers as Server-Sent Events.
+
+Writes queue small event dicts on the session with publish_after_commit();
+they go out only when that transaction commits, so a rolled-back change is
+never announced and a job committed by the worker publishes like a request
+does. Events go to named channels ('user:12'); every open stream holds a
+Subscription to its channels.
+
+Events are encoded once per publish and the same bytes are appended to each
+subscriber of the channel, so a publish costs nothing for the streams of
+other users. An idle stream sleeps on its own condition until an event or
+its keep-alive wakes it, so the bus itself carries thousands of streams
+(benchmarks/bench_events.py). The server does not: each stream holds a
+worker thread for minutes, so gunicorn.conf.py serves streams from gthread
+workers only, at most half their threads each. That caps a deployment at
+WEB_CONCURRENCY * (WEB_THREADS // 2) open streams, tens to low hundreds.
+
+The memory backend delivers within one process. Deployments run several
+web processes and `flask jobs-work`, so there the redis backend relays each
+publish through Redis pub/sub to the subscribers of every process, and
+streams are only served with it unless EVENTS_STREAMS says otherwise.
+"""
+import json
+import threading
+import time
+from sqlalchemy import event
+from database import RoutingSession
+
+PENDING_KEY = 'pending_events'
+RESYNC = b'event: resync\ndata: {}\n\n'
+KEEPALIVE = b': keep-alive\n\n'
+
+def encode(event):
+    """One SSE frame; the event dict's 'type' is the SSE event name"""
+    data = json.dumps(event, separators=(',', ':'))
+    return f'event: {event["type"]}\ndata: {data}\n\n'.encode()
+
+# ===== SESSION HOOKS =====
+@event.listens_for(RoutingSession, 'after_commit')
+def _publish_pending(session):
+    for bus, channels, frame in session.info.pop(PENDING_KEY, ()):
+        bus.publish_frame(channels, frame)
+
+@event.listens_for(RoutingSession, 'after_rollback')
+def _discard_pending(session):
+    session.info.pop(PENDING_KEY, None)
+
+# ===== BACKENDS =====
+class MemoryBackend:
+    """Delivers to the subscribers of this process only"""
+
+    def __init__(self):
+        self.deliver = None
+
+    def start(self, deliver):
+        self.deliver = deliver
+
+    def publish(self, channel, frame):
+        # Not started: nothing in this process has subscribed yet
+        if self.deliver is not None:
+            self.deliver(channel, frame)
+
+    def close(self):
+        pass
+
+class RedisBackend:
+    """Relays frames through Redis pub/sub, so every process's subscribers
+    get them. The listener thread starts with the first subscription, so a
+    pre-forking master never runs one.
+
+    `client` is anything speaking the redis-py API, so a local stand-in such
+    as fakeredis can replace a real server in tests.
+    """
+
+    def __init__(self, client, prefix='events:'):
+        self.client = client
+        self.prefix = prefix
+        self._listener = None
+
+    def start(self, deliver):
+        prefix = self.prefix
+
+        def handle(message):
+            channel = message['channel']
+            if isinstance(channel, bytes):
+                channel = channel.decode()
+            deliver(channel[len(prefix):], message['data'])
+
+        pubsub = self.client.pubsub(ignore_subscribe_messages=True)
+        pubsub.psubscribe(**{prefix + '*': handle})
+        self._listener = pubsub.run_in_thread(sleep_time=1.0, daemon=True)
+
+    def publish(self, channel, frame):
+        self.client.publish(self.prefix + channel, frame)
+
+    def close(self):
+        if self._listener is not None:
+            self._listener.stop()
+            self._listener = None
+
+# ===== SUBSCRIPTIONS =====
+class Subscription:
+    """One stream's mailbox of encoded frames. A client too slow to drain
+    `max_queue` of them loses the backlog and gets a single resync event
+    telling it to refetch instead."""
+
+    def __init__(self, channels, max_queue):
+        self.channels = tuple(channels)
+        self.max_queue = max_queue
+        self.frames = []
+        self.overflowed = False
+        self._ready = threading.Condition(threading.Lock())
+
+    def put(self, frame):
+        """Queue a frame; False when it was dropped for a resync"""
+        with self._ready:
+            if self.overflowed:
+                return False
+            if len(self.frames) >= self.max_queue:
+                self.frames = [RESYNC]
+                self.overflowed = True
+            else:
+                self.frames.append(frame)
+            self._ready.notify()
+            return not self.overflowed
+
+    def get(self, timeout):
+        """The queued frames, waiting up to `timeout` seconds for one"""
+        with self._ready:
+            if not self.frames:
+                self._ready.wait(timeout)
+            frames, self.frames = self.frames, []
+            self.overflowed = False
+            return frames
+
+class EventStream:
+    """Response body of one SSE connection. close() (called by the server
+    when the client goes away or the stream ends) unsubscribes, even if the
+    body was never iterated."""
+
+    def __init__(self, bus, subscription, seconds):
+        self.bus = bus
+        self.subscription = subscription
+        self.deadline = time.monotonic() + seconds
+        self.closed = False
+
+    def __iter__(self):
+        # The first bytes flush the headers, which fires the browser's onopen
+        yield f'retry: {self.bus.retry_ms}\n\n'.encode()
+        while True:
+            remaining = self.deadline - time.monotonic()
+            if remaining <= 0:
+                return
+            frames = self.subscription.get(min(self.bus.keepalive_seconds, remaining))
+            if frames:
+                yield b''.join(frames)
+            elif remaining > self.bus.keepalive_seconds:
+                yield KEEPALIVE
+
+    def close(self):
+        if not self.closed:
+            self.closed = True
+            self.bus.close_stream(self)
+
+# ===== EVENT BUS =====
+class EventBus:
+    """Publish/subscribe for change events.
+
+    Configuration:
+      EVENTS_BACKEND            'memory' (default), 'redis' or 'null'
+      EVENTS_REDIS_URL          used when EVENTS_BACKEND is 'redis'
+      EVENTS_KEEPALIVE_SECONDS  comment sent on idle streams so proxies keep
+                                them open, default 15
+      EVENTS_STREAM_SECONDS     a stream ends after this long and the browser
+                                reconnects, default 300
+      EVENTS_RETRY_MS           reconnect delay suggested to browsers, default 2000
+      EVENTS_MAX_QUEUE          frames held for a slow stream before it is told
+                                to resync, default 100
+      EVENTS_STREAMS            whether to serve streams: 'on', 'off' or 'auto'
+                                (default), which serves them with the redis
+                                backend only; the memory backend never sees
+                                events published by other processes
+      EVENTS_MAX_STREAMS        streams open at once in this process, None
+                                (default) for no limit
+    """
+
+    def __init__(self, app=None):
+        self.backend = MemoryBackend()
+        self.enabled = True
+        self.keepalive_seconds = 15
+        self.stream_seconds = 300
+        self.retry_ms = 2000
+        self.max_queue = 100
+        self.streams = True
+        self.max_streams = None
+        self._open_streams = 0
+        self._channels = {}
+        self._lock = threading.Lock()
+        self._started = False
+        self._counts = {'published': 0, 'delivered': 0, 'dropped': 0}
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        kind = app.config.setdefault('EVENTS_BACKEND', 'memory')
+        self.keepalive_seconds = app.config.setdefault('EVENTS_KEEPALIVE_SECONDS', 15)
+        self.stream_seconds = app.config.setdefault('EVENTS_STREAM_SECONDS', 300)
+        self.retry_ms = app.config.setdefault('EVENTS_RETRY_MS', 2000)
+        self.max_queue = app.config.setdefault('EVENTS_MAX_QUEUE', 100)
+        self.enabled = kind != 'null'
+        streams = app.config.setdefault('EVENTS_STREAMS', 'auto')
+        self.streams = self.enabled and (kind == 'redis' if streams == 'auto' else streams == 'on')
+        self.max_streams = app.config.setdefault('EVENTS_MAX_STREAMS', None)
+        self.shutdown()
+        if kind == 'redis':
+            import redis
+            self.backend = RedisBackend(redis.Redis.from_url(app.config['EVENTS_REDIS_URL']))
+        else:
+            self.backend = MemoryBackend()
+        app.extensions['events'] = self
+
+    def publish_after_commit(self, session, channels, event):
+        """Publish `event` to `channels` once `session` commits"""
+        if self.enabled:
+            session.info.setdefault(PENDING_KEY, []).append((self, tuple(channels), encode(event)))
+
+    def publish(self, channels, event):
+        if self.enabled:
+            self.publish_frame(channels, encode(event))
+
+    def publish_frame(self, channels, frame):
+        self._counts['published'] += 1
+        for channel in channels:
+            self.backend.publish(channel, frame)
+
+    def subscribe(self, channels):
+        subscription = Subscription(channels, self.max_queue)
+        with self._lock:
+            if not self._started:
+                self.backend.start(self._deliver)
+                self._started = True
+            for channel in subscription.channels:
+                self._channels.setdefault(channel, set()).add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription):
+        with self._lock:
+            for channel in subscription.channels:
+                subscribers = self._channels.get(channel)
+                if subscribers is not None:
+                    subscribers.discard(subscription)
+                    if not subscribers:
+                        del self._channels[channel]
+
+    def stream(self, channels, seconds=None):
+        """SSE response body: frames as they are published, keep-alives
+        while idle, ending after `seconds` (default EVENTS_STREAM_SECONDS).
+        Subscribes now, so nothing published after this call is missed.
+        None when this process already has EVENTS_MAX_STREAMS open."""
+        with self._lock:
+            if self.max_streams is not None and self._open_streams >= self.max_streams:
+                return None
+            self._open_streams += 1
+        return EventStream(self, self.subscribe(channels), self.stream_seconds if seconds is None else seconds)
+
+    def close_stream(self, stream):
+        self.unsubscribe(stream.subscription)
+        with self._lock:
+            self._open_streams -= 1
+
+    def _deliver(self, channel, frame):
+        with self._lock:
+            subscribers = tuple(self._channels.get(channel, ()))
+        for subscription in subscribers:
+            self._counts['delivered' if subscription.put(frame) else 'dropped'] += 1
+
+    def shutdown(self):
+        """Stop the backend's listener; subscribing again restarts it"""
+        with self._lock:
+            self.backend.close()
+            self._started = False
+
+    def stats(self):
+        with self._lock:
+            subscribers = sum(len(s) for s in self._channels.values())
+            channels = len(self._channels)
+            streams = self._open_streams
+        return dict(self._counts, backend=type(self.backend).__name__, channels=channels, subscribers=subscribers,
+                    streams=streams, serving_streams=self.streams)
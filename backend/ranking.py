@@ -0,0 +1,26 @@
+"""Service ranking score, stored in services.score for sort=relevance.
+
+The score is a Bayesian average rating plus a bonus for recent demand:
+
+    (PRIOR_WEIGHT * PRIOR_RATING + rating * review_count) / (PRIOR_WEIGHT + review_count)
+    + BOOKING_WEIGHT * recent_bookings / (recent_bookings + BOOKING_HALF)
+
+A service with few reviews is pulled towards PRIOR_RATING, so one five-star
+review does not outrank a hundred four-star ones. The booking bonus saturates
+at BOOKING_WEIGHT; BOOKING_HALF recent bookings earn half of it.
+
+score() only uses arithmetic, so the same function builds the SQL expression
+from columns and computes the value from numbers.
+"""
+PRIOR_RATING = 3.5
+PRIOR_WEIGHT = 5.0
+BOOKING_WEIGHT = 1.0
+BOOKING_HALF = 10.0
+RECENT_DAYS = 30
+
+def score(rating_total, review_count, recent_bookings):
+    """`rating_total` is rating * review_count, the sum of the ratings"""
+    rating = (PRIOR_WEIGHT * PRIOR_RATING + rating_total) / (PRIOR_WEIGHT + review_count)
+    return rating + BOOKING_WEIGHT * recent_bookings / (recent_bookings + BOOKING_HALF)
+
+INITIAL_SCORE = score(0.0, 0, 0)
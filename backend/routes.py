@@ -1,5 +1,8 @@
 from flask import app, jsonify, request
 from controllers import *
+from extensions import cache, hasher, gateway, suggestions, events
+from instrumentation import metrics_snapshot
+from serving import readiness
 
 def register_routes(app):
     
@@ -8,6 +11,25 @@ def register_routes(app):
     def health_check():
         return jsonify({"status": "healthy", "message": "Service Marketplace API is running"})
     
+    # Readiness: warmed up and able to reach the database
+    @app.route('/api/ready')
+    def ready_check():
+        ready, details = readiness()
+        if ready:
+            try:
+                db.session.execute(db.text('SELECT 1'))
+            except Exception as e:
+                ready, details['database'] = False, str(e)
+        return jsonify(dict(details, status='ready' if ready else 'not_ready')), 200 if ready else 503
+    
+    @app.route('/api/_cache/stats', methods=['GET'])
+    def cache_stats_route():
+        return jsonify(cache.stats())
+    
+    @app.route('/api/_metrics', methods=['GET'])
+    def metrics_route():
+        return jsonify(dict(metrics_snapshot(), cache=cache.stats(), password_hasher=hasher.stats(), payment_gateway=gateway.stats(), suggest=suggestions.stats(), events=events.stats()))
+    
     # Auth routes
     @app.route('/api/auth/register', methods=['POST'])
     def register_user_route():
@@ -35,11 +57,19 @@ def register_routes(app):
     def create_new_service_route():
         return create_service()
     
+    @app.route('/api/services/batch', methods=['POST'])
+    def create_services_batch_route():
+        return create_services_batch()
+    
     @app.route('/api/me/services', methods=['GET'])
     def get_my_services_route():
         return get_my_services()
     
     # Booking routes
+    @app.route('/api/services/<int:service_id>/slots', methods=['GET'])
+    def get_service_slots_route(service_id):
+        return get_service_slots(service_id)
+    
     @app.route('/api/bookings', methods=['POST'])
     def create_new_booking_route():
         return create_booking()
@@ -48,6 +78,10 @@ def register_routes(app):
     def get_user_bookings_route(user_id):
         return get_user_bookings(user_id)
     
+    @app.route('/api/bookings/status/batch', methods=['PUT'])
+    def update_booking_statuses_batch_route():
+        return update_booking_statuses_batch()
+    
     @app.route('/api/bookings/<int:booking_id>/status', methods=['PUT'])
     def update_booking_status_route(booking_id):
         return update_booking_status(booking_id)
@@ -57,6 +91,10 @@ def register_routes(app):
     def create_new_review_route():
         return create_review()
     
+    @app.route('/api/reviews/batch', methods=['POST'])
+    def create_reviews_batch_route():
+        return create_reviews_batch()
+    
     @app.route('/api/reviews/service/<int:service_id>', methods=['GET'])
     def get_service_reviews_route(service_id):
         return get_service_reviews(service_id)
@@ -70,10 +108,22 @@ def register_routes(app):
     def get_all_categories_route():
         return get_categories()
     
+    @app.route('/api/bootstrap', methods=['GET'])
+    def bootstrap_route():
+        return get_bootstrap()
+    
+    @app.route('/api/suggest', methods=['GET'])
+    def suggest_route():
+        return suggest()
+    
     @app.route('/api/services/search', methods=['GET'])
     def search_services_route():
         return search_services()
     
+    @app.route('/api/services/nearby', methods=['GET'])
+    def nearby_services_route():
+        return nearby_services()
+    
     # Dashboard routes
     @app.route('/api/provider/<int:provider_id>/dashboard', methods=['GET'])
     def provider_dashboard_route(provider_id):
@@ -88,6 +138,10 @@ def register_routes(app):
     def initiate_payment_route():
         return initiate_payment()
 
+    @app.route('/api/payments/callback', methods=['POST'])
+    def payment_callback_route():
+        return payment_callback()
+
     @app.route('/api/payments/confirm', methods=['POST'])
     def confirm_payment_route():
         return confirm_payment()
@@ -99,6 +153,10 @@ def register_routes(app):
     @app.route('/api/providers/<int:provider_id>/earnings', methods=['GET'])
     def get_provider_earnings_route(provider_id):
         return get_provider_earnings(provider_id)
+
+    @app.route('/api/providers/<int:provider_id>/earnings/series', methods=['GET'])
+    def get_provider_earnings_series_route(provider_id):
+        return get_provider_earnings_series(provider_id)
     
     # Add these routes
     @app.route('/api/bookings/complete', methods=['POST'])
@@ -107,4 +165,9 @@ def register_routes(app):
 
     @app.route('/api/users/<int:user_id>/completed-unpaid', methods=['GET'])
     def get_completed_unpaid_bookings_route(user_id):
-        return get_completed_unpaid_bookings(user_id)
\ No newline at end of file
+        return get_completed_unpaid_bookings(user_id)
+    
+    # Event stream routes
+    @app.route('/api/stream/users/<int:user_id>', methods=['GET'])
+    def stream_user_events_route(user_id):
+        return stream_user_events(user_id)
@@ -0,0 +1,71 @@
+import re
+from flask import current_app
+from sqlalchemy import DDL, event, func, literal_column, select, text
+from sqlalchemy.sql import column, table
+from extensions import db
+from models import Service
+
+# External-content FTS5 index over the searchable service columns. The
+# services table stays the source of truth; the triggers below keep the
+# index in step with every insert, update and delete.
+FTS_DDL = [
+    """CREATE VIRTUAL TABLE IF NOT EXISTS services_fts USING fts5(
+        title, description, category, city,
+        content='services', content_rowid='id',
+        tokenize='unicode61 remove_diacritics 2', prefix='2 3'
+    )""",
+    """CREATE TRIGGER IF NOT EXISTS services_fts_ai AFTER INSERT ON services BEGIN
+        INSERT INTO services_fts(rowid, title, description, category, city)
+        VALUES (new.id, new.title, new.description, new.category, new.city);
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS services_fts_ad AFTER DELETE ON services BEGIN
+        INSERT INTO services_fts(services_fts, rowid, title, description, category, city)
+        VALUES ('delete', old.id, old.title, old.description, old.category, old.city);
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS services_fts_au AFTER UPDATE OF title, description, category, city ON services BEGIN
+        INSERT INTO services_fts(services_fts, rowid, title, description, category, city)
+        VALUES ('delete', old.id, old.title, old.description, old.category, old.city);
+        INSERT INTO services_fts(rowid, title, description, category, city)
+        VALUES (new.id, new.title, new.description, new.category, new.city);
+    END""",
+]
+
+# Column weights for bm25(), in FTS column order: a hit in the title counts
+# for more than one buried in the description.
+BM25_WEIGHTS = (10.0, 1.0, 4.0, 2.0)
+
+services_fts = table('services_fts', column('rowid'))
+_fts = literal_column('services_fts')
+
+for statement in FTS_DDL:
+    event.listen(Service.__table__, 'after_create', DDL(statement).execute_if(dialect='sqlite'))
+
+def ensure_search_index(connection):
+    """Create the FTS index on an existing database and backfill it"""
+    if connection.dialect.name != 'sqlite':
+        return
+    exists = connection.execute(
+        text("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'services_fts'")
+    ).first()
+    for statement in FTS_DDL:
+        connection.execute(text(statement))
+    if not exists:
+        rebuild_search_index(connection)
+
+def rebuild_search_index(connection):
+    connection.execute(text("INSERT INTO services_fts(services_fts) VALUES ('rebuild')"))
+
+def fts_enabled():
+    return current_app.config.get('SEARCH_FTS', True) and db.engine.dialect.name == 'sqlite'
+
+def build_match(q):
+    """Turn free text into an FTS5 query: every word must match, as a prefix"""
+    tokens = re.findall(r'\w+', q)
+    return ' '.join(f'"{token}"*' for token in tokens)
+
+def fts_hits(match):
+    return select(
+        services_fts.c.rowid.label('service_id'),
+        func.bm25(_fts, *BM25_WEIGHTS).label('rank'),
+        func.snippet(_fts, -1, '<mark>', '</mark>', '…', 12).label('snippet')
+    ).where(_fts.op('MATCH')(match)).subquery()
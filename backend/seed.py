@@ -10,7 +10,8 @@ def seed_database():
     
     with app.app_context():
         print("Creating database tables...")
-        db.create_all()
+        import migrations
+        migrations.upgrade(db.engine)
         
         print("Clearing existing data...")
         try:
@@ -269,6 +270,13 @@ def seed_database():
         db.session.add_all([review1, review2])
         db.session.commit()
         
+        print("Rebuilding provider stats...")
+        from stats import rebuild_provider_stats
+        from geo import backfill_service_locations
+        with db.engine.begin() as connection:
+            rebuild_provider_stats(connection)
+            backfill_service_locations(connection)
+        
         print("✅ Database seeded successfully with Kenya data!")
         print(f"   - Created {User.query.count()} Kenyan users")
         print(f"   - Created {Service.query.count()} local services") 
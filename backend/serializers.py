@@ -0,0 +1,229 @@
+from operator import itemgetter
+from sqlalchemy.orm import aliased, configure_mappers
+from models import Service, Booking, Review, Payment
+
+# Backref attributes such as Service.provider only exist once the mappers
+# have been configured, and the shapes below resolve them at import time.
+configure_mappers()
+
+class Field:
+    """A column path plus a function applied to its value when dumping"""
+
+    def __init__(self, path, convert):
+        self.path = path
+        self.convert = convert
+
+def iso(path):
+    return Field(path, _isoformat)
+
+def _isoformat(value):
+    return value.isoformat() if value is not None else None
+
+class Serializer:
+    """Response shape for a listing endpoint, compiled once at import.
+
+    `fields` is a list of (key, source) pairs. A source is an attribute path
+    on `model` such as 'title' or 'provider.name', a Field wrapping a path
+    (see iso), or a nested list of pairs for an object inside the response.
+
+    `query()` turns a query for `model` into one that selects only the
+    shape's columns, joining every relationship on the paths once, so no
+    entity is hydrated and wide columns the shape does not use stay in the
+    database. `dump()` maps one such row to the response dict with a function
+    built for the shape.
+    """
+
+    def __init__(self, model, fields):
+        self.model = model
+        self.fields = list(fields)
+        self.columns = []
+        self._joins = {}
+        self._twins = {}
+        self.dump = self._compile(self.fields, '')
+
+    def _compile(self, fields, prefix):
+        """Dump function for `fields`: one itemgetter call and a dict built
+        from it, then the converted and nested keys rewritten in place"""
+        keys, indexes, converted, nested = [], [], [], []
+        for key, source in fields:
+            if isinstance(source, list):
+                child = self._compile(source, f'{prefix}{key}_')
+                nested.append((key, child))
+                # A placeholder that keeps the key in its place; child() replaces it
+                indexes.append(len(self.columns) - 1)
+            else:
+                path, convert = (source.path, source.convert) if isinstance(source, Field) else (source, None)
+                self.columns.append(self._column(path).label(prefix + key))
+                indexes.append(len(self.columns) - 1)
+                if convert is not None:
+                    converted.append((key, convert))
+            keys.append(key)
+        keys = tuple(keys)
+        if len(indexes) == 1:
+            index = indexes[0]
+            values = lambda row: (row[index],)
+        else:
+            values = itemgetter(*indexes)
+
+        if not converted and not nested:
+            return lambda row: dict(zip(keys, values(row)))
+
+        def dump(row):
+            result = dict(zip(keys, values(row)))
+            for key, convert in converted:
+                result[key] = convert(result[key])
+            for key, child in nested:
+                result[key] = child(row)
+            return result
+        return dump
+
+    def _column(self, path):
+        *relationships, attribute = path.split('.')
+        entity = self.model
+        for i, name in enumerate(relationships):
+            joined = '.'.join(relationships[:i + 1])
+            if joined not in self._joins:
+                relationship = getattr(entity, name)
+                target = aliased(relationship.property.mapper.class_, name=joined.replace('.', '_'))
+                self._joins[joined] = (target, relationship.of_type(target))
+            entity = self._joins[joined][0]
+        return getattr(entity, attribute)
+
+    def query(self, query, *extra):
+        """Project `query` onto the shape's columns followed by `extra`.
+
+        Filters on `model` still apply; add them before projecting when they
+        use filter_by, which would otherwise look at the last joined entity.
+        """
+        query = query.with_entities(*self.columns, *extra)
+        for _, onclause in self._joins.values():
+            # Outer joins, as the eager loads they replace: a dangling
+            # reference yields None instead of dropping the row
+            query = query.outerjoin(onclause)
+        return query
+
+    def over(self, model):
+        """The same shape read from `model`, a table with the same attribute
+        and relationship names (the archive tables of models.py)"""
+        if model is self.model:
+            return self
+        if model not in self._twins:
+            self._twins[model] = Serializer(model, self.fields)
+        return self._twins[model]
+
+    def dump_many(self, rows):
+        dump = self.dump
+        return [dump(row) for row in rows]
+
+# ===== SERVICE SHAPES =====
+SERVICE_LIST = Serializer(Service, [
+    ('id', 'id'),
+    ('title', 'title'),
+    ('description', 'description'),
+    ('category', 'category'),
+    ('price', 'price'),
+    ('price_type', 'price_type'),
+    ('city', 'city'),
+    ('rating', 'rating'),
+    ('review_count', 'review_count'),
+    ('provider_name', 'provider.name'),
+])
+
+SERVICE_SEARCH = Serializer(Service, [
+    ('id', 'id'),
+    ('title', 'title'),
+    ('description', 'description'),
+    ('category', 'category'),
+    ('price', 'price'),
+    ('city', 'city'),
+    ('rating', 'rating'),
+    ('provider_name', 'provider.name'),
+])
+
+SERVICE_DETAIL = Serializer(Service, [
+    ('id', 'id'),
+    ('title', 'title'),
+    ('description', 'description'),
+    ('category', 'category'),
+    ('price', 'price'),
+    ('price_type', 'price_type'),
+    ('city', 'city'),
+    ('rating', 'rating'),
+    ('review_count', 'review_count'),
+    ('availability_days', 'availability_days'),
+    ('availability_start', 'availability_start'),
+    ('availability_end', 'availability_end'),
+    ('provider', [
+        ('id', 'provider.id'),
+        ('name', 'provider.name'),
+        ('phone', 'provider.phone'),
+        ('city', 'provider.city'),
+    ]),
+])
+
+# ===== BOOKING SHAPES =====
+USER_BOOKING = Serializer(Booking, [
+    ('id', 'id'),
+    ('service_title', 'service.title'),
+    ('booking_date', iso('booking_date')),
+    ('total_price', 'total_price'),
+    ('status', 'status'),
+    ('buyer_name', 'buyer.name'),
+    ('provider_name', 'provider_rel.name'),
+])
+
+PROVIDER_BOOKING = Serializer(Booking, [
+    ('id', 'id'),
+    ('service_title', 'service.title'),
+    ('booking_date', iso('booking_date')),
+    ('total_price', 'total_price'),
+    ('status', 'status'),
+    ('buyer_name', 'buyer.name'),
+    ('buyer_phone', 'buyer.phone'),
+])
+
+DASHBOARD_BOOKING = Serializer(Booking, [
+    ('id', 'id'),
+    ('service_title', 'service.title'),
+    ('booking_date', iso('booking_date')),
+    ('status', 'status'),
+    ('total_price', 'total_price'),
+])
+
+UNPAID_BOOKING = Serializer(Booking, [
+    ('id', 'id'),
+    ('service_title', 'service.title'),
+    ('booking_date', iso('booking_date')),
+    ('total_price', 'total_price'),
+    ('provider_name', 'provider_rel.name'),
+])
+
+# ===== REVIEW SHAPES =====
+REVIEW = Serializer(Review, [
+    ('id', 'id'),
+    ('rating', 'rating'),
+    ('comment', 'comment'),
+    ('reviewer_name', 'reviewer.name'),
+    ('created_at', iso('created_at')),
+])
+
+# ===== PAYMENT SHAPES =====
+RECENT_PAYMENT = Serializer(Payment, [
+    ('id', 'id'),
+    ('amount', 'seller_amount'),
+    ('service_title', 'booking.service.title'),
+    ('date', iso('created_at')),
+    ('mpesa_receipt', 'mpesa_receipt'),
+])
+
+PAYMENT_DETAIL = Serializer(Payment, [
+    ('id', 'id'),
+    ('amount', 'amount'),
+    ('commission', 'commission'),
+    ('seller_amount', 'seller_amount'),
+    ('status', 'status'),
+    ('mpesa_receipt', 'mpesa_receipt'),
+    ('failure_reason', 'failure_reason'),
+    ('booking_id', 'booking_id'),
+    ('service_title', 'booking.service.title'),
+])
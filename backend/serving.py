@@ -0,0 +1,59 @@
+"""Per-worker state for the pre-forking production server (gunicorn.conf.py).
+
+The app is imported once in the master and forked into the workers. Each
+worker then drops the connections it inherited, optionally warms up and only
+then reports itself ready; /api/ready reflects that, while /api/health only
+says the process answers.
+
+Configuration:
+  WARM_UP        prime caches before a worker takes traffic, default True
+  WARM_UP_PATHS  GET paths requested during warm-up, besides /api/bootstrap
+                 and the services listing of every category
+"""
+import os
+import time
+from extensions import db, events, hasher
+
+DEFAULT_WARM_UP_PATHS = ('/api/categories', '/api/services', '/api/suggest?q=a')
+
+# Ready unless a server hook says otherwise: the dev server never warms up
+_state = {'ready': True, 'warm_up': None}
+
+def after_fork(app):
+    """Reset what a worker must not share with the master: pooled database
+    connections, the password hashing pool and the event bus listener"""
+    _state.update(ready=False, warm_up=None)
+    with app.app_context():
+        # close=False leaves the master's sockets alone; the worker just
+        # stops using them and opens its own
+        db.engine.dispose(close=False)
+    if 'read_engine' in app.extensions:
+        app.extensions['read_engine'].dispose(close=False)
+    hasher.shutdown()
+    events.shutdown()
+
+def warm_up(app):
+    """Request the catalog pages once so the response cache, the suggestion
+    index and SQLAlchemy's compiled statement cache are filled before real
+    traffic"""
+    started = time.perf_counter()
+    client = app.test_client()
+    paths = list(app.config.get('WARM_UP_PATHS', DEFAULT_WARM_UP_PATHS))
+    bootstrap = client.get('/api/bootstrap')
+    if bootstrap.status_code == 200:
+        paths += [f'/api/services?category={c["name"]}' for c in bootstrap.get_json()['categories']]
+    failed = [path for path in paths if client.get(path).status_code >= 400]
+    summary = {
+        'requests': len(paths) + 1,
+        'failed': failed,
+        'duration_ms': round((time.perf_counter() - started) * 1000, 1)
+    }
+    _state['warm_up'] = summary
+    return summary
+
+def mark_ready():
+    _state['ready'] = True
+
+def readiness():
+    """(ready, details) for this process"""
+    return _state['ready'], {'pid': os.getpid(), 'warm_up': _state['warm_up']}
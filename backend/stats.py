@@ -0,0 +1,312 @@
+from collections import defaultdict
+from datetime import datetime, timedelta
+from sqlalchemy import Date, bindparam, case, delete, func, insert, select, update
+from sqlalchemy.dialects import postgresql, sqlite
+from extensions import db
+from models import Service, Booking, Review, Payment, ProviderStats, DailyEarnings
+from archive import history
+from ranking import RECENT_DAYS, score
+
+# INSERT ... ON CONFLICT DO NOTHING, per supported dialect
+UPSERT_INSERTS = {'sqlite': sqlite.insert, 'postgresql': postgresql.insert}
+
+def _create_missing(model, keys):
+    """Insert a row with default values for each of `keys` that has none.
+
+    Checking first and then inserting would let two concurrent first writes
+    for one key both insert, and one of them fail on the primary key; the
+    conflict clause makes the second a no-op instead.
+    """
+    if keys:
+        upsert = UPSERT_INSERTS[db.engine.dialect.name]
+        db.session.execute(upsert(model).values(keys).on_conflict_do_nothing())
+
+def _ensure_provider_stats(provider_id):
+    _create_missing(ProviderStats, [{'provider_id': provider_id}])
+
+def _ensure_provider_stats_many(provider_ids):
+    _create_missing(ProviderStats, [{'provider_id': provider_id} for provider_id in provider_ids])
+
+def lock_provider_stats(provider_id):
+    """Lock a provider's stats row for the rest of the transaction.
+
+    Databases with row locks take them with SELECT ... FOR UPDATE. SQLite
+    ignores that clause, so the row is also touched with an UPDATE, which
+    takes SQLite's write lock before the caller reads anything it relies on.
+    """
+    _ensure_provider_stats(provider_id)
+    db.session.query(ProviderStats).filter_by(provider_id=provider_id).with_for_update().one()
+    db.session.query(ProviderStats).filter_by(provider_id=provider_id).update(
+        {'updated_at': datetime.utcnow()}, synchronize_session=False
+    )
+
+def bump_provider_stats(provider_id, **deltas):
+    """Add `deltas` to a provider's stats row inside the current transaction.
+
+    The increments are done in SQL (col = col + delta) so concurrent writers
+    never overwrite each other's counts.
+    """
+    _ensure_provider_stats(provider_id)
+    values = {name: getattr(ProviderStats, name) + delta for name, delta in deltas.items() if delta}
+    if values:
+        values['updated_at'] = datetime.utcnow()
+        db.session.query(ProviderStats).filter_by(provider_id=provider_id).update(
+            values, synchronize_session=False
+        )
+
+def bump_provider_stats_many(deltas_by_provider):
+    """bump_provider_stats for many providers with one executemany UPDATE.
+
+    `deltas_by_provider` maps provider_id to a dict of column deltas.
+    """
+    deltas_by_provider = {pid: deltas for pid, deltas in deltas_by_provider.items() if any(deltas.values())}
+    if not deltas_by_provider:
+        return
+    _ensure_provider_stats_many(list(deltas_by_provider))
+    names = sorted({name for deltas in deltas_by_provider.values() for name in deltas})
+    table = ProviderStats.__table__
+    values = {name: table.c[name] + bindparam(f'delta_{name}') for name in names}
+    values['updated_at'] = bindparam('now')
+    statement = update(table).where(table.c.provider_id == bindparam('key')).values(values)
+    now = datetime.utcnow()
+    db.session.connection().execute(statement, [
+        dict({f'delta_{name}': deltas.get(name, 0) for name in names}, key=provider_id, now=now)
+        for provider_id, deltas in deltas_by_provider.items()
+    ])
+
+def running_average(rating_col, count_col, total, count=1):
+    """SET values folding `count` more ratings summing to `total` into a
+    stored average and count.
+
+    Both expressions read the pre-update column values, so a single UPDATE
+    applies them atomically.
+    """
+    return {
+        rating_col: (rating_col * count_col + total) / (count_col + count),
+        count_col: count_col + count
+    }
+
+def record_review(service_id, reviewee_id, rating):
+    """Fold a new review into the service's and the provider's aggregates"""
+    record_reviews([(service_id, reviewee_id, rating)])
+
+def record_reviews(reviews):
+    """Fold (service_id, reviewee_id, rating) triples into the aggregates
+    with one executemany UPDATE per table"""
+    by_service = defaultdict(lambda: [0, 0])
+    by_provider = defaultdict(lambda: [0, 0])
+    for service_id, reviewee_id, rating in reviews:
+        for totals in (by_service[service_id], by_provider[reviewee_id]):
+            totals[0] += rating
+            totals[1] += 1
+    _ensure_provider_stats_many(list(by_provider))
+    connection = db.session.connection()
+    for table, key_col, totals in [
+        (Service.__table__, 'id', by_service),
+        (ProviderStats.__table__, 'provider_id', by_provider),
+    ]:
+        values = running_average(table.c.rating, table.c.review_count, bindparam('total'), bindparam('n'))
+        if 'score' in table.c:
+            # Like the average, from the pre-update values in the same UPDATE
+            rating_total, count = _rating_total(table.c), func.coalesce(table.c.review_count, 0)
+            values[table.c.score] = score(rating_total + bindparam('total'), count + bindparam('n'), table.c.recent_bookings)
+        if 'updated_at' in table.c:
+            values[table.c.updated_at] = datetime.utcnow()
+        statement = update(table).where(table.c[key_col] == bindparam('key')).values(values)
+        connection.execute(statement, [
+            {'key': key, 'total': total, 'n': count} for key, (total, count) in totals.items()
+        ])
+
+def _rating_total(columns):
+    """Sum of a service's ratings from its stored average and count"""
+    return func.coalesce(columns.rating, 0.0) * func.coalesce(columns.review_count, 0)
+
+def record_booking_created(service_id):
+    """Count a new booking towards the service's recent demand and score"""
+    db.session.execute(
+        update(Service).where(Service.id == service_id).values(
+            recent_bookings=Service.recent_bookings + 1,
+            score=score(_rating_total(Service), func.coalesce(Service.review_count, 0), Service.recent_bookings + 1)
+        ).execution_options(synchronize_session=False)
+    )
+
+def refresh_service_scores(connection, now=None):
+    """Recount every service's bookings of the last RECENT_DAYS and recompute
+    its score. Bookings age out of the window only here, so run it
+    periodically (flask ranking-refresh)."""
+    since = (now or datetime.utcnow()) - timedelta(days=RECENT_DAYS)
+    recent = connection.execute(
+        select(Booking.service_id, func.count(Booking.id))
+        .where(Booking.created_at >= since)
+        .group_by(Booking.service_id)
+    ).all()
+    connection.execute(update(Service).values(recent_bookings=0))
+    if recent:
+        connection.execute(
+            update(Service).where(Service.id == bindparam('key')).values(recent_bookings=bindparam('count')),
+            [{'key': service_id, 'count': count} for service_id, count in recent]
+        )
+    rescore_services(connection)
+    return len(recent)
+
+def rescore_services(connection):
+    """Recompute every score from the stored ratings and recent bookings"""
+    connection.execute(update(Service).values(
+        score=score(_rating_total(Service), func.coalesce(Service.review_count, 0), Service.recent_bookings)
+    ))
+
+def booking_status_deltas(booking, old_status, new_status):
+    """Stats deltas for moving `booking` from old_status to new_status"""
+    deltas = {'pending_bookings': 0, 'total_earnings': 0.0}
+    if old_status == new_status:
+        return deltas
+    if old_status == 'pending':
+        deltas['pending_bookings'] -= 1
+    if new_status == 'pending':
+        deltas['pending_bookings'] += 1
+    if old_status == 'completed':
+        deltas['total_earnings'] -= booking.total_price
+    if new_status == 'completed':
+        deltas['total_earnings'] += booking.total_price
+    return deltas
+
+def rebuild_provider_stats(connection):
+    """Recompute every provider's stats from scratch with SQL aggregates"""
+    rows = {}
+
+    def row(provider_id):
+        return rows.setdefault(provider_id, {
+            'provider_id': provider_id, 'total_services': 0, 'total_bookings': 0,
+            'pending_bookings': 0, 'total_earnings': 0.0, 'rating': 0.0, 'review_count': 0,
+            'updated_at': datetime.utcnow()
+        })
+
+    services = select(Service.provider_id, func.count(Service.id)).group_by(Service.provider_id)
+    for provider_id, count in connection.execute(services):
+        row(provider_id)['total_services'] = count
+
+    booking = history(Booking, 'id', 'provider_id', 'status', 'total_price').c
+    bookings = select(
+        booking.provider_id,
+        func.count(booking.id),
+        func.sum(case((booking.status == 'pending', 1), else_=0)),
+        func.sum(case((booking.status == 'completed', booking.total_price), else_=0.0))
+    ).group_by(booking.provider_id)
+    for provider_id, total, pending, earnings in connection.execute(bookings):
+        stats = row(provider_id)
+        stats['total_bookings'] = total
+        stats['pending_bookings'] = pending or 0
+        stats['total_earnings'] = earnings or 0.0
+
+    for provider_id, average, count in connection.execute(provider_rating_aggregates()):
+        stats = row(provider_id)
+        stats['rating'] = average
+        stats['review_count'] = count
+
+    connection.execute(delete(ProviderStats))
+    if rows:
+        connection.execute(insert(ProviderStats), list(rows.values()))
+    return len(rows)
+
+def provider_rating_aggregates():
+    return select(Review.reviewee_id, func.avg(Review.rating), func.count(Review.id)).group_by(Review.reviewee_id)
+
+def rebuild_ratings(connection):
+    """Recompute every service and provider rating with grouped aggregates"""
+    # Reviewed bookings are never archived, so the hot table has them all
+    service_ratings = connection.execute(
+        select(Booking.service_id, func.avg(Review.rating), func.count(Review.id))
+        .join(Booking, Review.booking_id == Booking.id)
+        .group_by(Booking.service_id)
+    ).all()
+    connection.execute(update(Service).values(rating=0.0, review_count=0))
+    if service_ratings:
+        connection.execute(
+            update(Service).where(Service.id == bindparam('key')).values(
+                rating=bindparam('average'), review_count=bindparam('count')
+            ),
+            [{'key': sid, 'average': average, 'count': count} for sid, average, count in service_ratings]
+        )
+
+    provider_ratings = connection.execute(provider_rating_aggregates()).all()
+    existing = set(connection.execute(select(ProviderStats.provider_id)).scalars())
+    missing = [pid for pid, _, _ in provider_ratings if pid not in existing]
+    if missing:
+        connection.execute(insert(ProviderStats), [{
+            'provider_id': pid, 'total_services': 0, 'total_bookings': 0, 'pending_bookings': 0,
+            'total_earnings': 0.0, 'updated_at': datetime.utcnow()
+        } for pid in missing])
+    connection.execute(update(ProviderStats).values(rating=0.0, review_count=0))
+    if provider_ratings:
+        connection.execute(
+            update(ProviderStats).where(ProviderStats.provider_id == bindparam('key')).values(
+                rating=bindparam('average'), review_count=bindparam('count')
+            ),
+            [{'key': pid, 'average': average, 'count': count} for pid, average, count in provider_ratings]
+        )
+    return len(service_ratings), len(provider_ratings)
+
+def record_payment_completed(payment, provider_id):
+    """Add a newly completed payment to its provider's daily rollup row"""
+    day = payment.created_at.date()
+    key = {'provider_id': provider_id, 'day': day}
+    _create_missing(DailyEarnings, [key])
+    db.session.query(DailyEarnings).filter_by(**key).update({
+        DailyEarnings.amount: DailyEarnings.amount + payment.amount,
+        DailyEarnings.commission: DailyEarnings.commission + payment.commission,
+        DailyEarnings.seller_amount: DailyEarnings.seller_amount + payment.seller_amount,
+        DailyEarnings.payment_count: DailyEarnings.payment_count + 1
+    }, synchronize_session=False)
+
+def rebuild_daily_earnings(connection):
+    """Recompute the daily_earnings rollup from completed payments"""
+    bookings = history(Booking, 'id', 'provider_id')
+    payments = history(Payment, 'id', 'booking_id', 'amount', 'commission', 'seller_amount', 'status', 'created_at')
+    payment = payments.c
+    day = func.date(payment.created_at, type_=Date)
+    rollup = select(
+        bookings.c.provider_id,
+        day,
+        func.sum(payment.amount),
+        func.sum(payment.commission),
+        func.sum(payment.seller_amount),
+        func.count(payment.id)
+    ).join(bookings, payment.booking_id == bookings.c.id).where(
+        payment.status == 'completed'
+    ).group_by(bookings.c.provider_id, day)
+    rows = [{
+        'provider_id': provider_id, 'day': day, 'amount': amount, 'commission': commission,
+        'seller_amount': seller_amount, 'payment_count': count
+    } for provider_id, day, amount, commission, seller_amount, count in connection.execute(rollup)]
+
+    connection.execute(delete(DailyEarnings))
+    if rows:
+        connection.execute(insert(DailyEarnings), rows)
+    return len(rows)
+
+# Start of the reporting period containing a day, per granularity
+PERIODS = {
+    'day': lambda day: day,
+    'week': lambda day: day - timedelta(days=day.weekday()),
+    'month': lambda day: day.replace(day=1)
+}
+
+def earnings_series(provider_id, start, end, granularity):
+    """Roll daily_earnings rows in [start, end] up into day/week/month buckets"""
+    period_of = PERIODS[granularity]
+    rows = DailyEarnings.query.filter(
+        DailyEarnings.provider_id == provider_id,
+        DailyEarnings.day >= start,
+        DailyEarnings.day <= end
+    ).order_by(DailyEarnings.day)
+
+    buckets = {}
+    for row in rows:
+        bucket = buckets.setdefault(period_of(row.day), {
+            'amount': 0.0, 'commission': 0.0, 'seller_amount': 0.0, 'payment_count': 0
+        })
+        bucket['amount'] += row.amount
+        bucket['commission'] += row.commission
+        bucket['seller_amount'] += row.seller_amount
+        bucket['payment_count'] += row.payment_count
+    return [dict(totals, period=period.isoformat()) for period, totals in buckets.items()]
@@ -0,0 +1,269 @@
+"""Typeahead suggestions from an in-process prefix index.
+
+Service titles, categories, cities and provider names are normalised to
+lowercase words and stored as sorted keys, one for every word a phrase can
+be typed from ('pump repair' is found by 'borehole' and by 'pump'). A prefix
+is then a contiguous slice of the keys, found with two bisects. Prefixes of
+up to TOP_DEPTH characters match too many keys to rank on every keystroke,
+so their best entries are ranked ahead of time; a longer prefix whose slice
+exceeds RANK_SCAN keys is ranked on first lookup and remembered.
+"""
+import heapq
+import math
+import re
+import threading
+import time
+from bisect import bisect_left, bisect_right
+
+TOP_DEPTH = 3
+RANK_SCAN = 256
+DEFAULT_LIMIT = 8
+MAX_LIMIT = 20
+_HIGHEST = '\U0010ffff'
+_WORD = re.compile(r'\w+')
+
+def normalize(text):
+    return ' '.join(_WORD.findall(text.casefold())) if text else ''
+
+def service_weight(rating, review_count):
+    """Well-reviewed services rank first; a new service still counts for something"""
+    return (1.0 + (rating or 0.0)) * math.log(2 + (review_count or 0))
+
+class _Entry:
+    __slots__ = ('weight', 'text', 'payload', 'phrases')
+
+    def __init__(self, text, payload):
+        self.weight = 0.0
+        self.text = text
+        self.payload = payload
+        self.phrases = ()
+
+    def order(self):
+        return -self.weight, self.text
+
+class PrefixIndex:
+    """Sorted phrase keys over suggestion entries plus ranked short prefixes.
+
+    Entries are identified by (kind, identity): a title shared by several
+    services is one suggestion weighted by its best service, while a
+    category, city or provider adds up the weights of its services.
+    """
+
+    def __init__(self):
+        self.phrases = []
+        self.numbers = []
+        self.entries = []
+        self.by_identity = {}
+        self.top = {}
+
+    @classmethod
+    def from_services(cls, rows):
+        """Bulk build from (service_id, title, category, city, provider_id,
+        provider_name, rating, review_count) rows: one sort, no inserts"""
+        index = cls()
+        for row in rows:
+            index._add(row)
+        keys = sorted((phrase, number) for number, entry in enumerate(index.entries) for phrase in entry.phrases)
+        index.phrases = [phrase for phrase, _ in keys]
+        index.numbers = [number for _, number in keys]
+        candidates = {}
+        for number, entry in enumerate(index.entries):
+            for prefix in index._prefixes(entry):
+                candidates.setdefault(prefix, []).append(number)
+        entries = index.entries
+        index.top = {
+            prefix: heapq.nsmallest(MAX_LIMIT, numbers, key=lambda n: entries[n].order())
+            for prefix, numbers in candidates.items()
+        }
+        return index
+
+    def add_service(self, row):
+        """Index one new service; existing entries it joins are re-ranked"""
+        for number, is_new in self._add(row):
+            entry = self.entries[number]
+            if is_new:
+                for phrase in entry.phrases:
+                    position = bisect_right(self.phrases, phrase)
+                    self.phrases.insert(position, phrase)
+                    self.numbers.insert(position, number)
+            for prefix in self._prefixes(entry, remembered=self.top):
+                ranked = self.top.setdefault(prefix, [])
+                if number not in ranked:
+                    if len(ranked) >= MAX_LIMIT and self.entries[ranked[-1]].order() <= entry.order():
+                        continue
+                    ranked.append(number)
+                ranked.sort(key=lambda n: self.entries[n].order())
+                del ranked[MAX_LIMIT:]
+
+    def lookup(self, q, limit=DEFAULT_LIMIT):
+        prefix = normalize(q)
+        if not prefix:
+            return []
+        if len(prefix) <= TOP_DEPTH or prefix in self.top:
+            numbers = self.top.get(prefix, ())[:limit]
+        else:
+            low = bisect_left(self.phrases, prefix)
+            high = bisect_left(self.phrases, prefix + _HIGHEST, low)
+            # A phrase can match at two of its words; set() counts it once
+            matches = set(self.numbers[low:high])
+            if high - low > RANK_SCAN:
+                self.top[prefix] = heapq.nsmallest(MAX_LIMIT, matches, key=lambda n: self.entries[n].order())
+                numbers = self.top[prefix][:limit]
+            else:
+                numbers = heapq.nsmallest(limit, matches, key=lambda n: self.entries[n].order())
+        return [self.entries[n].payload for n in numbers]
+
+    def _add(self, row):
+        service_id, title, category, city, provider_id, provider_name, rating, review_count = row
+        weight = service_weight(rating, review_count)
+        touched = []
+        for kind, identity, text, ref in (
+            ('service', normalize(title), title, service_id),
+            ('category', normalize(category), category, None),
+            ('city', normalize(city), city, None),
+            ('provider', provider_id, provider_name, provider_id),
+        ):
+            if not text or not identity:
+                continue
+            number = self.by_identity.get((kind, identity))
+            is_new = number is None
+            if is_new:
+                number = len(self.entries)
+                entry = _Entry(text, {'text': text, 'type': kind, 'id': ref})
+                phrase = normalize(text)
+                words = phrase.split(' ')
+                entry.phrases = tuple(dict.fromkeys(' '.join(words[i:]) for i in range(len(words))))
+                self.entries.append(entry)
+                self.by_identity[(kind, identity)] = number
+            entry = self.entries[number]
+            if kind == 'service':
+                if weight > entry.weight:
+                    entry.weight = weight
+                    entry.payload = {'text': text, 'type': kind, 'id': ref}
+            else:
+                entry.weight += weight
+            touched.append((number, is_new))
+        return touched
+
+    @staticmethod
+    def _prefixes(entry, remembered=()):
+        """The prefixes whose rankings `entry` belongs in: every short one, and
+        the longer ones in `remembered`"""
+        prefixes = set()
+        for phrase in entry.phrases:
+            for depth in range(1, len(phrase) + 1):
+                prefix = phrase[:depth]
+                if depth <= TOP_DEPTH or prefix in remembered:
+                    prefixes.add(prefix)
+        return prefixes
+
+class Suggestions:
+    """Process-local typeahead index over active services.
+
+    Built on first use (the production warm-up requests it) and extended in
+    place as services are created. Other processes create services too, so
+    once SUGGEST_REFRESH_SECONDS have passed a lookup checks the catalog
+    signature and rebuilds in the background if it moved. Services are never
+    retitled or deleted, so the newest id and the number of active services
+    move exactly when the indexed text does; bookings and reviews, which only
+    shift ranking weights, do not force a rebuild.
+
+    Configuration:
+      SUGGEST_REFRESH_SECONDS  default 300; 0 never rebuilds
+    """
+
+    def __init__(self, app=None):
+        self.refresh_seconds = 300
+        self._index = None
+        self._signature = None
+        self._checked_at = 0.0
+        self._lock = threading.Lock()
+        self._build_lock = threading.Lock()
+        self._refresh_lock = threading.Lock()
+        self._builds = 0
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        self.refresh_seconds = app.config.setdefault('SUGGEST_REFRESH_SECONDS', 300)
+        self._index = None
+        app.extensions['suggestions'] = self
+
+    def lookup(self, q, limit=DEFAULT_LIMIT):
+        index = self._index
+        if index is None:
+            with self._build_lock:
+                index = self._index or self.rebuild()
+        elif self.refresh_seconds and time.monotonic() - self._checked_at > self.refresh_seconds:
+            self._refresh()
+        with self._lock:
+            return index.lookup(q, limit)
+
+    def add_service(self, service):
+        """Add a just-created service; a no-op until the index is built"""
+        if self._index is None or not service.is_active:
+            return
+        row = (service.id, service.title, service.category, service.city, service.provider_id,
+               service.provider.name if service.provider else None, service.rating, service.review_count)
+        with self._lock:
+            self._index.add_service(row)
+
+    def rebuild(self):
+        from extensions import db
+        from models import Service, User
+
+        signature = self._catalog_signature()
+        rows = db.session.query(
+            Service.id, Service.title, Service.category, Service.city, Service.provider_id,
+            User.name, Service.rating, Service.review_count
+        ).outerjoin(User, User.id == Service.provider_id).filter(Service.is_active == True).order_by(Service.id).all()
+        index = PrefixIndex.from_services(rows)
+        with self._lock:
+            self._index, self._signature = index, signature
+            self._checked_at = time.monotonic()
+            self._builds += 1
+        return index
+
+    def _catalog_signature(self):
+        from extensions import db
+        from models import Service
+        from sqlalchemy import func
+
+        return tuple(db.session.query(func.max(Service.id), func.count(Service.id))
+                     .filter(Service.is_active == True).one())
+
+    def _refresh(self):
+        from flask import current_app
+
+        # One check and one rebuild at a time; a started rebuild holds the
+        # lock until it finishes
+        if not self._refresh_lock.acquire(blocking=False):
+            return
+        started = False
+        try:
+            self._checked_at = time.monotonic()
+            if self._catalog_signature() == self._signature:
+                return
+            app = current_app._get_current_object()
+
+            def rebuild():
+                try:
+                    with app.app_context():
+                        self.rebuild()
+                finally:
+                    self._refresh_lock.release()
+
+            threading.Thread(target=rebuild, daemon=True).start()
+            started = True
+        finally:
+            if not started:
+                self._refresh_lock.release()
+
+    def stats(self):
+        index = self._index
+        return {
+            'built': index is not None,
+            'entries': len(index.entries) if index else 0,
+            'keys': len(index.phrases) if index else 0,
+            'builds': self._builds
+        }
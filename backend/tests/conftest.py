@@ -0,0 +1,51 @@
+"""Fixtures: apps on throwaway SQLite databases, migrated like production."""
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+def create_test_app(database_path, **config):
+    """App bound to `database_path` with the response cache off unless asked for"""
+    from app import create_app
+    settings = {'SQLALCHEMY_DATABASE_URI': f'sqlite:///{database_path}', 'CACHE_BACKEND': 'null', 'TESTING': True}
+    settings.update(config)
+    return create_app(settings)
+
+def migrate(app):
+    import migrations
+    from extensions import db
+    with app.app_context():
+        return migrations.upgrade(db.engine)
+
+@pytest.fixture
+def database_path(tmp_path):
+    return tmp_path / 'marketplace.db'
+
+@pytest.fixture
+def app(database_path):
+    from extensions import db
+    app = create_test_app(database_path)
+    migrate(app)
+    yield app
+    with app.app_context():
+        db.session.remove()
+        db.engine.dispose()
+
+@pytest.fixture
+def client(app):
+    return app.test_client()
+
+@pytest.fixture
+def populate(app):
+    """populate(**sizes): fill the app's database with generated data"""
+    from datagen import generate
+    from extensions import db
+
+    def populate(seed=7, **sizes):
+        with app.app_context():
+            with db.engine.begin() as connection:
+                generate(connection, seed=seed, log=lambda message: None, **sizes)
+            db.engine.dispose()
+    return populate
@@ -0,0 +1,122 @@
+-- Schema of a database at migration v0002, dumped from sqlite_master
+CREATE TABLE schema_migrations (
+	version INTEGER NOT NULL, 
+	name VARCHAR(100) NOT NULL, 
+	applied_at DATETIME NOT NULL, 
+	PRIMARY KEY (version)
+);
+CREATE TABLE users (
+	id INTEGER NOT NULL, 
+	name VARCHAR(100) NOT NULL, 
+	email VARCHAR(120) NOT NULL, 
+	password_hash VARCHAR(200) NOT NULL, 
+	role VARCHAR(20) NOT NULL, 
+	phone VARCHAR(20), 
+	avatar VARCHAR(200), 
+	address VARCHAR(200), 
+	city VARCHAR(100), 
+	state VARCHAR(50), 
+	zip_code VARCHAR(20), 
+	lat FLOAT, 
+	lng FLOAT, 
+	is_verified BOOLEAN, 
+	created_at DATETIME, 
+	PRIMARY KEY (id), 
+	UNIQUE (email)
+);
+CREATE TABLE services (
+	id INTEGER NOT NULL, 
+	title VARCHAR(200) NOT NULL, 
+	description TEXT NOT NULL, 
+	category VARCHAR(100) NOT NULL, 
+	provider_id INTEGER NOT NULL, 
+	price FLOAT NOT NULL, 
+	price_type VARCHAR(20), 
+	city VARCHAR(100), 
+	state VARCHAR(50), 
+	serves_area TEXT, 
+	availability_days VARCHAR(100), 
+	availability_start VARCHAR(10), 
+	availability_end VARCHAR(10), 
+	images TEXT, 
+	rating FLOAT, 
+	review_count INTEGER, 
+	is_active BOOLEAN, 
+	created_at DATETIME, 
+	PRIMARY KEY (id), 
+	FOREIGN KEY(provider_id) REFERENCES users (id)
+);
+CREATE INDEX ix_services_active_category_rating ON services (category, rating) WHERE is_active = 1;
+CREATE INDEX ix_services_active_rating ON services (rating) WHERE is_active = 1;
+CREATE INDEX ix_services_active_price ON services (price) WHERE is_active = 1;
+CREATE INDEX ix_services_active_created ON services (created_at, id) WHERE is_active = 1;
+CREATE INDEX ix_services_category ON services (category);
+CREATE INDEX ix_services_provider_active ON services (provider_id, is_active);
+CREATE VIRTUAL TABLE services_fts USING fts5(
+        title, description, category, city,
+        content='services', content_rowid='id',
+        tokenize='unicode61 remove_diacritics 2', prefix='2 3'
+    );
+CREATE TRIGGER services_fts_ai AFTER INSERT ON services BEGIN
+        INSERT INTO services_fts(rowid, title, description, category, city)
+        VALUES (new.id, new.title, new.description, new.category, new.city);
+    END;
+CREATE TRIGGER services_fts_ad AFTER DELETE ON services BEGIN
+        INSERT INTO services_fts(services_fts, rowid, title, description, category, city)
+        VALUES ('delete', old.id, old.title, old.description, old.category, old.city);
+    END;
+CREATE TRIGGER services_fts_au AFTER UPDATE OF title, description, category, city ON services BEGIN
+        INSERT INTO services_fts(services_fts, rowid, title, description, category, city)
+        VALUES ('delete', old.id, old.title, old.description, old.category, old.city);
+        INSERT INTO services_fts(rowid, title, description, category, city)
+        VALUES (new.id, new.title, new.description, new.category, new.city);
+    END;
+CREATE TABLE bookings (
+	id INTEGER NOT NULL, 
+	service_id INTEGER NOT NULL, 
+	buyer_id INTEGER NOT NULL, 
+	provider_id INTEGER NOT NULL, 
+	booking_date DATETIME NOT NULL, 
+	duration FLOAT, 
+	total_price FLOAT NOT NULL, 
+	status VARCHAR(20), 
+	location_address VARCHAR(200), 
+	special_requests TEXT, 
+	created_at DATETIME, 
+	PRIMARY KEY (id), 
+	FOREIGN KEY(service_id) REFERENCES services (id), 
+	FOREIGN KEY(buyer_id) REFERENCES users (id), 
+	FOREIGN KEY(provider_id) REFERENCES users (id)
+);
+CREATE INDEX ix_bookings_provider_status ON bookings (provider_id, status);
+CREATE INDEX ix_bookings_service ON bookings (service_id);
+CREATE INDEX ix_bookings_buyer_status ON bookings (buyer_id, status);
+CREATE TABLE reviews (
+	id INTEGER NOT NULL, 
+	booking_id INTEGER NOT NULL, 
+	reviewer_id INTEGER NOT NULL, 
+	reviewee_id INTEGER NOT NULL, 
+	rating INTEGER NOT NULL, 
+	comment TEXT, 
+	created_at DATETIME, 
+	PRIMARY KEY (id), 
+	FOREIGN KEY(booking_id) REFERENCES bookings (id), 
+	FOREIGN KEY(reviewer_id) REFERENCES users (id), 
+	FOREIGN KEY(reviewee_id) REFERENCES users (id)
+);
+CREATE INDEX ix_reviews_reviewee_created ON reviews (reviewee_id, created_at);
+CREATE INDEX ix_reviews_booking ON reviews (booking_id);
+CREATE TABLE payments (
+	id INTEGER NOT NULL, 
+	booking_id INTEGER NOT NULL, 
+	amount FLOAT NOT NULL, 
+	commission FLOAT NOT NULL, 
+	seller_amount FLOAT NOT NULL, 
+	mpesa_receipt VARCHAR(50), 
+	phone_number VARCHAR(20) NOT NULL, 
+	status VARCHAR(20), 
+	created_at DATETIME, 
+	PRIMARY KEY (id), 
+	FOREIGN KEY(booking_id) REFERENCES bookings (id)
+);
+CREATE INDEX ix_payments_booking_status ON payments (booking_id, status);
@@ -0,0 +1,17 @@
+import sqlite3
+
+def test_archiving_keeps_every_review_visible(app, client, populate, database_path):
+    populate(users=60, services=20, bookings=600)
+
+    result = app.test_cli_runner().invoke(args=['archive-bookings', '--days', '365'])
+    assert result.exit_code == 0, result.output
+
+    connection = sqlite3.connect(database_path)
+    assert connection.execute('SELECT COUNT(*) FROM bookings_archive').fetchone()[0] > 0
+    assert connection.execute(
+        'SELECT COUNT(*) FROM reviews WHERE booking_id NOT IN (SELECT id FROM bookings)'
+    ).fetchone()[0] == 0
+    for service_id, review_count in connection.execute('SELECT id, review_count FROM services'):
+        response = client.get(f'/api/reviews/service/{service_id}')
+        assert response.status_code == 200
+        assert len(response.get_json()) == review_count
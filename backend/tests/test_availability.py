@@ -0,0 +1,19 @@
+import pytest
+
+@pytest.mark.parametrize('duration', ['0', '-1', 'nan', '25', 'soon'])
+def test_slots_reject_a_duration_out_of_range(client, populate, duration):
+    populate(users=10, services=3, bookings=10)
+    response = client.get('/api/services/1/slots', query_string={'duration': duration})
+    assert response.status_code == 400
+
+def test_slots_accept_a_duration_in_range(client, populate):
+    populate(users=10, services=3, bookings=10)
+    response = client.get('/api/services/1/slots', query_string={'duration': '1.5'})
+    assert response.status_code == 200
+
+def test_provider_locks_come_from_a_fixed_pool():
+    import availability
+    for provider_id in range(10 * availability.PROVIDER_LOCK_STRIPES):
+        with availability.provider_lock(provider_id):
+            pass
+    assert len(availability._provider_locks) == availability.PROVIDER_LOCK_STRIPES
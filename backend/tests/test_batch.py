@@ -0,0 +1,40 @@
+import pytest
+
+BAD_IDS = [[1], {'id': 1}, '1', True, 0]
+
+@pytest.fixture
+def data(populate):
+    populate(users=10, services=3, bookings=10)
+
+@pytest.mark.parametrize('bad_id', BAD_IDS)
+def test_booking_status_batch_rejects_malformed_ids(client, data, bad_id):
+    response = client.put('/api/bookings/status/batch', json=[
+        {'booking_id': 1, 'status': 'confirmed'},
+        {'booking_id': bad_id, 'status': 'confirmed'},
+    ])
+    assert response.status_code == 207
+    assert [result['status'] for result in response.get_json()['results']] == [200, 400]
+
+@pytest.mark.parametrize('bad_id', BAD_IDS)
+def test_review_batch_rejects_malformed_ids(client, data, bad_id):
+    response = client.post('/api/reviews/batch', json=[
+        {'booking_id': bad_id, 'reviewer_id': 1, 'reviewee_id': 2, 'rating': 5},
+        {'booking_id': 1, 'reviewer_id': bad_id, 'reviewee_id': 2, 'rating': 5},
+    ])
+    assert response.status_code == 400
+    assert [result['status'] for result in response.get_json()['results']] == [400, 400]
+
+@pytest.mark.parametrize('bad_id', BAD_IDS)
+def test_service_batch_rejects_malformed_provider_ids(client, data, bad_id):
+    response = client.post('/api/services/batch', json=[{
+        'title': 'Garden Landscaping', 'description': 'Lawns, hedges and flower beds', 'category': 'gardening',
+        'price': 1500, 'city': 'Nairobi', 'provider_id': bad_id
+    }])
+    assert response.status_code == 400
+    assert response.get_json()['results'][0]['errors'] == ['Unknown provider']
+
+@pytest.mark.parametrize('status', ['archived', '', None, ['confirmed']])
+def test_single_booking_status_is_validated(client, data, status):
+    response = client.put('/api/bookings/1/status', json={'status': status})
+    assert response.status_code == 400
+    assert 'Status must be one of' in response.get_json()['error']
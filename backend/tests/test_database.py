@@ -0,0 +1,25 @@
+from conftest import create_test_app, migrate
+
+def test_read_your_writes_cookie_comes_back_cross_origin(database_path):
+    from extensions import db
+    app = create_test_app(database_path, DATABASE_READ_URL=f'sqlite:///{database_path}')
+    migrate(app)
+    client = app.test_client()
+    origin = {'Origin': 'http://localhost:3000'}
+
+    preflight = client.options('/api/services', headers=dict(origin, **{'Access-Control-Request-Method': 'POST'}))
+    assert preflight.headers['Access-Control-Allow-Origin'] == 'http://localhost:3000'
+    assert preflight.headers['Access-Control-Allow-Credentials'] == 'true'
+
+    wrote = client.post('/api/auth/register', headers=origin, json={
+        'name': 'Wanjiku', 'email': 'wanjiku@example.com', 'password': 'secret123', 'role': 'buyer'
+    })
+    assert wrote.status_code == 201, wrote.get_json()
+    assert 'db_primary_until=' in wrote.headers['Set-Cookie']
+    assert wrote.headers['Access-Control-Allow-Credentials'] == 'true'
+
+    elsewhere = client.get('/api/services', headers={'Origin': 'https://elsewhere.example'})
+    assert 'Access-Control-Allow-Origin' not in elsewhere.headers
+    with app.app_context():
+        db.engine.dispose()
+        app.extensions['read_engine'].dispose()
@@ -0,0 +1,31 @@
+from datetime import date, datetime
+from decimal import Decimal
+
+import pytest
+
+from conftest import create_test_app
+
+orjson = pytest.importorskip('orjson')
+
+PAYLOAD = {
+    'zeta': 1, 'alpha': [1.5, None, True], 'when': datetime(2024, 3, 1, 9, 30), 'day': date(2024, 3, 1),
+    'amount': Decimal('12.50'), 'nested': {'b': 'é', 'a': {2: 'non-string key'}},
+}
+
+def test_orjson_provider_matches_the_stdlib_output(tmp_path):
+    from json_provider import OrjsonProvider
+    fast = create_test_app(tmp_path / 'fast.db', JSON_ENCODER='orjson')
+    slow = create_test_app(tmp_path / 'slow.db', JSON_ENCODER='stdlib')
+    assert isinstance(fast.json, OrjsonProvider)
+    assert not isinstance(slow.json, OrjsonProvider)
+
+    assert fast.json.loads(fast.json.dumps(PAYLOAD)) == slow.json.loads(slow.json.dumps(PAYLOAD))
+    assert list(fast.json.loads(fast.json.dumps(PAYLOAD))) == sorted(PAYLOAD)
+
+def test_orjson_provider_falls_back_for_what_orjson_refuses(tmp_path):
+    app = create_test_app(tmp_path / 'fast.db', JSON_ENCODER='orjson')
+    assert app.json.loads(app.json.dumps({'big': 2 ** 70})) == {'big': 2 ** 70}
+
+def test_auto_picks_orjson_when_installed(tmp_path):
+    from json_provider import OrjsonProvider
+    assert isinstance(create_test_app(tmp_path / 'auto.db').json, OrjsonProvider)
@@ -0,0 +1,81 @@
+import os
+import sqlite3
+from datetime import datetime, timedelta
+
+from conftest import create_test_app, migrate
+
+LEGACY_SCHEMA = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'legacy_v0002.sql')
+
+def legacy_database(path):
+    """A database migrated to v0002 by an old release, with a little history:
+    one provider, one buyer, a service with a pending and a completed,
+    reviewed and paid booking"""
+    now = datetime.utcnow()
+    paid_at = now - timedelta(days=3)
+    connection = sqlite3.connect(path)
+    with open(LEGACY_SCHEMA) as schema:
+        connection.executescript(schema.read())
+    connection.executemany('INSERT INTO schema_migrations VALUES (?, ?, ?)', [
+        (1, 'initial', str(now)), (2, 'filter_indexes', str(now))
+    ])
+    connection.executemany(
+        "INSERT INTO users (id, name, email, password_hash, role, city, lat, lng, created_at) "
+        "VALUES (?, ?, ?, 'x', ?, 'Nairobi', -1.29, 36.82, ?)",
+        [(1, 'Provider', 'provider@example.com', 'provider', str(now)),
+         (2, 'Buyer', 'buyer@example.com', 'buyer', str(now))]
+    )
+    connection.execute(
+        "INSERT INTO services (id, title, description, category, provider_id, price, city, rating, review_count, "
+        "is_active, created_at) VALUES (1, 'Plumbing', 'Pipes', 'Plumbing', 1, 1000, 'Nairobi', 0, 0, 1, ?)", (str(now),)
+    )
+    connection.executemany(
+        "INSERT INTO bookings (id, service_id, buyer_id, provider_id, booking_date, total_price, status, created_at) "
+        "VALUES (?, 1, 2, 1, ?, ?, ?, ?)",
+        [(1, str(now + timedelta(days=2)), 1000.0, 'pending', str(now)),
+         (2, str(paid_at), 2000.0, 'completed', str(paid_at))]
+    )
+    connection.execute(
+        "INSERT INTO reviews (id, booking_id, reviewer_id, reviewee_id, rating, created_at) VALUES (1, 2, 2, 1, 4, ?)",
+        (str(now),)
+    )
+    connection.execute(
+        "INSERT INTO payments (id, booking_id, amount, commission, seller_amount, phone_number, status, created_at) "
+        "VALUES (1, 2, 2000.0, 200.0, 1800.0, '254700000000', 'completed', ?)", (str(paid_at),)
+    )
+    connection.commit()
+    connection.close()
+    return paid_at.date()
+
+def test_upgrade_from_v0002_backfills_the_read_models(database_path):
+    paid_on = legacy_database(database_path)
+    app = create_test_app(database_path)
+
+    applied = migrate(app)
+
+    import migrations
+    assert [version for version, _ in applied] == [version for version, _, _ in migrations.discover()][2:]
+    connection = sqlite3.connect(database_path)
+    assert connection.execute(
+        'SELECT total_services, total_bookings, pending_bookings, total_earnings, rating, review_count '
+        'FROM provider_stats WHERE provider_id = 1'
+    ).fetchone() == (1, 2, 1, 2000.0, 4.0, 1)
+    assert connection.execute(
+        'SELECT day, amount, commission, seller_amount, payment_count FROM daily_earnings'
+    ).fetchall() == [(paid_on.isoformat(), 2000.0, 200.0, 1800.0, 1)]
+    assert connection.execute('SELECT id, payment_status FROM bookings ORDER BY id').fetchall() == [
+        (1, 'unpaid'), (2, 'paid')
+    ]
+
+def test_upgrade_from_v0002_rates_and_scores_services(database_path):
+    legacy_database(database_path)
+    app = create_test_app(database_path)
+
+    migrate(app)
+
+    from ranking import score
+    connection = sqlite3.connect(database_path)
+    rating, review_count, recent_bookings, stored_score = connection.execute(
+        'SELECT rating, review_count, recent_bookings, score FROM services WHERE id = 1'
+    ).fetchone()
+    assert (rating, review_count, recent_bookings) == (4.0, 1, 2)
+    assert stored_score == score(4.0, 1, 2)
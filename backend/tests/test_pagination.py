@@ -0,0 +1,28 @@
+import pytest
+
+from pagination import encode_cursor
+
+@pytest.mark.parametrize('sort, values', [
+    ('newest', [[1], [1]]),
+    ('newest', ['not a date', 1]),
+    ('price', [{'a': 1}, 1]),
+    ('price', ['cheap', 1]),
+    ('rating', [4.5, '1']),
+    ('rating', [4.5, True]),
+])
+def test_listing_rejects_cursor_values_of_the_wrong_type(client, populate, sort, values):
+    populate(users=10, services=5, bookings=10)
+
+    response = client.get('/api/services', query_string={'sort': sort, 'cursor': encode_cursor(values)})
+
+    assert response.status_code == 400
+    assert response.get_json()['error'] == 'Invalid cursor'
+
+def test_listing_follows_its_own_cursor(client, populate):
+    populate(users=10, services=5, bookings=10)
+
+    first = client.get('/api/services?sort=price&limit=2').get_json()
+    second = client.get('/api/services', query_string={'sort': 'price', 'limit': 2, 'cursor': first['next_cursor']})
+
+    assert second.status_code == 200
+    assert [s['id'] for s in second.get_json()['items']] != [s['id'] for s in first['items']]
@@ -0,0 +1,31 @@
+import pytest
+
+@pytest.fixture
+def unpaid_booking(app, populate):
+    populate(users=10, services=3, bookings=20)
+    from extensions import db
+    from models import Booking
+    with app.app_context():
+        return db.session.query(Booking.id).filter(Booking.payment_status == 'unpaid').order_by(Booking.id).first().id
+
+def test_repeated_initiation_does_not_queue_a_second_charge(app, client, unpaid_booking):
+    request = {'booking_id': unpaid_booking, 'phone_number': '+254700000000'}
+
+    first = client.post('/api/payments/initiate', json=request)
+    second = client.post('/api/payments/initiate', json=request)
+
+    assert first.status_code == 202
+    assert second.status_code == 409
+    assert second.get_json()['payment_id'] == first.get_json()['payment_id']
+    assert second.headers['Location'] == first.headers['Location']
+    from extensions import db
+    from models import Payment
+    with app.app_context():
+        assert Payment.query.filter_by(booking_id=unpaid_booking).count() == 1
+
+@pytest.mark.parametrize('checkout_request_id', [['a'], {'id': 'a'}, 7, None])
+def test_callback_rejects_a_malformed_checkout_request_id(client, checkout_request_id):
+    response = client.post('/api/payments/callback', json={'Body': {'stkCallback': {
+        'CheckoutRequestID': checkout_request_id, 'ResultCode': 0, 'ResultDesc': 'OK'
+    }}})
+    assert response.status_code == 400
@@ -0,0 +1,54 @@
+import pytest
+from sqlalchemy import event
+
+from conftest import create_test_app, migrate
+
+LISTINGS = [
+    '/api/services',
+    '/api/services?limit=20',
+    '/api/services/{service_id}',
+    '/api/services/search?q=repair',
+    '/api/services/search?category=plumbing&limit=20',
+    '/api/bookings/user/{buyer_id}',
+    '/api/bookings/user/{buyer_id}?limit=20',
+    '/api/provider/{provider_id}/bookings',
+    '/api/reviews/service/{service_id}',
+    '/api/reviews/provider/{provider_id}',
+    '/api/providers/{provider_id}/earnings',
+    '/api/users/{buyer_id}/completed-unpaid',
+]
+
+def statements_per_request(database_path, services, path):
+    """Statements executed to answer `path` on a database with `services`
+    services and bookings and reviews in proportion. The ids in `path` are
+    filled with the busiest service, provider and buyer."""
+    from datagen import generate
+    from extensions import db
+    app = create_test_app(database_path)
+    migrate(app)
+    with app.app_context():
+        with db.engine.begin() as connection:
+            generate(connection, seed=7, log=lambda message: None,
+                     users=services * 4, services=services, bookings=services * 20)
+        executed = []
+        event.listen(db.engine, 'before_cursor_execute', lambda *args: executed.append(args[2]))
+        busiest = 'SELECT {0} FROM bookings GROUP BY {0} ORDER BY COUNT(*) DESC, {0} LIMIT 1'
+        ids = {name: db.session.execute(db.text(busiest.format(name))).scalar()
+               for name in ('service_id', 'provider_id', 'buyer_id')}
+        db.session.remove()
+    client = app.test_client()
+    path = path.format(**ids)
+    client.get(path)  # the first request also loads lazily built state
+    executed.clear()
+    response = client.get(path)
+    assert response.status_code == 200, path
+    with app.app_context():
+        db.engine.dispose()
+    return len(executed)
+
+@pytest.mark.parametrize('path', LISTINGS)
+def test_listings_run_a_fixed_number_of_statements(tmp_path, path):
+    small = statements_per_request(tmp_path / 'small.db', 5, path)
+    large = statements_per_request(tmp_path / 'large.db', 40, path)
+    assert small == large
+    assert large <= 3, large
@@ -0,0 +1,19 @@
+import pytest
+
+@pytest.mark.parametrize('rating', [0, 6, 4.5, '5', None, True])
+def test_create_review_rejects_invalid_ratings(client, populate, app, rating):
+    populate(users=10, services=3, bookings=10)
+    from extensions import db
+    from models import Booking, Service
+    with app.app_context():
+        booking = db.session.get(Booking, 1)
+        review = {'booking_id': booking.id, 'reviewer_id': booking.buyer_id, 'reviewee_id': booking.provider_id,
+                  'rating': rating}
+        before = db.session.get(Service, booking.service_id).review_count
+
+    response = client.post('/api/reviews', json=review)
+
+    assert response.status_code == 400
+    assert 'Rating' in response.get_json()['error']
+    with app.app_context():
+        assert db.session.get(Service, booking.service_id).review_count == before
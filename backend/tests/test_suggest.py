@@ -0,0 +1,42 @@
+def suggested(client, q):
+    return [s['text'] for s in client.get('/api/suggest', query_string={'q': q}).get_json()['suggestions']]
+
+def test_batch_created_services_are_suggested_at_once(client, populate):
+    populate(users=10, services=3, bookings=10)
+    assert 'Zebra Fence Repair' not in suggested(client, 'zebra')
+
+    response = client.post('/api/services/batch', json=[{
+        'title': 'Zebra Fence Repair', 'description': 'Posts, rails and gates', 'category': 'gardening',
+        'price': 1500, 'city': 'Nairobi', 'provider_id': 1
+    }])
+
+    assert response.status_code == 201
+    assert 'Zebra Fence Repair' in suggested(client, 'zebra')
+
+def test_refresh_rebuilds_only_when_the_catalog_changes(app, client, populate):
+    from extensions import db, suggestions
+    from versions import bump_versions
+    populate(users=10, services=3, bookings=10)
+    suggested(client, 'a')
+    builds = suggestions.stats()['builds']
+
+    def check():
+        suggestions._checked_at = 0.0
+        suggested(client, 'a')
+        with suggestions._refresh_lock:  # waits for a background rebuild
+            return suggestions.stats()['builds']
+
+    with app.app_context():
+        bump_versions('services')
+        db.session.commit()
+    assert check() == builds
+
+    with app.app_context():
+        db.session.execute(db.text(
+            "INSERT INTO services (title, description, category, provider_id, price, price_type, city, is_active,"
+            " rating, review_count, score) VALUES ('Quail Coop Building', '', 'carpentry', 1, 10, 'fixed',"
+            " 'Nairobi', 1, 0, 0, 0)"
+        ))
+        db.session.commit()
+    assert check() == builds + 1
+    assert 'Quail Coop Building' in suggested(client, 'quail')
@@ -0,0 +1,42 @@
+import sqlite3
+
+import pytest
+
+from conftest import create_test_app, migrate
+
+@pytest.fixture
+def cached_app(database_path):
+    from extensions import db
+    app = create_test_app(database_path, CACHE_BACKEND='memory')
+    migrate(app)
+    yield app
+    with app.app_context():
+        db.session.remove()
+        db.engine.dispose()
+
+def write_elsewhere(database_path, sql):
+    """A write committed by another process, which cannot evict this one's cache"""
+    connection = sqlite3.connect(database_path)
+    connection.execute(sql)
+    connection.execute("UPDATE entity_versions SET version = version + 1 WHERE entity IN ('bookings', 'users')")
+    connection.commit()
+    connection.close()
+
+def test_cached_body_follows_the_etag(cached_app, database_path):
+    from datagen import generate
+    from extensions import db
+    with cached_app.app_context():
+        with db.engine.begin() as connection:
+            generate(connection, seed=7, log=lambda message: None, users=20, services=5, bookings=50)
+    client = cached_app.test_client()
+
+    first = client.get('/api/bootstrap')
+    assert client.get('/api/bootstrap').headers['ETag'] == first.headers['ETag']
+    write_elsewhere(database_path, 'UPDATE provider_stats SET total_bookings = total_bookings + 1 '
+                                   'WHERE provider_id = (SELECT MIN(provider_id) FROM provider_stats)')
+
+    second = client.get('/api/bootstrap')
+    assert second.headers['ETag'] != first.headers['ETag']
+    assert second.get_json()['totals']['bookings'] == first.get_json()['totals']['bookings'] + 1
+    revalidated = client.get('/api/bootstrap', headers={'If-None-Match': second.headers['ETag']})
+    assert revalidated.status_code == 304
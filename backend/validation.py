@@ -9,6 +9,10 @@ def validate_phone(phone):
     pattern = r'^\+?1?\d{9,15}$'
     return re.match(pattern, phone) is not None
 
+def valid_id(value):
+    """A row id as JSON sends it: a positive whole number, not a bool"""
+    return isinstance(value, int) and not isinstance(value, bool) and value > 0
+
 def validate_user_data(data, is_update=False):
     errors = []
     
@@ -42,7 +46,10 @@ def validate_service_data(data):
     if not data.get('category'):
         errors.append('Category is required')
     
-    if not data.get('price') or float(data['price']) <= 0:
+    try:
+        if not data.get('price') or float(data['price']) <= 0:
+            errors.append('Valid price is required')
+    except (TypeError, ValueError):
         errors.append('Valid price is required')
     
     if not data.get('city'):
@@ -50,6 +57,8 @@ def validate_service_data(data):
     
     return errors
 
+BOOKING_STATUSES = ['pending', 'confirmed', 'completed', 'cancelled']
+
 def validate_booking_data(data):
     errors = []
     
@@ -59,4 +68,28 @@ def validate_booking_data(data):
     if not data.get('booking_date'):
         errors.append('Booking date is required')
     
-    return errors
\ No newline at end of file
+    return errors
+
+def validate_booking_status_data(data):
+    errors = []
+    
+    if not valid_id(data.get('booking_id')):
+        errors.append('Booking ID must be a positive whole number')
+    
+    if data.get('status') not in BOOKING_STATUSES:
+        errors.append(f'Status must be one of {", ".join(BOOKING_STATUSES)}')
+    
+    return errors
+
+def validate_review_data(data):
+    errors = []
+    
+    for field in ('booking_id', 'reviewer_id', 'reviewee_id'):
+        if not valid_id(data.get(field)):
+            errors.append(f'{field} must be a positive whole number')
+    
+    rating = data.get('rating')
+    if not isinstance(rating, int) or isinstance(rating, bool) or not 1 <= rating <= 5:
+        errors.append('Rating must be a whole number from 1 to 5')
+    
+    return errors
@@ -0,0 +1,100 @@
+"""Per-table version counters and the conditional GET support built on them.
+
+Every write controller bumps the counter of each table it changes, in the same
+transaction as the change. A GET handler declares the tables its body is read
+from; its ETag is a hash of the URL and those counters, and its Last-Modified
+is the newest of their timestamps. Both come from one primary-key read of
+entity_versions, so a matching If-None-Match is answered with a 304 before the
+listing query runs or anything is serialized.
+
+The ETag is also left in g.resource_etag, where the response cache
+(cache.py) adds it to its key: a cached body is only ever sent under the
+counters it was rendered at, whichever process made the last write.
+"""
+import hashlib
+from datetime import datetime
+from functools import wraps
+from flask import Response, g, make_response, request
+from sqlalchemy import insert, select, update
+from werkzeug.http import is_resource_modified
+from extensions import db
+from models import EntityVersion
+
+ENTITIES = ('users', 'services', 'bookings', 'reviews', 'payments')
+
+# ===== COUNTERS =====
+def seed_versions(connection):
+    """Create the counter row of every entity that does not have one yet"""
+    table = EntityVersion.__table__
+    existing = set(connection.scalars(select(table.c.entity)))
+    missing = [entity for entity in ENTITIES if entity not in existing]
+    if missing:
+        now = datetime.utcnow()
+        connection.execute(insert(table), [{'entity': entity, 'version': 0, 'updated_at': now} for entity in missing])
+
+def bump_versions(*entities):
+    """Advance the counters of `entities` inside the current transaction"""
+    entities = sorted(set(entities))
+    now = datetime.utcnow()
+    result = db.session.execute(
+        update(EntityVersion).where(EntityVersion.entity.in_(entities))
+        .values(version=EntityVersion.version + 1, updated_at=now)
+        .execution_options(synchronize_session=False)
+    )
+    if result.rowcount < len(entities):
+        # A database built without the migrations has no counter rows yet
+        existing = set(db.session.scalars(select(EntityVersion.entity).where(EntityVersion.entity.in_(entities))))
+        db.session.execute(insert(EntityVersion), [
+            {'entity': entity, 'version': 1, 'updated_at': now} for entity in entities if entity not in existing
+        ])
+
+def current_versions(entities):
+    """{entity: (version, updated_at)} for `entities`; missing rows read as version 0"""
+    rows = db.session.execute(
+        select(EntityVersion.entity, EntityVersion.version, EntityVersion.updated_at)
+        .where(EntityVersion.entity.in_(entities))
+    )
+    found = {entity: (version, updated_at) for entity, version, updated_at in rows}
+    return {entity: found.get(entity, (0, None)) for entity in entities}
+
+# ===== CONDITIONAL GET =====
+def validators(versions, vary=None):
+    """(etag, last_modified) of the current request's resource at `versions`"""
+    parts = [request.full_path]
+    parts += [f'{entity}:{version}' for entity, (version, _) in sorted(versions.items())]
+    if vary is not None:
+        parts.append(repr(vary))
+    etag = hashlib.sha1('|'.join(parts).encode()).hexdigest()
+    stamps = [updated_at for _, updated_at in versions.values() if updated_at is not None]
+    return etag, max(stamps, default=None)
+
+def conditional(*entities, vary=None):
+    """Give a GET controller an ETag and Last-Modified derived from the
+    counters of `entities`, and answer a matching If-None-Match or
+    If-Modified-Since with a 304 without calling it.
+
+    `vary()` returns anything else the body depends on, such as a default
+    date range that moves with the clock. Only 200 responses get validators.
+    Responses carry Cache-Control: no-cache so clients revalidate every time
+    instead of guessing a freshness lifetime from Last-Modified.
+    """
+    def decorator(f):
+        @wraps(f)
+        def wrapper(*args, **kwargs):
+            # Read the counters before the body: a write that lands in between
+            # makes the ETag older than the body, which only costs a refetch
+            etag, last_modified = validators(current_versions(entities), vary() if vary else None)
+            g.resource_etag = etag
+            if not is_resource_modified(request.environ, etag=etag, last_modified=last_modified):
+                response = Response(status=304)
+            else:
+                response = make_response(f(*args, **kwargs))
+                if response.status_code != 200:
+                    return response
+            response.set_etag(etag)
+            if last_modified is not None:
+                response.last_modified = last_modified
+            response.cache_control.no_cache = True
+            return response
+        return wrapper
+    return decorator
@@ -0,0 +1,55 @@
+"""Kenyan place names, service categories, names and review comments.
+
+Runtime code and the data scripts both use it: the geo index places
+services without coordinates at their city's centre, and datagen.py builds
+production-scale synthetic data from it.
+"""
+
+KENYAN_CITIES = {
+    'Nairobi': {
+        'state': 'Nairobi County', 'lat': -1.2864, 'lng': 36.8172,
+        'areas': ['Westlands', 'Kilimani', 'Lavington', 'Karen', 'Eastleigh', 'Buruburu', 'South B', 'Nairobi CBD']
+    },
+    'Mombasa': {
+        'state': 'Mombasa County', 'lat': -4.0435, 'lng': 39.6682,
+        'areas': ['Nyali', 'Bamburi', 'Mombasa Island', 'Likoni', 'Mikindani', 'Changamwe']
+    },
+    'Kisumu': {
+        'state': 'Kisumu County', 'lat': -0.0917, 'lng': 34.7680,
+        'areas': ['Milimani', 'Tom Mboya', 'Nyalenda', 'Kondele', 'Ahero', 'Maseno']
+    },
+    'Nakuru': {
+        'state': 'Nakuru County', 'lat': -0.3031, 'lng': 36.0800,
+        'areas': ['Milimani', 'Section 58', 'Lanet', 'Free Area']
+    },
+    'Eldoret': {
+        'state': 'Uasin Gishu County', 'lat': 0.5143, 'lng': 35.2698,
+        'areas': ['Elgon View', 'Kapsoya', 'Langas', 'Pioneer']
+    },
+    'Thika': {
+        'state': 'Kiambu County', 'lat': -1.0333, 'lng': 37.0693,
+        'areas': ['Makongeni', 'Section 9', 'Landless', 'Ngoingwa']
+    },
+}
+
+SERVICE_CATEGORIES = {
+    'cleaning': {'price': (800, 5000), 'titles': ['Professional Home Cleaning Services', 'Office Cleaning', 'Carpet & Sofa Cleaning']},
+    'tutoring': {'price': (500, 2000), 'titles': ['KCSE Mathematics Tutoring', 'KCPE English Tutoring', 'Chemistry Revision Classes']},
+    'plumbing': {'price': (1000, 6000), 'titles': ['Emergency Plumbing & Pipe Repair', 'Water Tank Installation', 'Borehole Pump Repair']},
+    'design': {'price': (1500, 10000), 'titles': ['M-Pesa Till Graphic Design', 'Business Card & Flyer Design', 'Social Media Branding']},
+    'electronics': {'price': (2000, 15000), 'titles': ['Matatu Sound System Installation', 'Solar Panel Installation', 'TV & Phone Repair']},
+    'catering': {'price': (10000, 60000), 'titles': ['Traditional Catering for Events', 'Nyama Choma for Parties', 'Wedding Catering']},
+    'beauty': {'price': (500, 4000), 'titles': ['Hair Braiding & Plaiting', 'Bridal Makeup', 'Manicure & Pedicure']},
+    'delivery': {'price': (150, 1500), 'titles': ['Motorcycle (Boda Boda) Delivery', 'Same-Day Parcel Delivery', 'Grocery Delivery']},
+}
+
+FIRST_NAMES = ['John', 'Grace', 'David', 'Sarah', 'Michael', 'Wanjiru', 'Otieno', 'Akinyi', 'Kiprop', 'Njeri', 'Mwangi', 'Atieno']
+LAST_NAMES = ['Kamau', 'Wanjiku', 'Ochieng', 'Achieng', 'Njoroge', 'Mutua', 'Kiptoo', 'Omondi', 'Wambui', 'Kariuki', 'Chebet', 'Odhiambo']
+
+REVIEW_COMMENTS = [
+    'Excellent job! Very professional and thorough. Asante sana!',
+    'Wonderful service, explains everything very well. Pole pole.',
+    'Arrived on time and did good work.',
+    'Fair price, would book again.',
+    'Not bad, but took longer than agreed.',
+]
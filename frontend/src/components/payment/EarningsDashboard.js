@@ -11,7 +11,8 @@ const EarningsDashboard = ({ providerId }) => {
 
   const fetchEarnings = async () => {
     try {
-      const response = await apiService.getProviderEarnings(providerId);
+      // Lifetime totals: include payments moved to the archive
+      const response = await apiService.getProviderEarnings(providerId, { include_archived: 1 });
       setEarnings(response.data);
     } catch (error) {
       console.error('Error fetching earnings:', error);
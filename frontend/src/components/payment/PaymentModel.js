@@ -1,11 +1,18 @@
-import React, { useState } from 'react';
+import React, { useEffect, useState } from 'react';
 import { apiService } from '../../services/api';
 
+const POLL_INTERVAL_MS = 2000;
+
+const newIdempotencyKey = () => `${Date.now()}-${Math.random().toString(36).slice(2)}`;
+
 const PaymentModal = ({ booking, onClose, onSuccess }) => {
   const [phoneNumber, setPhoneNumber] = useState('');
   const [loading, setLoading] = useState(false);
-  const [step, setStep] = useState('initiate'); // 'initiate' or 'confirm'
+  const [step, setStep] = useState('initiate'); // 'initiate', 'confirm' or 'failed'
   const [paymentData, setPaymentData] = useState(null);
+  const [failureReason, setFailureReason] = useState('');
+  // Reused if the request is retried, so a flaky connection can't charge twice
+  const [idempotencyKey, setIdempotencyKey] = useState(newIdempotencyKey);
 
   const handleInitiatePayment = async (e) => {
     e.preventDefault();
@@ -14,12 +21,12 @@ const PaymentModal = ({ booking, onClose, onSuccess }) => {
     try {
       const response = await apiService.initiatePayment({
         booking_id: booking.id,
-        phone_number: phoneNumber
+        phone_number: phoneNumber,
+        idempotency_key: idempotencyKey
       });
       
       setPaymentData(response.data);
       setStep('confirm');
-      // In real app, you'd wait for M-Pesa prompt and user confirmation
     } catch (error) {
       alert('Payment initiation failed: ' + (error.response?.data?.error || 'Unknown error'));
     } finally {
@@ -27,25 +34,45 @@ const PaymentModal = ({ booking, onClose, onSuccess }) => {
     }
   };
 
-  const handleConfirmPayment = async () => {
-    setLoading(true);
-
-    try {
-      await apiService.confirmPayment({
-        payment_id: paymentData.payment_id,
-        mpesa_receipt: `MPESA${Date.now()}` // Simulated receipt
-      });
-      
+  // The payment settles in the background once the M-Pesa prompt is answered
+  const checkPaymentStatus = async () => {
+    const response = await apiService.getPayment(paymentData.payment_id);
+    if (response.data.status === 'completed') {
       onSuccess();
       alert('Payment completed successfully!');
       onClose();
+    } else if (response.data.status === 'failed') {
+      setFailureReason(response.data.failure_reason || 'The payment was not completed');
+      setStep('failed');
+    }
+  };
+
+  useEffect(() => {
+    if (step !== 'confirm' || !paymentData) return undefined;
+    const timer = setInterval(() => {
+      checkPaymentStatus().catch(() => {});
+    }, POLL_INTERVAL_MS);
+    return () => clearInterval(timer);
+    // eslint-disable-next-line react-hooks/exhaustive-deps
+  }, [step, paymentData]);
+
+  const handleCheckStatus = async () => {
+    setLoading(true);
+    try {
+      await checkPaymentStatus();
     } catch (error) {
-      alert('Payment confirmation failed: ' + (error.response?.data?.error || 'Unknown error'));
+      alert('Could not check the payment: ' + (error.response?.data?.error || 'Unknown error'));
     } finally {
       setLoading(false);
     }
   };
 
+  const handleRetry = () => {
+    setIdempotencyKey(newIdempotencyKey());
+    setPaymentData(null);
+    setStep('initiate');
+  };
+
   return (
     <div className="payment-modal-overlay">
       <div className="payment-modal">
@@ -116,12 +143,14 @@ const PaymentModal = ({ booking, onClose, onSuccess }) => {
                 </div>
               </div>
 
+              <p className="note">Waiting for you to approve the M-Pesa prompt...</p>
+
               <button 
-                onClick={handleConfirmPayment} 
+                onClick={handleCheckStatus} 
                 disabled={loading}
                 className="btn btn-primary"
               >
-                {loading ? 'Confirming...' : 'I have paid - Confirm'}
+                {loading ? 'Checking...' : 'I have paid - Check status'}
               </button>
               
               <p className="note">
@@ -129,6 +158,16 @@ const PaymentModal = ({ booking, onClose, onSuccess }) => {
               </p>
             </div>
           )}
+
+          {step === 'failed' && (
+            <div className="confirmation-step">
+              <h3>Payment Not Completed</h3>
+              <p>{failureReason}</p>
+              <button onClick={handleRetry} className="btn btn-primary">
+                Try again
+              </button>
+            </div>
+          )}
         </div>
       </div>
     </div>
@@ -1,4 +1,4 @@
-import React, { useState, useEffect } from 'react';
+import React, { useState, useEffect, useRef } from 'react';
 import { useAuth } from '../context/AuthContext';
 import { apiService } from '../services/api';
 
@@ -7,13 +7,41 @@ const Bookings = () => {
   const [bookings, setBookings] = useState([]);
   const [loading, setLoading] = useState(true);
   const [activeTab, setActiveTab] = useState('all');
+  // The latest list, for event handlers registered on an earlier render
+  const bookingsRef = useRef(bookings);
+  bookingsRef.current = bookings;
 
   useEffect(() => {
-    if (user) {
-      fetchUserBookings();
-    }
+    if (!user) return undefined;
+    fetchUserBookings();
+    // Patch bookings in place as their status or payment changes
+    return apiService.subscribeUserEvents(user.id, {
+      onBooking: (event) => {
+        if (!bookingsRef.current.some(b => b.id === event.booking_id)) {
+          // A new booking: the list needs its full row
+          fetchUserBookings();
+          return;
+        }
+        setBookings(current => patchBooking(current, event.booking_id, {
+          status: event.status,
+          payment_status: event.payment_status
+        }));
+      },
+      onPayment: (event) => {
+        if (event.payment_status) {
+          setBookings(current => patchBooking(current, event.booking_id, { payment_status: event.payment_status }));
+        }
+      },
+      onResync: fetchUserBookings
+    });
   }, [user]);
 
+  const patchBooking = (list, bookingId, changes) => list.map(booking =>
+    booking.id === bookingId
+      ? { ...booking, ...Object.fromEntries(Object.entries(changes).filter(([, value]) => value !== undefined)) }
+      : booking
+  );
+
   const fetchUserBookings = async () => {
     try {
       const response = await apiService.getUserBookings(user.id);
@@ -28,7 +56,7 @@ const Bookings = () => {
   const updateBookingStatus = async (bookingId, newStatus) => {
     try {
       await apiService.updateBookingStatus(bookingId, newStatus);
-      fetchUserBookings();
+      setBookings(current => patchBooking(current, bookingId, { status: newStatus }));
       alert(`Booking ${newStatus} successfully!`);
     } catch (error) {
       alert('Error updating booking: ' + (error.response?.data?.error || 'Unknown error'));
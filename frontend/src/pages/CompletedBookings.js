@@ -11,11 +11,34 @@ const CompletedBookings = () => {
   const [selectedBooking, setSelectedBooking] = useState(null);
 
   useEffect(() => {
-    if (user) {
-      fetchCompletedUnpaidBookings();
-    }
+    if (!user) return undefined;
+    fetchCompletedUnpaidBookings();
+    // Drop bookings once a payment starts; refetch when one becomes payable
+    const payable = (event) => event.status === 'completed' && event.payment_status === 'unpaid';
+    return apiService.subscribeUserEvents(user.id, {
+      onBooking: (event) => {
+        if (payable(event)) {
+          fetchCompletedUnpaidBookings();
+        } else {
+          removeBooking(event.booking_id);
+        }
+      },
+      onPayment: (event) => {
+        if (event.payment_status === 'unpaid') {
+          // The payment failed: the booking is payable again
+          fetchCompletedUnpaidBookings();
+        } else if (event.payment_status) {
+          removeBooking(event.booking_id);
+        }
+      },
+      onResync: fetchCompletedUnpaidBookings
+    });
   }, [user]);
 
+  const removeBooking = (bookingId) => {
+    setCompletedBookings(current => current.filter(booking => booking.id !== bookingId));
+  };
+
   const fetchCompletedUnpaidBookings = async () => {
     try {
       const response = await apiService.getCompletedUnpaidBookings(user.id);
@@ -28,7 +51,8 @@ const CompletedBookings = () => {
   };
 
   const handlePaymentSuccess = () => {
-    fetchCompletedUnpaidBookings();
+    // A failed payment's event puts the booking back
+    removeBooking(selectedBooking.id);
   };
 
   const handlePayNow = (booking) => {
@@ -7,6 +7,7 @@ import ServiceCard from '../components/services/ServiceCard';
 const Home = () => {
   const [services, setServices] = useState([]);
   const [categories, setCategories] = useState([]);
+  const [totals, setTotals] = useState(null);
   const [loading, setLoading] = useState(true);
 
   useEffect(() => {
@@ -15,13 +16,11 @@ const Home = () => {
 
   const fetchHomeData = async () => {
     try {
-      const [servicesRes, categoriesRes] = await Promise.all([
-        apiService.getServices(),
-        apiService.getCategories()
-      ]);
+      const response = await apiService.getBootstrap();
       
-      setServices(servicesRes.data.slice(0, 6)); // Show only 6 services
-      setCategories(categoriesRes.data);
+      setServices(response.data.featured);
+      setCategories(response.data.categories);
+      setTotals(response.data.totals);
     } catch (error) {
       console.error('Error fetching home data:', error);
     } finally {
@@ -40,6 +39,11 @@ const Home = () => {
           <p className="hero-subtitle">
             From home cleaning to tutoring, connect with skilled professionals in your area
           </p>
+          {totals && (
+            <p className="hero-stats">
+              {totals.services} services from {totals.providers} providers · {totals.bookings} bookings made
+            </p>
+          )}
           <div className="hero-buttons">
             <Link to="/services" className="btn btn-primary">
               Browse Services
@@ -58,14 +62,15 @@ const Home = () => {
           <div className="categories-grid">
             {categories.map(category => (
               <Link 
-                key={category} 
-                to={`/services?category=${category}`}
+                key={category.name} 
+                to={`/services?category=${category.name}`}
                 className="category-card"
               >
                 <div className="category-icon">
-                  {category.charAt(0).toUpperCase()}
+                  {category.name.charAt(0).toUpperCase()}
                 </div>
-                <h3 className="category-name">{category}</h3>
+                <h3 className="category-name">{category.name}</h3>
+                <p className="category-count">{category.count} services</p>
               </Link>
             ))}
           </div>
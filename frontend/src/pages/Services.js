@@ -7,23 +7,25 @@ const Services = () => {
   const [services, setServices] = useState([]);
   const [categories, setCategories] = useState([]);
   const [loading, setLoading] = useState(true);
+  const [citySuggestions, setCitySuggestions] = useState([]);
   const [filters, setFilters] = useState({
     category: '',
     city: '',
-    minRating: ''
+    minRating: '',
+    sort: ''
   });
   
   const [searchParams, setSearchParams] = useSearchParams();
 
   const fetchServicesAndCategories = useCallback(async () => {
     try {
-      const [servicesRes, categoriesRes] = await Promise.all([
+      const [servicesRes, bootstrapRes] = await Promise.all([
         apiService.getServices(filters),
-        apiService.getCategories()
+        apiService.getBootstrap()
       ]);
       
       setServices(servicesRes.data);
-      setCategories(categoriesRes.data);
+      setCategories(bootstrapRes.data.categories);
     } catch (error) {
       console.error('Error fetching data:', error);
     } finally {
@@ -40,7 +42,8 @@ const Services = () => {
       setFilters({
         category: category || '',
         city: city || '',
-        minRating: ''
+        minRating: '',
+        sort: searchParams.get('sort') || ''
       });
     }
     
@@ -55,6 +58,7 @@ const Services = () => {
     const params = new URLSearchParams();
     if (newFilters.category) params.set('category', newFilters.category);
     if (newFilters.city) params.set('city', newFilters.city);
+    if (newFilters.sort) params.set('sort', newFilters.sort);
     setSearchParams(params);
     
     // Refetch services with new filters
@@ -73,8 +77,25 @@ const Services = () => {
     }
   };
 
+  useEffect(() => {
+    if (!filters.city) {
+      setCitySuggestions([]);
+      return undefined;
+    }
+    // Wait for a pause in typing before asking for suggestions
+    const timer = setTimeout(async () => {
+      try {
+        const response = await apiService.suggest(filters.city);
+        setCitySuggestions(response.data.suggestions.filter(s => s.type === 'city').map(s => s.text));
+      } catch (error) {
+        setCitySuggestions([]);
+      }
+    }, 150);
+    return () => clearTimeout(timer);
+  }, [filters.city]);
+
   const clearFilters = () => {
-    setFilters({ category: '', city: '', minRating: '' });
+    setFilters({ category: '', city: '', minRating: '', sort: '' });
     setSearchParams({});
     fetchServicesWithFilters({});
   };
@@ -98,8 +119,8 @@ const Services = () => {
               >
                 <option value="">All Categories</option>
                 {categories.map(category => (
-                  <option key={category} value={category}>
-                    {category.charAt(0).toUpperCase() + category.slice(1)}
+                  <option key={category.name} value={category.name}>
+                    {category.name.charAt(0).toUpperCase() + category.name.slice(1)} ({category.count})
                   </option>
                 ))}
               </select>
@@ -110,9 +131,15 @@ const Services = () => {
               <input
                 type="text"
                 placeholder="Enter city..."
+                list="city-suggestions"
                 value={filters.city}
                 onChange={(e) => handleFilterChange('city', e.target.value)}
               />
+              <datalist id="city-suggestions">
+                {citySuggestions.map(city => (
+                  <option key={city} value={city} />
+                ))}
+              </datalist>
             </div>
 
             <div className="filter-group">
@@ -127,6 +154,19 @@ const Services = () => {
               </select>
             </div>
 
+            <div className="filter-group">
+              <label>Sort By</label>
+              <select 
+                value={filters.sort} 
+                onChange={(e) => handleFilterChange('sort', e.target.value)}
+              >
+                <option value="">Newest</option>
+                <option value="relevance">Most Relevant</option>
+                <option value="rating">Highest Rated</option>
+                <option value="price">Lowest Price</option>
+              </select>
+            </div>
+
             <button onClick={clearFilters} className="clear-filters-btn">
               Clear Filters
             </button>
@@ -5,6 +5,8 @@ const API_BASE = 'http://localhost:5000/api';
 // Create axios instance
 const api = axios.create({
   baseURL: API_BASE,
+  // Sends back the cookie that keeps reads on the primary right after a write
+  withCredentials: true,
   headers: {
     'Content-Type': 'application/json',
   },
@@ -23,6 +25,7 @@ export const apiService = {
   getProviderServices: (providerId) => api.get(`/services/provider/${providerId}`),
   getMyServices: (userId) => api.get(`/me/services?user_id=${userId}`),
   searchServices: (searchParams) => api.get('/services/search', { params: searchParams }),
+  suggest: (q, limit = 8) => api.get('/suggest', { params: { q, limit } }),
 
   // Bookings
   createBooking: (bookingData) => api.post('/bookings', bookingData),
@@ -34,6 +37,28 @@ export const apiService = {
   getCompletedUnpaidBookings: (userId) => 
     api.get(`/users/${userId}/completed-unpaid`),
 
+  // Live booking and payment changes for a user, over Server-Sent Events.
+  // onResync runs when events may have been missed (a reconnect, or the
+  // server dropping a backlog) and the page should refetch. A server that
+  // does not serve streams answers 503, which ends the EventSource for good;
+  // the page then simply does not update live. Returns a function that
+  // closes the stream.
+  subscribeUserEvents: (userId, { onBooking, onPayment, onResync }) => {
+    const source = new EventSource(`${API_BASE}/stream/users/${userId}`);
+    let opened = false;
+    source.onopen = () => {
+      if (opened && onResync) onResync();
+      opened = true;
+    };
+    const listen = (type, handler) => {
+      if (handler) source.addEventListener(type, (e) => handler(JSON.parse(e.data)));
+    };
+    listen('booking', onBooking);
+    listen('payment', onPayment);
+    listen('resync', onResync);
+    return () => source.close();
+  },
+
   // Reviews
   createReview: (reviewData) => api.post('/reviews', reviewData),
   getServiceReviews: (serviceId) => api.get(`/reviews/service/${serviceId}`),
@@ -41,12 +66,16 @@ export const apiService = {
 
   // Categories & Search
   getCategories: () => api.get('/categories'),
+  getBootstrap: () => api.get('/bootstrap'),
 
   // Payment methods
   initiatePayment: (paymentData) => api.post('/payments/initiate', paymentData),
   confirmPayment: (confirmationData) => api.post('/payments/confirm', confirmationData),
   getPayment: (paymentId) => api.get(`/payments/${paymentId}`),
-  getProviderEarnings: (providerId) => api.get(`/providers/${providerId}/earnings`),
+  getProviderEarnings: (providerId, params = {}) =>
+    api.get(`/providers/${providerId}/earnings`, { params }),
+  getProviderEarningsSeries: (providerId, params = {}) =>
+    api.get(`/providers/${providerId}/earnings/series`, { params }),
 };
 
 export default api;
\ No newline at end of file